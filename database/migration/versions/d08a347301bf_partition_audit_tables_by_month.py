@@ -0,0 +1,81 @@
+"""Partition audit tables by month
+
+Revision ID: d08a347301bf
+Revises: None
+Create Date: 2026-10-19 10:32:18.227931
+
+"""
+
+import datetime
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'd08a347301bf'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+# The partition column must be a part of every unique key
+UNIQUE_KEYS = {
+    'audit_log': [],
+    'audit_index': [
+        ('ux_audit_index', ['target_id', 'target_type', 'audit_id']),
+    ],
+    'audit_index_instance': [
+        ('ux_audit_instance_key', [
+            'application_id', 'instance_key', 'instance_type',
+            'cluster_name', 'audit_id']),
+    ],
+}
+
+
+def _next_month(date):
+    return (date.replace(day=1) + datetime.timedelta(days=31)).replace(day=1)
+
+
+def _make_partitions(since, until):
+    month = since.replace(day=1)
+    partitions = []
+    while month <= until:
+        next_month = _next_month(month)
+        partitions.append(
+            "PARTITION p{0:%Y%m} VALUES LESS THAN (TO_DAYS('{1}'))".format(
+                month, next_month.isoformat()))
+        month = next_month
+    partitions.append('PARTITION pmax VALUES LESS THAN MAXVALUE')
+    return ', '.join(partitions)
+
+
+def _alter_unique_keys(table_name, extra_columns):
+    clauses = []
+    for name, columns in UNIQUE_KEYS[table_name]:
+        columns = ', '.join(columns + extra_columns)
+        clauses.append('DROP INDEX {0}, ADD UNIQUE INDEX {0} ({1})'.format(
+            name, columns))
+    primary_key = ', '.join(['id'] + extra_columns)
+    clauses.append('DROP PRIMARY KEY, ADD PRIMARY KEY ({0})'.format(
+        primary_key))
+    op.execute('ALTER TABLE {0} {1}'.format(table_name, ', '.join(clauses)))
+
+
+def upgrade():
+    today = datetime.date.today()
+    connection = op.get_bind()
+    for table_name in sorted(UNIQUE_KEYS):
+        _alter_unique_keys(table_name, ['created_at'])
+        since = connection.execute(
+            'SELECT MIN(created_at) FROM {0}'.format(table_name)).scalar()
+        since = since.date() if since else today
+        until = _next_month(_next_month(today))
+        op.execute(
+            'ALTER TABLE {0} PARTITION BY RANGE (TO_DAYS(created_at)) '
+            '({1})'.format(table_name, _make_partitions(since, until)))
+
+
+def downgrade():
+    for table_name in sorted(UNIQUE_KEYS):
+        op.execute('ALTER TABLE {0} REMOVE PARTITIONING'.format(table_name))
+        _alter_unique_keys(table_name, [])
@@ -82,11 +82,13 @@ CREATE TABLE `audit_index` (
   `target_type` tinyint(4) NOT NULL,
   `created_at` datetime NOT NULL DEFAULT CURRENT_TIMESTAMP,
   `updated_at` datetime NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-  PRIMARY KEY (`id`),
-  UNIQUE KEY `ux_audit_index` (`target_id`,`target_type`,`audit_id`),
+  PRIMARY KEY (`id`,`created_at`),
+  UNIQUE KEY `ux_audit_index` (`target_id`,`target_type`,`audit_id`,`created_at`),
   KEY `ix_audit_index_created_at` (`created_at`),
   KEY `ix_audit_index_updated_at` (`updated_at`)
-) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+/*!50100 PARTITION BY RANGE (TO_DAYS(created_at))
+(PARTITION pmax VALUES LESS THAN MAXVALUE ENGINE = InnoDB) */;
 /*!40101 SET character_set_client = @saved_cs_client */;
 
 --
@@ -105,11 +107,13 @@ CREATE TABLE `audit_index_instance` (
   `instance_type` tinyint(4) NOT NULL,
   `created_at` datetime NOT NULL DEFAULT CURRENT_TIMESTAMP,
   `updated_at` datetime NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-  PRIMARY KEY (`id`),
-  UNIQUE KEY `ux_audit_instance_key` (`application_id`,`instance_key`,`instance_type`,`cluster_name`,`audit_id`),
+  PRIMARY KEY (`id`,`created_at`),
+  UNIQUE KEY `ux_audit_instance_key` (`application_id`,`instance_key`,`instance_type`,`cluster_name`,`audit_id`,`created_at`),
   KEY `ix_audit_index_instance_created_at` (`created_at`),
   KEY `ix_audit_index_instance_updated_at` (`updated_at`)
-) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+/*!50100 PARTITION BY RANGE (TO_DAYS(created_at))
+(PARTITION pmax VALUES LESS THAN MAXVALUE ENGINE = InnoDB) */;
 /*!40101 SET character_set_client = @saved_cs_client */;
 
 --
@@ -128,12 +132,14 @@ CREATE TABLE `audit_log` (
   `rollback_id` bigint(20) DEFAULT NULL,
   `created_at` datetime NOT NULL DEFAULT CURRENT_TIMESTAMP,
   `updated_at` datetime NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-  PRIMARY KEY (`id`),
+  PRIMARY KEY (`id`,`created_at`),
   KEY `ix_audit_log_user_id` (`user_id`),
   KEY `ix_audit_log_rollback_id` (`rollback_id`),
   KEY `ix_audit_log_updated_at` (`updated_at`),
   KEY `ix_audit_log_created_at` (`created_at`)
-) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+/*!50100 PARTITION BY RANGE (TO_DAYS(created_at))
+(PARTITION pmax VALUES LESS THAN MAXVALUE ENGINE = InnoDB) */;
 /*!40101 SET character_set_client = @saved_cs_client */;
 
 --
@@ -323,6 +329,7 @@ CREATE TABLE `webhook_subscription` (
 
 LOCK TABLES `alembic_version` WRITE;
 /*!40000 ALTER TABLE `alembic_version` DISABLE KEYS */;
+INSERT INTO `alembic_version` VALUES ('d08a347301bf');
 /*!40000 ALTER TABLE `alembic_version` ENABLE KEYS */;
 UNLOCK TABLES;
 /*!40103 SET TIME_ZONE=@OLD_TIME_ZONE */;
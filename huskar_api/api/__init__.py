@@ -20,7 +20,8 @@ from .organization import (
 from .instance import InstanceView, InstanceBatchView, ClusterView
 from .infra_config import InfraConfigView, InfraConfigDownstreamView
 from .service_instance import (
-    ServiceInstanceView, ServiceInstanceWeightView, ServiceRegistryView)
+    ServiceInstanceView, ServiceInstanceBulkView, ServiceInstanceWeightView,
+    ServiceRegistryView)
 from .service_info import ServiceInfoView, ClusterInfoView
 from .service_link import ServiceLinkView
 from .service_route import ServiceRouteView, ServiceDefaultRouteView
@@ -28,7 +29,8 @@ from .user import UserView, PasswordResetView
 from .audit import AuditLogView, AuditRollbackView, AuditTimelineView
 from .webhook import WebhookView, WebhookInstanceView, ApplicationWebhookView
 from .support import (
-    CurrentUserView, ContainerRegistryView, BlacklistView, RouteProgramView)
+    CurrentUserView, ContainerRegistryView, BlacklistView, RouteProgramView,
+    CacheStatsView)
 from .well_known import WellKnownCommonView
 
 bp = Blueprint('api', __name__)
@@ -55,6 +57,8 @@ add_route('/config/<application_name>/<cluster_name>',
 config_and_switch_readonly_endpoints.add('api.config')
 add_route('/service/<application_name>/<cluster_name>/<key>/weight',
           ServiceInstanceWeightView.as_view('service_weight'))
+add_route('/service-bulk/<application_name>',
+          ServiceInstanceBulkView.as_view('service_bulk'), methods=['POST'])
 
 
 service_route_view = ServiceRouteView.as_view('service_route')
@@ -177,6 +181,8 @@ add_route('/_internal/tools/container/registry/<container_id>',
           ContainerRegistryView.as_view('internal_container_registry'))
 add_route('/_internal/ops/blacklist',
           BlacklistView.as_view('internal_blacklist'))
+add_route('/_internal/ops/cache-stats',
+          CacheStatsView.as_view('internal_cache_stats'))
 
 add_route('/infra-config/<application_name>/<infra_type>/<infra_name>',
           InfraConfigView.as_view('infra_config'))
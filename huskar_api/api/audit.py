@@ -25,6 +25,10 @@ class AuditLogView(MethodView):
 
         :param name: The name of team, application and also.
         :query start: The offset of pagination. Default is ``0``.
+        :query before_id: Optional. The cursor of pagination. Passing the id
+                          of the last item in current page will get the next
+                          page. It is faster than ``start`` in deep pages.
+        :query limit: The max count of items. Default and max are ``100``.
         :query date: The date specified to search.
         :<header Authorization: Huskar Token (See :ref:`token`)
         :status 403: You don't have required authority.
@@ -34,11 +38,14 @@ class AuditLogView(MethodView):
         """
         start = request.args.get('start', type=int, default=0)
         start = max(start, 0)
+        before_id = request.args.get('before_id', type=int)
+        limit = request.args.get('limit', type=int, default=100)
+        limit = min(max(limit, 1), 100)
         date = request.args.get('date', type=strptime2date)
         target_id = self._find_target(name)
         can_view_sensitive_data = AuditLog.can_view_sensitive_data(
             g.auth.id, self.target_type, target_id)
-        items = self._get_audit_logs(target_id, start, date)
+        items = self._get_audit_logs(target_id, start, limit, before_id, date)
         if not can_view_sensitive_data:
             items = [item.desensitize() for item in items]
         return api_response(audit_log_schema.dump(items, many=True).data)
@@ -57,16 +64,16 @@ class AuditLogView(MethodView):
             if application is not None:
                 return application.id
 
-    def _get_audit_logs(self, target_id, start, date):
+    def _get_audit_logs(self, target_id, start, limit, before_id, date):
         if target_id is None:
             return []
         if date:
             audit_logs = AuditLog.get_multi_by_index_with_date(
-                self.target_type, target_id, date)
+                self.target_type, target_id, date, before_id)
         else:
             audit_logs = AuditLog.get_multi_by_index(
-                self.target_type, target_id)
-        return audit_logs[start:start + 100]
+                self.target_type, target_id, before_id)
+        return audit_logs[start:start + limit]
 
 
 class AuditRollbackView(MethodView):
@@ -105,6 +112,10 @@ class AuditTimelineView(MethodView):
         :param key: The key of instance.
         :query date: The date specified to search, default is today.
         :query start: The offset of pagination. Default is ``0``.
+        :query before_id: Optional. The cursor of pagination. Passing the id
+                          of the last item in current page will get the next
+                          page. It is faster than ``start`` in deep pages.
+        :query limit: The max count of items. Default and max are ``20``.
         :>header Authorization: Huskar Token (See :ref:`token`)
         :status 403: You don't have required authority.
         :status 501: The server is in minimal mode.
@@ -115,12 +126,15 @@ class AuditTimelineView(MethodView):
         check_cluster_name(cluster_name, application_name)
 
         start = request.args.get('start', type=int, default=0)
+        before_id = request.args.get('before_id', type=int)
+        limit = request.args.get('limit', type=int, default=20)
+        limit = min(max(limit, 1), 20)
         application = Application.get_by_name(application_name)
         can_view_sensitive_data = AuditLog.can_view_sensitive_data(
             g.auth.id, self.instance_type, application.id)
         items = AuditLog.get_multi_by_instance_index(
-            self.instance_type, application.id, cluster_name, key)
-        items = items[start:start + 20]
+            self.instance_type, application.id, cluster_name, key, before_id)
+        items = items[start:start + limit]
         if not can_view_sensitive_data:
             items = [item.desensitize() for item in items]
         return api_response(audit_log_schema.dump(items, many=True).data)
@@ -1,20 +1,25 @@
 from __future__ import absolute_import
 
-import io
 import logging
+import operator
+import itertools
+import collections
 
-from flask import g, request, json, send_file, abort
+from flask import (
+    g, request, json, abort, stream_with_context, Response)
 from flask.views import MethodView
+from more_itertools import chunked
 from huskar_sdk_v2.consts import (
     SERVICE_SUBDOMAIN, SWITCH_SUBDOMAIN, CONFIG_SUBDOMAIN, OVERALL)
 
 from huskar_api import settings
 from huskar_api.models import huskar_client
-from huskar_api.models.comment import get_comment, set_comment
+from huskar_api.models.comment import get_comments, set_comments
 from huskar_api.models.const import ROUTE_DEFAULT_INTENT, INFRA_CONFIG_KEYS
 from huskar_api.models.route.utils import parse_route_key
-from huskar_api.models.instance import InstanceManagement
-from huskar_api.models.utils import merge_instance_list, retry
+from huskar_api.models.instance import (
+    InstanceManagement, CachedInstanceManagement, InstanceImporter)
+from huskar_api.models.utils import merge_instance_list
 from huskar_api.models.exceptions import MalformedDataError, OutOfSyncError
 from huskar_api.models.auth import Authority
 from huskar_api.service import comment as comment_facade
@@ -24,7 +29,10 @@ from huskar_api.service.admin.application_auth import (
 from huskar_api.service.utils import check_cluster_name
 from huskar_api.switch import switch, SWITCH_ENABLE_CONFIG_PREFIX_BLACKLIST
 from .schema import instance_schema, validate_fields
-from .utils import login_required, api_response, audit_log
+from .utils import (
+    login_required, api_response, api_stream_response, iter_json_array,
+    prefetch_iterable, audit_log)
+from .long_polling import tree_hub
 
 
 logger = logging.getLogger(__name__)
@@ -33,51 +41,107 @@ logger = logging.getLogger(__name__)
 class InstanceFacade(object):
     client = huskar_client
 
-    def __init__(self, subdomain, application_name, include_comment=True):
+    CONSISTENCY_STRONG = 'strong'
+    CONSISTENCY_CACHED = 'cached'
+    CONSISTENCY_CHOICES = frozenset([CONSISTENCY_STRONG, CONSISTENCY_CACHED])
+
+    COMMENT_BATCH_SIZE = 500
+    PIPELINE_SIZE = 100
+
+    def __init__(self, subdomain, application_name, include_comment=True,
+                 tree_holder=None):
         self.subdomain = subdomain
         self.application_name = application_name
         self.include_comment = include_comment
-        self.im = InstanceManagement(self.client, application_name, subdomain)
+        self.tree_holder = tree_holder
+        if tree_holder is None:
+            self.im = InstanceManagement(
+                self.client, application_name, subdomain)
+        else:
+            self.im = CachedInstanceManagement(
+                tree_holder, application_name, subdomain)
         self.im.set_context(g.application_name, g.cluster_name)
 
+    @classmethod
+    def from_request(cls, subdomain, application_name, include_comment=True):
+        """Creates a facade which follows the consistency level of request.
+
+        The ``cached`` level reads from the tree holder of long polling if it
+        has been synchronized in current process, and falls back to reading
+        ZooKeeper otherwise. The ``strong`` level reads ZooKeeper always.
+
+        The default level is ``cached`` for the endpoints in
+        ``TREE_CACHED_READ_ENDPOINTS`` and ``strong`` for others.
+        """
+        consistency = request.args.get('consistency')
+        if consistency is None:
+            if request.endpoint in settings.TREE_CACHED_READ_ENDPOINTS:
+                consistency = cls.CONSISTENCY_CACHED
+            else:
+                consistency = cls.CONSISTENCY_STRONG
+        if consistency not in cls.CONSISTENCY_CHOICES:
+            abort(400, 'Unrecognized "consistency"')
+
+        tree_holder = None
+        if consistency == cls.CONSISTENCY_CACHED:
+            tree_holder = tree_hub.peek_tree_holder(
+                application_name, subdomain)
+        return cls(subdomain, application_name, include_comment, tree_holder)
+
+    def make_response(self, data):
+        """Makes an API response and tells the client where the data is
+        read from.
+        """
+        response = api_response(data)
+        if self.tree_holder is None:
+            response.headers['X-Huskar-Data-Source'] = 'zookeeper'
+        else:
+            response.headers['X-Huskar-Data-Source'] = 'cache'
+            response.headers['X-Huskar-Data-Zxid'] = str(self.im.last_zxid)
+        return response
+
     def fetch_instance_list(self, pairs, resolve=True):
         include_comment = self.include_comment and not g.auth.is_minimal_mode
-        for cluster_name, key in pairs:
-            info, physical_name = self.im.get_instance(
-                cluster_name, key, resolve=resolve)
-            if info.stat is None:
-                continue
-            data = {
-                'application': self.application_name,
-                'cluster': cluster_name,
-                'key': key,
-                'value': info.data,
-                'meta': self.make_meta_info(info),
-            }
-            if self.subdomain == SERVICE_SUBDOMAIN:
-                data['runtime'] = self.make_runtime_field(info)
-                if physical_name:
-                    data['cluster_physical_name'] = physical_name
-            if include_comment:
-                comment = get_comment(
-                    self.application_name, cluster_name,
-                    self.subdomain, key)
-                data['comment'] = comment
-            yield data
-
-    @retry(OutOfSyncError, interval=0.5, max_retry=3)
-    def set_instance(self, cluster_name, key, value, comment=None,
-                     overwrite=False):
-        instance, _ = self.im.get_instance(
-            cluster_name, key, resolve=False)
-        if overwrite or instance.stat is None:
-            instance.data = value
-            instance.save()
-            if self.include_comment and comment is not None:
-                set_comment(
-                    self.application_name, cluster_name,
-                    self.subdomain, key, comment)
-            return instance
+        iterator = self._fetch_instance_list(pairs, resolve)
+        if not include_comment:
+            for data in iterator:
+                yield data
+            return
+        for chunk in chunked(iterator, self.COMMENT_BATCH_SIZE):
+            comments = get_comments(
+                self.application_name, self.subdomain,
+                [(data['cluster'], data['key']) for data in chunk])
+            for data in chunk:
+                data['comment'] = comments[data['cluster'], data['key']]
+                yield data
+
+    def _fetch_instance_list(self, pairs, resolve):
+        # The pairs in the same cluster are read in pipelines
+        groups = itertools.groupby(pairs, key=operator.itemgetter(0))
+        for cluster_name, group in groups:
+            keys = (key for _, key in group)
+            for chunk in chunked(keys, self.PIPELINE_SIZE):
+                infos, physical_name = self.im.get_instances(
+                    cluster_name, chunk, resolve=resolve)
+                for key, info in zip(chunk, infos):
+                    if info.stat is None:
+                        continue
+                    yield self._make_instance_data(
+                        cluster_name, key, info, physical_name)
+
+    def _make_instance_data(self, cluster_name, key, info, physical_name):
+        data = {
+            'application': self.application_name,
+            'cluster': cluster_name,
+            'key': key,
+            'value': info.data,
+            'meta': self.make_meta_info(info),
+        }
+        if self.subdomain == SERVICE_SUBDOMAIN:
+            data['runtime'] = self.make_runtime_field(info)
+            if physical_name:
+                data['cluster_physical_name'] = physical_name
+        return data
 
     def get_instance(self, cluster_name, key, resolve=True):
         iterator = self.fetch_instance_list([(cluster_name, key)],
@@ -85,18 +149,25 @@ class InstanceFacade(object):
         return next(iterator, None)
 
     def get_instance_list(self, resolve=True):
+        return list(self.iter_instance_list(resolve=resolve))
+
+    def iter_instance_list(self, resolve=True):
         pairs = (
             (cluster_name, key)
             for cluster_name in self.im.list_cluster_names()
             for key in self.im.list_instance_keys(
                 cluster_name, resolve=resolve)
         )
-        return list(self.fetch_instance_list(pairs, resolve=resolve))
+        return self.fetch_instance_list(pairs, resolve=resolve)
 
     def get_instance_list_by_cluster(self, cluster_name, resolve=True):
+        return list(self.iter_instance_list_by_cluster(
+            cluster_name, resolve=resolve))
+
+    def iter_instance_list_by_cluster(self, cluster_name, resolve=True):
         keys = self.im.list_instance_keys(cluster_name, resolve=resolve)
         pairs = ((cluster_name, k) for k in keys)
-        return list(self.fetch_instance_list(pairs, resolve=resolve))
+        return self.fetch_instance_list(pairs, resolve=resolve)
 
     def get_merged_instance_list(self, cluster_name):
         overall_instance_list = self.get_instance_list_by_cluster(OVERALL)
@@ -240,7 +311,15 @@ class InstanceView(MethodView):
         :param application_name: The name of application.
         :param cluster_name: The name of cluster.
         :query key: Optional. The specified instance will be responded.
+        :query consistency: Optional. ``strong`` reads from ZooKeeper directly.
+                            ``cached`` reads from the synchronized tree cache
+                            of current process if there is one, and falls
+                            back to ZooKeeper otherwise.
         :<header Authorization: Huskar Token (See :ref:`token`)
+        :>header X-Huskar-Data-Source: ``cache`` or ``zookeeper``.
+        :>header X-Huskar-Data-Zxid: The max ``mzxid`` of responded data.
+                                     It is present for ``cache`` only.
+        :status 400: The consistency level is unrecognized.
         :status 404: The application, cluster or key is not found.
         :status 200: The result is in the response.
         """
@@ -250,7 +329,7 @@ class InstanceView(MethodView):
             check_application(application_name)
 
         check_cluster_name(cluster_name, application_name)
-        facade = InstanceFacade(self.subdomain, application_name)
+        facade = InstanceFacade.from_request(self.subdomain, application_name)
         key = request.args.get('key')
         validate_fields(instance_schema, {
             'application': application_name,
@@ -264,10 +343,10 @@ class InstanceView(MethodView):
                 abort(404, '%s %s/%s/%s does not exist' % (
                     self.subdomain, application_name, cluster_name, key,
                 ))
-            return api_response(instance)
+            return facade.make_response(instance)
         else:
             instance_list = facade.get_instance_list_by_cluster(cluster_name)
-            return api_response(instance_list)
+            return facade.make_response(instance_list)
 
     @login_required
     def post(self, application_name, cluster_name):
@@ -441,7 +520,8 @@ class InstanceBatchView(MethodView):
             }
 
         The content of ``data`` field will be responded directly if the
-        ``format`` is ``file``.
+        ``format`` is ``file``. The response body is streamed with chunked
+        transfer encoding in both formats.
 
         :form application: The name of application which will be exported.
         :form cluster: The name of cluster which will be exported.
@@ -464,6 +544,10 @@ class InstanceBatchView(MethodView):
             'application': application_name,
             'cluster': cluster_name,
         }, optional_fields=['cluster'])
+        if export_format not in (
+                self.EXPORT_FORMAT_JSON, self.EXPORT_FORMAT_FILE):
+            abort(400, 'Unrecognized "format"')
+
         facade = InstanceFacade(
             self.subdomain, application_name, self.has_comment)
         if cluster_name:
@@ -472,31 +556,30 @@ class InstanceBatchView(MethodView):
                     cluster_name == ROUTE_DEFAULT_INTENT and g.cluster_name):
                 content = facade.get_merged_instance_list(g.cluster_name)
             else:
-                content = facade.get_instance_list_by_cluster(cluster_name)
+                content = facade.iter_instance_list_by_cluster(cluster_name)
         else:
-            content = facade.get_instance_list()
+            content = facade.iter_instance_list()
 
         if export_format == self.EXPORT_FORMAT_FILE:
+            # The errors of the first chunk are responded as usual. A file
+            # could not tell the errors later, so the connection is aborted
+            # before the end of array then.
+            content = prefetch_iterable(content)
             # Don't expose meta while exporting with file.
-            content = [
+            content = (
                 {k: v for k, v in item.iteritems() if k != 'meta'}
-                for item in content]
-
-            file_alike = io.BytesIO()
-            file_alike.write(json.dumps(content))
-            file_alike.seek(0)
+                for item in content)
             filename = '%s_backup.json' % self.subdomain
-            return send_file(file_alike,
-                             as_attachment=True,
-                             attachment_filename=filename,
-                             mimetype='application/octet-stream',
-                             add_etags=False,
-                             cache_timeout=0)
-
-        if export_format == self.EXPORT_FORMAT_JSON:
-            return api_response(content)
+            response = Response(
+                stream_with_context(iter_json_array(content)),
+                mimetype='application/octet-stream')
+            response.headers['Content-Disposition'] = \
+                'attachment; filename=%s' % filename
+            response.cache_control.public = True
+            response.cache_control.max_age = 0
+            return response
 
-        abort(400, 'Unrecognized "format"')
+        return api_stream_response(content)
 
     @login_required
     def post(self):
@@ -512,17 +595,30 @@ class InstanceBatchView(MethodView):
         :<header Content-Type: ``multipart/form-data``
         :<header Authorization: Huskar Token (See :ref:`token`)
         :status 200: The request is successful. ``import_num`` will be
-                     responded also.
+                     responded also. The ``results`` includes the status
+                     (``created``, ``updated``, ``skipped`` or ``failed``)
+                     of each instance in order.
         """
         overwrite = request.values.get('overwrite', type=int, default=0)
         content = request.files.get('import_file', type=json.load) or {}
         content = instance_schema.load(content, many=True).data
-        instance_list = self.set_instance_list(content, bool(overwrite))
-        affected = sum(1 for i in instance_list if i is not None)
+        results = self.set_instance_list(content, bool(overwrite))
+        affected = sum(
+            1 for r in results
+            if r.status in InstanceImporter.AFFECTED_STATUSES)
         audit_log.emit(
             self.IMPORT_ACTION_TYPES[self.subdomain], datalist=content,
             overwrite=bool(overwrite), affected=affected)
-        return api_response({'import_num': affected})
+        return api_response({
+            'import_num': affected,
+            'results': [{
+                'application': r.application_name,
+                'cluster': r.cluster_name,
+                'key': r.key,
+                'status': r.status,
+                'message': r.message,
+            } for r in results],
+        })
 
     def set_instance_list(self, content, overwrite):
         for item in content:
@@ -534,13 +630,23 @@ class InstanceBatchView(MethodView):
                 self.subdomain, application_name, cluster_name, item['key'])
             self.facade.check_cluster_name_in_creation(
                 application_name, cluster_name)
-        for item in content:
-            facade = InstanceFacade(
-                self.subdomain, item['application'], self.has_comment)
-            instance = facade.set_instance(
-                item['cluster'], item['key'], item['value'],
-                item.get('comment'), overwrite)
-            yield instance
+
+        importer = InstanceImporter(huskar_client, self.subdomain, overwrite)
+        results = importer.run(
+            (item['application'], item['cluster'], item['key'], item['value'])
+            for item in content)
+
+        if self.has_comment:
+            comments = collections.defaultdict(list)
+            for item, result in zip(content, results):
+                if (result.status in InstanceImporter.AFFECTED_STATUSES and
+                        item.get('comment') is not None):
+                    comments[item['application']].append(
+                        (item['cluster'], item['key'], item['comment']))
+            for application_name, items in comments.items():
+                set_comments(application_name, self.subdomain, items)
+
+        return results
 
 
 class ClusterView(MethodView):
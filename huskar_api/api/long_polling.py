@@ -1,17 +1,14 @@
 from __future__ import absolute_import
 
-import logging
-
 from flask import request, json, abort, g, stream_with_context, Response
 from flask.views import MethodView
 from huskar_sdk_v2.consts import CONFIG_SUBDOMAIN, SERVICE_SUBDOMAIN
 
 from huskar_api import settings
-from huskar_api.extras.raven import capture_exception
 from huskar_api.extras.concurrent_limiter import release_after_iterator_end
-from huskar_api.models import huskar_client
+from huskar_api.models import huskar_client, make_huskar_client
 from huskar_api.models.auth import Authority
-from huskar_api.models.route import RouteManagement
+from huskar_api.models.route import UpstreamDeclarer
 from huskar_api.models.route.hijack import RouteHijack
 from huskar_api.models.tree import TreeHub, TreeHolderCleaner
 from huskar_api.service.admin.application_auth import (
@@ -23,9 +20,14 @@ from .utils import login_required, get_life_span
 from .schema import event_subscribe_schema
 
 
-tree_hub = TreeHub(huskar_client, settings.TREE_HOLDER_STARTUP_MAX_CONCURRENCY)
+tree_hub = TreeHub(
+    huskar_client, settings.TREE_HOLDER_STARTUP_MAX_CONCURRENCY,
+    extra_clients=[make_huskar_client()
+                   for _ in xrange(settings.TREE_HUB_SESSION_COUNT - 1)])
 tree_holder_cleaner = TreeHolderCleaner(tree_hub)
 tree_holder_cleaner.spawn_cleaning_thread()
+upstream_declarer = UpstreamDeclarer(huskar_client)
+upstream_declarer.spawn_declaring_thread()
 
 
 class LongPollingView(MethodView):
@@ -150,13 +152,9 @@ class LongPollingView(MethodView):
             return
         if not switch.is_switched_on(SWITCH_ENABLE_DECLARE_UPSTREAM):
             return
-        route_management = RouteManagement(
-            huskar_client, g.auth.username, g.cluster_name)
         application_names = frozenset(request_data.get(SERVICE_SUBDOMAIN, []))
-        try:
-            route_management.declare_upstream(application_names)
-        except Exception:
-            capture_exception(level=logging.WARNING)
+        upstream_declarer.declare(
+            g.auth.username, g.cluster_name, application_names)
 
     def learn_and_hijack_route(self, request_data, tree_watcher):
         request_domain = request.host.split(':')[0]
@@ -2,17 +2,36 @@ from __future__ import absolute_import
 
 import logging
 
-from flask import Blueprint
+from flask import Blueprint, request_started
 
 from huskar_api import settings
 from huskar_api.ext import sentry
 from huskar_api.models import DBSession
+from huskar_api.models.cache import model_memo
 
 
 bp = Blueprint('middlewares.db', __name__)
 logger = logging.getLogger(__name__)
 
 
+@bp.record_once
+def setup_model_memo(state):
+    # The signal is sent before all middlewares, so the models fetched by
+    # the authentication are memorized too.
+    request_started.connect(enable_model_memo, state.app)
+
+
+def enable_model_memo(sender, **extra):
+    model_memo.enable()
+
+
+@bp.teardown_app_request
+def disable_model_memo(error=None):
+    # The teardown runs even if the view raised, so the memo never leaks
+    # into the next request of the same greenlet.
+    model_memo.disable()
+
+
 @bp.after_app_request
 def close_session(response):
     try:
@@ -232,12 +232,10 @@ class ApplicationListView(MethodView):
         else:
             application_list = Application.get_all()
             if with_authority and not g.auth.is_admin:
+                authorized_ids = Application.get_authorized_ids(g.auth.id)
                 application_list = [
-                    item for item in application_list if (
-                        item.check_auth(Authority.READ, g.auth.id) or
-                        item.check_auth(Authority.WRITE, g.auth.id)
-                    )
-                ]
+                    item for item in application_list
+                    if item.id in authorized_ids]
             result = application_schema.dump([
                 {'name': item.application_name,
                  'team_name': item.team.team_name,
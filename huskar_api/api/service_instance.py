@@ -4,8 +4,10 @@ import logging
 
 from flask import json, request, abort, g
 from flask.views import MethodView
+from marshmallow.exceptions import ValidationError
 from huskar_sdk_v2.consts import SERVICE_SUBDOMAIN
 
+from huskar_api import settings
 from huskar_api.models import huskar_client
 from huskar_api.models.auth import Authority
 
@@ -16,7 +18,7 @@ from huskar_api.extras.raven import capture_exception
 from huskar_api.service import service as service_facade
 from huskar_api.service.admin.application_auth import (
     check_application_auth, check_application)
-from huskar_api.service.exc import ServiceValueError
+from huskar_api.service.exc import ServiceValueError, HuskarApiException
 from huskar_api.service.utils import check_cluster_name
 from .instance import InstanceFacade
 from .schema import instance_schema, service_value_schema, validate_fields
@@ -55,14 +57,17 @@ class ServiceInstanceView(MethodView):
         :query key: Optional. The same as :ref:`config`.
         :query resolve: Optional. Resolve linked cluster or not. ``0`` or ``1``
                         ``0``: Don't resolve, ``1``: Resolve (default).
+        :query consistency: Optional. The same as :ref:`config`.
         :<header Authorization: Huskar Token (See :ref:`token`)
+        :>header X-Huskar-Data-Source: The same as :ref:`config`.
+        :status 400: The consistency level is unrecognized.
         :status 404: The application, cluster or key is not found.
         :status 200: The result is in the response.
         """
         check_application(application_name)
         check_cluster_name(cluster_name, application_name)
-        facade = InstanceFacade(SERVICE_SUBDOMAIN, application_name,
-                                include_comment=False)
+        facade = InstanceFacade.from_request(
+            SERVICE_SUBDOMAIN, application_name, include_comment=False)
         key = request.args.get('key')
         resolve = request.args.get('resolve', '1') != '0'
         validate_fields(instance_schema, {
@@ -77,11 +82,11 @@ class ServiceInstanceView(MethodView):
                 abort(404, '%s %s/%s/%s does not exist' % (
                     SERVICE_SUBDOMAIN, application_name, cluster_name, key,
                 ))
-            return api_response(instance)
+            return facade.make_response(instance)
         else:
             instance_list = facade.get_instance_list_by_cluster(
                 cluster_name, resolve=resolve)
-            return api_response(instance_list)
+            return facade.make_response(instance_list)
 
     @login_required
     def post(self, application_name, cluster_name):
@@ -230,13 +235,184 @@ class ServiceInstanceView(MethodView):
         runtime = request.values.get('runtime', type=json.loads)
         if runtime is None:
             abort(400, 'request data is not json format.')
-        if set(runtime) != {'state'}:
-            abort(400, 'runtime must contain state only.')
-        if runtime.get('state') not in ('up', 'down'):
-            abort(400, 'runtime state must be "up" or "down".')
+        try:
+            check_runtime(runtime)
+        except ServiceValueError as e:
+            abort(400, e.args[0])
         return runtime
 
 
+class ServiceInstanceBulkView(MethodView):
+    ENTRY_ERRORS = (ServiceValueError, ValidationError, HuskarApiException,
+                    OutOfSyncError, ContainerUnboundError)
+
+    @login_required
+    def post(self, application_name):
+        """Registers multiple service instances of an application at once.
+
+        The request body should be a JSON array. Each entry of it has the
+        same fields as the form of registering a single service instance::
+
+            [
+              {
+                "cluster": "stable",
+                "key": "10.0.0.1_5000",
+                "value": {"ip": "10.0.0.1", "port": {"main": 5000}},
+                "runtime": {"state": "up"},
+                "version": 1
+              }
+            ]
+
+        The ``value``, ``runtime`` and ``version`` are optional like the
+        single API, and the ``value`` and ``runtime`` could be JSON strings
+        also. The entries are written in pipelines, and the failure of an
+        entry does not affect others. The response looks like::
+
+            {
+              "status": "SUCCESS",
+              "message": "",
+              "data": [
+                {
+                  "cluster": "stable",
+                  "key": "10.0.0.1_5000",
+                  "status": "SUCCESS",
+                  "message": "",
+                  "data": {"value": {...}, "meta": {...}}
+                }
+              ]
+            }
+
+        The ``status`` of each entry could be ``SUCCESS``, ``BadRequest``,
+        ``ValidationError``, ``Conflict`` and other error names like the
+        single API.
+
+        :param application_name: The name of application.
+        :<header Authorization: Huskar Token (See :ref:`token`)
+        :<header Content-Type: :mimetype:`application/json`
+        :status 404: The application is not found.
+        :status 400: The request body is not a JSON array or too large.
+        :status 200: The results of entries are in the response.
+        """
+        check_application_auth(application_name, Authority.WRITE)
+        entries = request.get_json(silent=True)
+        if not isinstance(entries, list):
+            abort(400, 'request data should be a JSON array.')
+        max_size = settings.SERVICE_BULK_REGISTRY_MAX_SIZE
+        if len(entries) > max_size:
+            abort(400, 'the count of entries should not exceed %d.' % max_size)
+
+        results = [None] * len(entries)
+        accepted_indices = []
+        accepted_entries = []
+        seen = set()
+        for index, entry in enumerate(entries):
+            try:
+                entry = self._load_entry(application_name, entry)
+                cluster_name, key = entry[:2]
+                if (cluster_name, key) in seen:
+                    raise ServiceValueError('the entry is duplicated.')
+                seen.add((cluster_name, key))
+                if is_container_id(key):
+                    ServiceInstanceFacade(
+                        application_name, cluster_name, key
+                    ).register_container()
+            except self.ENTRY_ERRORS as e:
+                results[index] = self._make_error_result(entry, e)
+            else:
+                accepted_indices.append(index)
+                accepted_entries.append(entry)
+
+        audit_extras = []
+        saved = service_facade.save_many(application_name, accepted_entries)
+        for index, entry, (old_data, info) in zip(
+                accepted_indices, accepted_entries, saved):
+            if isinstance(info, Exception):
+                results[index] = self._make_error_result(entry, info)
+                continue
+            cluster_name, key = entry[:2]
+            results[index] = {
+                'cluster': cluster_name, 'key': key, 'status': u'SUCCESS',
+                'message': u'', 'data': {
+                    'value': info.data,
+                    'meta': InstanceFacade.make_meta_info(info),
+                }}
+            audit_extras.append(dict(
+                application_name=application_name, cluster_name=cluster_name,
+                key=key, old_data=old_data, new_data=json.dumps(info.data)))
+
+        audit_log.emit_many(audit_log.types.UPDATE_SERVICE, audit_extras)
+        return api_response(results)
+
+    def _load_entry(self, application_name, entry):
+        if not isinstance(entry, dict):
+            raise ServiceValueError('entry should be a JSON object.')
+        cluster_name = entry.get('cluster')
+        key = entry.get('key')
+        if not (isinstance(cluster_name, basestring) and
+                isinstance(key, basestring)):
+            raise ServiceValueError('"cluster" and "key" should be provided.')
+        key = key.strip()
+        check_cluster_name(cluster_name, application_name)
+        validate_fields(instance_schema, {
+            'application': application_name,
+            'cluster': cluster_name,
+            'key': key,
+        })
+        service_facade.check_cluster_name_in_creation(
+            application_name, cluster_name)
+
+        value = self._load_json_field(entry, 'value')
+        if value is not None:
+            value = service_value_schema.load(value).data
+        runtime = self._load_json_field(entry, 'runtime')
+        if runtime is not None:
+            check_runtime(runtime)
+        if not value and not runtime:
+            raise ServiceValueError(
+                'either "value" or "runtime" should be provided.')
+        version = entry.get('version')
+        if version is not None and not isinstance(version, (int, long)):
+            raise ServiceValueError('"version" should be an integer.')
+        return cluster_name, key, value, runtime, version
+
+    def _load_json_field(self, entry, name):
+        value = entry.get(name)
+        if isinstance(value, basestring):
+            try:
+                value = json.loads(value)
+            except ValueError:
+                raise ServiceValueError('request data is not json format.')
+        if value is not None and not isinstance(value, dict):
+            raise ServiceValueError('"%s" should be a JSON object.' % name)
+        return value
+
+    def _make_error_result(self, entry, error):
+        if isinstance(entry, dict):
+            cluster_name, key = entry.get('cluster'), entry.get('key')
+        elif isinstance(entry, tuple):
+            cluster_name, key = entry[:2]
+        else:
+            cluster_name, key = None, None
+
+        if isinstance(error, ServiceValueError):
+            status, message = u'BadRequest', error.args[0]
+        elif isinstance(error, ValidationError):
+            status, message = u'ValidationError', json.dumps(error.messages)
+        elif isinstance(error, HuskarApiException):
+            status = error.__class__.__name__
+            message = (next(iter(error.args), None) or
+                       getattr(error, 'message', None) or u'')
+        elif isinstance(error, OutOfSyncError):
+            status = u'Conflict'
+            message = u'resource is modified by another request'
+        else:
+            status = u'Conflict'
+            message = u'this container has been unbound recently'
+
+        return {'cluster': cluster_name, 'key': key, 'status': status,
+                'message': message, 'data': None}
+
+
 class ServiceInstanceWeightView(MethodView):
 
     @login_required
@@ -445,3 +621,10 @@ class ServiceInstanceFacade(object):
             old_data=old_data, new_data=json.dumps(new_data.data))
 
         return new_data
+
+
+def check_runtime(runtime):
+    if set(runtime) != {'state'}:
+        raise ServiceValueError('runtime must contain state only.')
+    if runtime.get('state') not in ('up', 'down'):
+        raise ServiceValueError('runtime state must be "up" or "down".')
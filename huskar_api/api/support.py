@@ -12,6 +12,7 @@ from huskar_api.models.auth import Authority
 from huskar_api.models.route.hijack import RouteHijack
 from huskar_api.models.instance import InstanceManagement
 from huskar_api.models.container import ContainerManagement
+from huskar_api.models.cache import cache_stats
 from huskar_api.models.exceptions import OutOfSyncError, NotEmptyError
 from huskar_api.service import service as service_facade
 from huskar_api.service.admin.application_auth import (
@@ -208,6 +209,47 @@ class BlacklistView(MethodView):
         return InstanceManagement(huskar_client, APP_NAME, CONFIG_SUBDOMAIN)
 
 
+class CacheStatsView(MethodView):
+    @login_required
+    def get(self):
+        """Gets the statistics of cache in the current process.
+
+        The statistics are aggregated since the process started. The caches
+        are grouped by kind, ``table`` for the table cache of models and
+        ``function`` for the cache on arguments.
+
+        The site admin authority is required. See :ref:`application_auth` also.
+
+        An example of response::
+
+            {
+              "status": "SUCCESS",
+              "data": {
+                "table": {
+                  "application": {
+                    "hit": 90,
+                    "miss": 10,
+                    "hit_rate": 0.9,
+                    "timings": {
+                      "get": {"count": 100, "mean": 0.8, "max": 3.2}
+                    },
+                    "payload": {"count": 100, "mean": 120.0, "max": 128}
+                  }
+                },
+                "function": {}
+              }
+            }
+
+        The ``mean`` and ``max`` of timings are in milliseconds, and those of
+        payload are in bytes.
+
+        :<header Authorization: Huskar Token (See :ref:`token`)
+        :status 200: The result is in the response.
+        """
+        g.auth.require_admin()
+        return api_response(cache_stats.snapshot())
+
+
 class RouteProgramView(MethodView):
     _KEY = 'ROUTE_HIJACK_LIST'
 
@@ -4,19 +4,24 @@ import datetime
 import random
 import logging
 import functools
+import itertools
 import contextlib
 
-from flask import abort, g, request, jsonify
+from flask import (
+    abort, g, request, json, jsonify, stream_with_context, Response)
+from werkzeug.exceptions import InternalServerError
 
 from huskar_api import settings
 from huskar_api.ext import sentry
 from huskar_api.models.audit import (
-    AuditLog, action_types, action_creator, logger as fallback_audit_logger)
+    AuditLog, action_types, action_creator, audit_log_writer,
+    logger as fallback_audit_logger)
 from huskar_api.models.exceptions import (
     AuditLogTooLongError, AuditLogLostError)
 from huskar_api.switch import (
     switch,
     SWITCH_ENABLE_AUDIT_LOG,
+    SWITCH_ENABLE_ASYNC_AUDIT_LOG,
     SWITCH_ENABLE_LONG_POLLING_MAX_LIFE_SPAN)
 from huskar_api.extras.email import EmailDeliveryError, deliver_email
 
@@ -31,6 +36,58 @@ def api_response(data=None, status=u'SUCCESS', message=u''):
     return response
 
 
+def api_stream_response(iterable, status=u'SUCCESS', message=u''):
+    """Makes an API response whose ``data`` is a JSON array streamed from
+    the iterable.
+
+    The items are serialized one by one and sent with chunked transfer
+    encoding, so the whole list never stays in memory. The first item is
+    pulled before the response starts, so the early errors still go to the
+    error handlers. If the iteration fails later, the array is closed and
+    the ``status`` at the end of document tells the error.
+    """
+    iterable = prefetch_iterable(iterable)
+    response = Response(
+        stream_with_context(iter_api_stream(iterable, status, message)),
+        mimetype='application/json')
+    mark_api_status_on_response(response, status=status)
+    return response
+
+
+def iter_api_stream(iterable, status, message):
+    yield '{"data": '
+    try:
+        for piece in iter_json_array(iterable):
+            yield piece
+    except Exception:
+        logger.exception('The streaming response is broken')
+        sentry.captureException()
+        error = InternalServerError()
+        status = error.name.replace(u' ', '')
+        message = error.description
+        yield ']'
+    yield ', ' + json.dumps({'status': status, 'message': message})[1:]
+
+
+def iter_json_array(iterable):
+    """Serializes the iterable into a JSON array piece by piece."""
+    yield '['
+    for index, item in enumerate(iterable):
+        yield (',' if index else '') + json.dumps(item)
+    yield ']'
+
+
+def prefetch_iterable(iterable):
+    """Pulls the first item of the iterable ahead.
+
+    :returns: An iterator of the same items.
+    """
+    iterator = iter(iterable)
+    for item in iterator:
+        return itertools.chain([item], iterator)
+    return iterator
+
+
 def mark_api_status_on_response(response, status=u'SUCCESS'):
     response._api_status = status
     return response
@@ -92,7 +149,10 @@ def audit_log(action_type, **extra):
                 '%s %s %r', g.auth.username, action_name, action.action_data)
         else:
             user_id = g.auth.id if g.auth else 0
-            AuditLog.create(user_id, request.remote_addr, action)
+            if switch.is_switched_on(SWITCH_ENABLE_ASYNC_AUDIT_LOG, False):
+                audit_log_writer.put(user_id, request.remote_addr, action)
+            else:
+                AuditLog.create(user_id, request.remote_addr, action)
     except AuditLogTooLongError:
         logger.info('Audit log is too long. %s %s %s',
                     action_types[action_type], g.auth.username,
@@ -113,8 +173,45 @@ def emit_audit_log(action_type, **extra):
         pass
 
 
+def emit_audit_logs(action_type, extras):
+    """Emits multiple audit logs of the same type at once.
+
+    :param action_type: The type of actions.
+    :param extras: A list of keyword arguments of :func:`emit_audit_log`.
+    """
+    if not switch.is_switched_on(SWITCH_ENABLE_AUDIT_LOG):
+        return
+    actions = [action_creator.make_action(action_type, **extra)
+               for extra in extras]
+    if not actions:
+        return
+    action_name = action_types[action_type]
+    try:
+        if g.auth.is_minimal_mode:
+            for action in actions:
+                fallback_audit_logger.info(
+                    '%s %s %r', g.auth.username, action_name,
+                    action.action_data)
+        else:
+            user_id = g.auth.id if g.auth else 0
+            if switch.is_switched_on(SWITCH_ENABLE_ASYNC_AUDIT_LOG, False):
+                for action in actions:
+                    audit_log_writer.put(user_id, request.remote_addr, action)
+            else:
+                AuditLog.create_many(user_id, request.remote_addr, actions)
+    except AuditLogLostError:
+        for action in actions:
+            fallback_audit_logger.info(
+                '%s %s %r', g.auth.username, action_name, action.action_data)
+        sentry.captureException(level=logging.WARNING)
+    except Exception:
+        logger.exception('Unexpected error of audit log')
+        sentry.captureException()
+
+
 audit_log.types = action_types
 audit_log.emit = emit_audit_log
+audit_log.emit_many = emit_audit_logs
 
 
 def deliver_email_safe(*args, **kwargs):
@@ -8,7 +8,7 @@ class MonitorClient(object):
     def timing(self, name, time, tags=None, upper_enable=True):
         pass
 
-    def increment(self, name, sample_rate=1, tags=None):
+    def increment(self, name, sample_rate=1, tags=None, value=1):
         pass
 
     def payload(self, name, data_length=0, tags=None):
@@ -9,18 +9,36 @@ from sqlalchemy.ext.declarative import declared_attr
 
 from huskar_api import settings
 from huskar_api.settings import ZK_SETTINGS
-from huskar_api.models.cache import Cache, cache_mixin
+from huskar_api.models.cache import (
+    Cache, LocalCacheClient, cache_mixin, batch_invalidation,
+    record_table_payload)
 from huskar_api.models.db import model_base, db_manager
 from .utils import make_cache_decorator
+from .znode import ZnodeModel, ZnodeCache
 
 __all__ = ['huskar_client', 'DBSession', 'DeclarativeBase', 'TimestampMixin',
-           'cache_manager', 'cache_on_arguments', 'CacheMixin']
+           'cache_manager', 'cache_on_arguments', 'CacheMixin',
+           'make_huskar_client', 'batch_invalidation']
+
+
+def make_huskar_client():
+    """Creates a client of Huskar SDK with an individual ZooKeeper session.
+
+    :returns: A started :class:`huskar_sdk_v2.bootstrap.client.BaseClient`.
+    """
+    client = BaseClient(
+        ZK_SETTINGS['servers'], ZK_SETTINGS['username'],
+        ZK_SETTINGS['password'], base_path=BASE_PATH, max_retries=-1)
+    client.start(ZK_SETTINGS['start_timeout'])
+    return client
+
 
 #: The client of Huskar SDK which manages the ZooKeeper sessions
-huskar_client = BaseClient(
-    ZK_SETTINGS['servers'], ZK_SETTINGS['username'], ZK_SETTINGS['password'],
-    base_path=BASE_PATH, max_retries=-1)
-huskar_client.start(ZK_SETTINGS['start_timeout'])
+huskar_client = make_huskar_client()
+
+if settings.ZNODE_CACHE_MAX_SIZE:
+    ZnodeModel.cache = ZnodeCache(
+        huskar_client.client, settings.ZNODE_CACHE_MAX_SIZE)
 
 #: The scoped session factory of SQLAlchemy
 DBSession = db_manager.get_session('default')
@@ -30,16 +48,26 @@ DeclarativeBase = model_base()
 DeclarativeBase.__table_args__ = {
     'mysql_character_set': 'utf8mb4', 'mysql_collate': 'utf8mb4_bin'}
 
-cache_manager = Cache(settings.CACHE_SETTINGS['default'])
+cache_manager = Cache(
+    settings.CACHE_SETTINGS['default'],
+    circuit_breaker_options=settings.CACHE_CIRCUIT_BREAKER_OPTIONS)
 
 #: The Redis raw client
 redis_client = cache_manager.make_client(raw=True)
 #: The decorator of Redis cache
 cache_on_arguments = make_cache_decorator(cache_manager.make_client(raw=True))
+#: The client of table cache, which may be fronted by an in-process cache
+table_cache_client = cache_manager.make_client(namespace='%s:v2' % __name__)
+table_cache_client.on_payload = record_table_payload
+if settings.TABLE_LOCAL_CACHE_MAX_SIZE:
+    table_cache_client = LocalCacheClient(
+        table_cache_client, redis_client,
+        channel='%s:v2:invalidation' % __name__,
+        max_size=settings.TABLE_LOCAL_CACHE_MAX_SIZE,
+        ttl=settings.TABLE_LOCAL_CACHE_EXPIRATION_TIME)
+    table_cache_client.spawn_subscribing_thread()
 #: The mixin class of Redis cache
-CacheMixin = cache_mixin(
-    cache=cache_manager.make_client(namespace='%s:v2' % __name__),
-    session=DBSession)
+CacheMixin = cache_mixin(cache=table_cache_client, session=DBSession)
 CacheMixin.TABLE_CACHE_EXPIRATION_TIME = settings.TABLE_CACHE_EXPIRATION_TIME
 
 
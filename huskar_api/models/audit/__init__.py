@@ -5,10 +5,11 @@ import logging
 from .action import action_types, action_creator
 from .rollback import action_rollback
 from .audit import AuditLog
+from .writer import audit_log_writer
 
 
 __all__ = ['action_types', 'action_creator', 'AuditLog', 'logger',
-           'action_rollback']
+           'action_rollback', 'audit_log_writer']
 
 
 logger = logging.getLogger(__name__)
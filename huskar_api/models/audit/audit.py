@@ -27,7 +27,8 @@ from .const import (
     SEVERITY_NORMAL, SEVERITY_DANGEROUS
 )
 from .index import (
-    AuditIndex, AuditIndexInstance, create_index, flush_index_cache)
+    AuditIndex, AuditIndexInstance, AuditIdPages, create_indices,
+    flush_index_cache)
 
 logger = logging.getLogger(__name__)
 
@@ -49,6 +50,8 @@ class AuditLog(TimestampMixin, CacheMixin, DeclarativeBase):
     # https://dev.mysql.com/doc/refman/5.7/en/storage-requirements.html
     MAX_AUDIT_LENGTH = 65530
 
+    # The primary key is (id, created_at) in the database, because the table
+    # is partitioned by the month of created_at. See huskar_api.scripts.audit
     id = Column(BigInteger, primary_key=True)
     user_id = Column(Integer, nullable=False, index=True)
     remote_addr = Column(Unicode(20, collation='utf8mb4_bin'), nullable=False)
@@ -88,8 +91,9 @@ class AuditLog(TimestampMixin, CacheMixin, DeclarativeBase):
             with DBSession().close_on_exit(False) as db:
                 db.add(instance)
                 db.flush()
-                for args in action_indices:
-                    create_index(db, instance.id, instance.created_at, args)
+                create_indices(db, [
+                    (instance.id, instance.created_at, args)
+                    for args in action_indices])
         except SQLAlchemyError:
             _publish_new_action(user_id, remote_addr, action)
             raise AuditLogLostError()
@@ -99,6 +103,74 @@ class AuditLog(TimestampMixin, CacheMixin, DeclarativeBase):
         _publish_new_action(user_id, remote_addr, action)
         return instance
 
+    @classmethod
+    def create_many(cls, user_id, remote_addr, actions):
+        """Creates multiple audit logs in one database transaction.
+
+        The actions which are too long to be stored will be skipped and
+        published only.
+
+        :param int user_id: The id of operator.
+        :param str remote_addr: The IP address of operator.
+        :param list actions: A list of action tuples. See
+                             :meth:`AuditLog.create`.
+        :raises AuditLogLostError: The audit logs could not be stored.
+        :returns: The list of created instances.
+        """
+        return cls.create_entries([
+            (user_id, remote_addr, action) for action in actions])
+
+    @classmethod
+    def create_entries(cls, entries):
+        """Creates audit logs of multiple operators in one transaction.
+
+        The audit logs are inserted in one transaction, and the indices are
+        inserted with multi-row statements.
+
+        :param list entries: A list of ``(user_id, remote_addr, action)``.
+                             See :meth:`AuditLog.create`.
+        :raises AuditLogLostError: The audit logs could not be stored.
+        :returns: The list of created instances.
+        """
+        pending = []
+        for user_id, remote_addr, action in entries:
+            action_type, action_data, action_indices = action
+            trace_all_application_events(action_type, action_data)
+            action_data = json.dumps(
+                action_data, sort_keys=True, ensure_ascii=False)
+            if len(action_data) >= cls.MAX_AUDIT_LENGTH:
+                logger.info('Audit log is too long. %s %s %s',
+                            action_types[action_type], user_id, remote_addr)
+                continue
+            instance = cls(
+                user_id=user_id, remote_addr=remote_addr,
+                action_type=action_type, action_data=action_data)
+            pending.append((instance, action_indices))
+
+        try:
+            with DBSession().close_on_exit(False) as db:
+                db.add_all([i for i, _ in pending])
+                db.flush()
+                create_indices(db, [
+                    (pending_instance.id, pending_instance.created_at, args)
+                    for pending_instance, indices in pending
+                    for args in indices])
+        except SQLAlchemyError:
+            for user_id, remote_addr, action in entries:
+                _publish_new_action(user_id, remote_addr, action)
+            raise AuditLogLostError()
+
+        flushed_index_cache = set()
+        for instance, action_indices in pending:
+            date = instance.created_at.date()
+            for index_args in action_indices:
+                if (date, index_args) not in flushed_index_cache:
+                    flushed_index_cache.add((date, index_args))
+                    flush_index_cache(date, index_args)
+        for user_id, remote_addr, action in entries:
+            _publish_new_action(user_id, remote_addr, action)
+        return [instance for instance, _ in pending]
+
     @classmethod
     def get_multi_and_prefetch(cls, ids):
         """Gets multiple instances and prefetches their nested instances.
@@ -122,36 +194,45 @@ class AuditLog(TimestampMixin, CacheMixin, DeclarativeBase):
         return instances
 
     @classmethod
-    def get_multi_by_index(cls, target_type, target_id):
+    def get_multi_by_index(cls, target_type, target_id, before_id=None):
         """Gets multiple instances from the audit indices.
 
         :param int target_type: The constant like :const:`AuditLog.TYPE_TEAM`.
         :param int target_id: The id of target model.
+        :param int before_id: Optional. The cursor of pagination. Only the
+                              instances whose id less than it are included.
         :returns: The list of instances.
         """
-        ids = AuditIndex.get_audit_ids(target_type, target_id)
+        ids = AuditIdPages(
+            AuditIndex.get_audit_ids, (target_type, target_id), before_id)
         return take_slice(cls.get_multi_and_prefetch, ids)
 
     @classmethod
-    def get_multi_by_index_with_date(cls, target_type, target_id, date):
+    def get_multi_by_index_with_date(cls, target_type, target_id, date,
+                                     before_id=None):
         ids = AuditIndex.get_audit_ids_by_date(target_type, target_id, date)
+        if before_id is not None:
+            ids = [audit_id for audit_id in ids if audit_id < before_id]
         return take_slice(
             cls.get_multi_and_prefetch, sorted(ids, reverse=True))
 
     @classmethod
     def get_multi_by_instance_index(
             cls, instance_type, application_id, cluster_name,
-            instance_key):
+            instance_key, before_id=None):
         """Gets multiple instances by instance information.
 
         :param application_id: The name of application instance.
         :param cluster_name: The name of cluster, it's optional.
         :param instance_key: The name of instance key.
         :param instance_type: The type of the instance.
+        :param before_id: Optional. The cursor of pagination. Only the
+                          instances whose id less than it are included.
         :returns: The list of instances.
         """
-        ids = AuditIndexInstance.get_audit_ids(
-            instance_type, application_id, cluster_name, instance_key)
+        ids = AuditIdPages(AuditIndexInstance.get_audit_ids, (
+            instance_type, application_id, cluster_name, instance_key),
+            before_id)
         return take_slice(cls.get_multi_and_prefetch, ids)
 
     @classmethod
@@ -1,6 +1,9 @@
 from __future__ import absolute_import
 
-from sqlalchemy import Column, Integer, BigInteger, Index, Unicode, cast, DATE
+import datetime
+
+from more_itertools import chunked
+from sqlalchemy import Column, Integer, BigInteger, Index, Unicode
 from sqlalchemy.dialects.mysql import TINYINT
 
 from huskar_api.models.db import UpsertMixin
@@ -11,6 +14,12 @@ from .const import (
     TYPE_SERVICE)
 
 
+#: The max count of rows in a multi-row upsert statement
+BATCH_SIZE = 500
+#: The count of audit ids in a page, and only the first page is cached
+PAGE_SIZE = 100
+
+
 class AuditIndex(TimestampMixin, UpsertMixin, DeclarativeBase):
     """The internal model of audit index.
 
@@ -20,8 +29,9 @@ class AuditIndex(TimestampMixin, UpsertMixin, DeclarativeBase):
 
     __tablename__ = 'audit_index'
     __table_args__ = (
+        # The "created_at" is the key of monthly partitions
         Index('ux_audit_index', 'target_id', 'target_type', 'audit_id',
-              unique=True),
+              'created_at', unique=True),
         DeclarativeBase.__table_args__,
     )
 
@@ -33,35 +43,71 @@ class AuditIndex(TimestampMixin, UpsertMixin, DeclarativeBase):
     target_type = Column(TINYINT, nullable=False)
 
     @classmethod
-    def create(cls, db, audit_id, created_at, target_type, target_id):
+    def make_row(cls, audit_id, created_at, target_type, target_id):
         assert target_type in cls.TYPE_CHOICES
         assert not (target_type == TYPE_SITE and target_id != 0)
-        stmt = cls.upsert().values(
+        return dict(
             audit_id=audit_id, target_id=target_id, target_type=target_type,
             created_at=created_at)
-        db.execute(stmt)
+
+    @classmethod
+    def create(cls, db, audit_id, created_at, target_type, target_id):
+        row = cls.make_row(audit_id, created_at, target_type, target_id)
+        cls.create_many(db, [row])
+
+    @classmethod
+    def create_many(cls, db, rows):
+        """Creates indices with multi-row upsert statements.
+
+        :param rows: A list of dictionaries made by :meth:`make_row`.
+        """
+        for chunk in chunked(rows, BATCH_SIZE):
+            db.execute(cls.upsert().values(chunk))
 
     @classmethod
     def flush_cache(cls, date, target_type, target_id):
-        cls.get_audit_ids.flush(target_type, target_id)
+        cls.get_first_page.flush(target_type, target_id)
         cls.get_audit_ids_by_date.flush(target_type, target_id, date)
 
+    @classmethod
+    def get_audit_ids(cls, target_type, target_id, before_id=None):
+        """Gets a page of audit ids in descending order.
+
+        :param before_id: Optional. The ids less than it are returned. The
+                          first page is returned if it is ``None``.
+        :returns: The list of at most :data:`PAGE_SIZE` ids.
+        """
+        if before_id is None:
+            return cls.get_first_page(target_type, target_id)
+        return cls._query_page(target_type, target_id, before_id)
+
     @classmethod
     @cache_on_arguments(5 * 60)
-    def get_audit_ids(cls, target_type, target_id):
-        db = DBSession()
-        rs = db.query(cls.audit_id).filter_by(
+    def get_first_page(cls, target_type, target_id):
+        return cls._query_page(target_type, target_id, None)
+
+    @classmethod
+    def _query_page(cls, target_type, target_id, before_id):
+        # The ORDER BY and LIMIT are served by the "ux_audit_index"
+        query = DBSession().query(cls.audit_id).filter_by(
             target_id=target_id, target_type=target_type)
-        return sorted((r[0] for r in rs), reverse=True)
+        if before_id is not None:
+            query = query.filter(cls.audit_id < before_id)
+        rs = query.order_by(cls.audit_id.desc()).limit(PAGE_SIZE)
+        return [r[0] for r in rs]
 
     @classmethod
     @cache_on_arguments(5 * 60)
     def get_audit_ids_by_date(cls, target_type, target_id, date):
+        # The range of "created_at" prunes the partitions to be scanned
+        since = datetime.datetime.combine(date, datetime.time())
+        until = since + datetime.timedelta(days=1)
         db = DBSession()
         rs = db.query(cls.audit_id).filter(
             cls.target_id == target_id,
             cls.target_type == target_type,
-            cast(cls.created_at, DATE) == date
+            cls.created_at >= since,
+            cls.created_at < until,
         )
         return sorted((r[0] for r in rs), reverse=True)
 
@@ -71,7 +117,8 @@ class AuditIndexInstance(TimestampMixin, UpsertMixin, DeclarativeBase):
     __tablename__ = 'audit_index_instance'
     __table_args__ = (
         Index('ux_audit_instance_key', 'application_id', 'instance_key',
-              'instance_type', 'cluster_name', 'audit_id', unique=True),
+              'instance_type', 'cluster_name', 'audit_id', 'created_at',
+              unique=True),
         DeclarativeBase.__table_args__,
     )
 
@@ -87,35 +134,102 @@ class AuditIndexInstance(TimestampMixin, UpsertMixin, DeclarativeBase):
     TYPE_CHOICES = (TYPE_CONFIG, TYPE_SWITCH, TYPE_SERVICE)
 
     @classmethod
-    def create(cls, db, audit_id, created_at, instance_type, application_id,
-               cluster_name, key):
+    def make_row(cls, audit_id, created_at, instance_type, application_id,
+                 cluster_name, key):
         assert instance_type in cls.TYPE_CHOICES
-        stmt = cls.upsert().values(
+        return dict(
             audit_id=audit_id, application_id=application_id,
             cluster_name=cluster_name, instance_key=key,
-            instance_type=instance_type)
-        db.execute(stmt)
+            instance_type=instance_type, created_at=created_at)
+
+    @classmethod
+    def create(cls, db, audit_id, created_at, instance_type, application_id,
+               cluster_name, key):
+        row = cls.make_row(
+            audit_id, created_at, instance_type, application_id,
+            cluster_name, key)
+        cls.create_many(db, [row])
+
+    @classmethod
+    def create_many(cls, db, rows):
+        """Creates indices with multi-row upsert statements.
+
+        :param rows: A list of dictionaries made by :meth:`make_row`.
+        """
+        for chunk in chunked(rows, BATCH_SIZE):
+            db.execute(cls.upsert().values(chunk))
 
     @classmethod
-    @cache_on_arguments(10 * 60)
     def get_audit_ids(cls, instance_type, application_id, cluster_name,
-                      instance_key):
+                      instance_key, before_id=None):
         """Get ids of :class:`.audit.AuditLog` by instance information.
         Regardless of cluster if the ``cluster_name`` is ``None``
+
+        :param before_id: Optional. The ids less than it are returned. The
+                          first page is returned if it is ``None``.
+        :returns: The list of at most :data:`PAGE_SIZE` ids.
         """
-        db = DBSession()
-        rs = db.query(cls.audit_id).filter_by(
+        args = (instance_type, application_id, cluster_name, instance_key)
+        if before_id is None:
+            return cls.get_first_page(*args)
+        return cls._query_page(*(args + (before_id,)))
+
+    @classmethod
+    @cache_on_arguments(10 * 60)
+    def get_first_page(cls, instance_type, application_id, cluster_name,
+                       instance_key):
+        return cls._query_page(
+            instance_type, application_id, cluster_name, instance_key, None)
+
+    @classmethod
+    def _query_page(cls, instance_type, application_id, cluster_name,
+                    instance_key, before_id):
+        # The ORDER BY and LIMIT are served by the "ux_audit_instance_key"
+        query = DBSession().query(cls.audit_id).filter_by(
             instance_type=instance_type, application_id=application_id,
             cluster_name=cluster_name, instance_key=instance_key)
-        return sorted((r[0] for r in rs), reverse=True)
+        if before_id is not None:
+            query = query.filter(cls.audit_id < before_id)
+        rs = query.order_by(cls.audit_id.desc()).limit(PAGE_SIZE)
+        return [r[0] for r in rs]
 
     @classmethod
     def flush_cache(cls, date, instance_type, application_id, cluster_name,
                     instance_key):
-        cls.get_audit_ids.flush(
+        cls.get_first_page.flush(
             instance_type, application_id, cluster_name, instance_key)
 
 
+class AuditIdPages(object):
+    """The audit ids which are fetched page by page in descending order.
+
+    It is iterable for many times, and could be sliced by
+    :func:`huskar_api.models.utils.take_slice` without loading all ids::
+
+        ids = AuditIdPages(AuditIndex.get_audit_ids, (TYPE_SITE, 0))
+        take_slice(AuditLog.mget, ids)[:100]
+
+    :param get_audit_ids: The ``get_audit_ids`` method of index model.
+    :param args: The arguments of ``get_audit_ids``.
+    :param before_id: Optional. The ids less than it are iterated.
+    """
+
+    def __init__(self, get_audit_ids, args, before_id=None):
+        self.get_audit_ids = get_audit_ids
+        self.args = args
+        self.before_id = before_id
+
+    def __iter__(self):
+        before_id = self.before_id
+        while True:
+            ids = self.get_audit_ids(*self.args, before_id=before_id)
+            for audit_id in ids:
+                yield audit_id
+            if len(ids) < PAGE_SIZE:
+                return
+            before_id = ids[-1]
+
+
 INDEX_MODELS_MAP = {
     TYPE_SITE: AuditIndex,
     TYPE_TEAM: AuditIndex,
@@ -131,6 +245,21 @@ def create_index(db, audit_id, created_at, index):
     model.create(db, audit_id, created_at, *index)
 
 
+def create_indices(db, items):
+    """Creates indices of audit logs in one round trip per model and chunk.
+
+    :param items: A list of ``(audit_id, created_at, index)`` tuples.
+    """
+    rows_map = {}
+    for audit_id, created_at, index in items:
+        model = INDEX_MODELS_MAP[index[0]]
+        row = model.make_row(audit_id, created_at, *index)
+        rows_map.setdefault(model, []).append(row)
+    for model in (AuditIndex, AuditIndexInstance):
+        if model in rows_map:
+            model.create_many(db, rows_map[model])
+
+
 def flush_index_cache(date, index):
     model = INDEX_MODELS_MAP[index[0]]
     model.flush_cache(date, *index)
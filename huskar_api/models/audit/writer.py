@@ -0,0 +1,301 @@
+from __future__ import absolute_import
+
+import atexit
+import collections
+import errno
+import fcntl
+import io
+import json
+import logging
+import os
+import uuid
+
+from gevent import spawn
+from gevent.queue import Queue, Empty, Full
+from more_itertools import chunked
+
+from huskar_api import settings
+from huskar_api.extras.monitor import monitor_client
+from huskar_api.extras.raven import capture_exception
+from huskar_api.models import DBSession
+from huskar_api.models.exceptions import AuditLogLostError
+from .action import Action, action_types
+from .audit import AuditLog
+
+
+logger = logging.getLogger(__name__)
+# The same logger of "huskar_api.models.audit.logger"
+fallback_logger = logging.getLogger('huskar_api.models.audit')
+
+
+def _dump_entry(entry):
+    user_id, remote_addr, action = entry
+    return [user_id, remote_addr, list(action)]
+
+
+def _load_entry(data):
+    user_id, remote_addr, (action_type, action_data, action_indices) = data
+    action_indices = [tuple(index) for index in action_indices]
+    return user_id, remote_addr, Action(
+        action_type, action_data, action_indices)
+
+
+def _load_spool_file(spool_file):
+    entries = collections.OrderedDict()
+    for line in spool_file:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            # The last line may be broken by a crash
+            continue
+        if 'seq' in record:
+            entries[record['seq']] = _load_entry(record['entry'])
+        else:
+            for seq in record['done']:
+                entries.pop(seq, None)
+    return entries.values()
+
+
+class AuditLogSpool(object):
+    """The append-only file of audit logs queued in a process.
+
+    An audit log is appended to the spool before it is queued, and its
+    sequence number is appended again once it has been handled. The file is
+    truncated whenever nothing is pending.
+
+    Each process holds an exclusive lock of its own spool file. The files
+    which could be locked by others belong to dead processes, and the audit
+    logs pending in them will be taken over. The lines are flushed to the
+    operating system instead of the disk, so a killed process loses nothing
+    but a crashed host may.
+
+    :param directory: The directory of spool files.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.path = None
+        self._file = None
+        self._seq = 0
+        self._pending = set()
+
+    def open(self):
+        try:
+            os.makedirs(self.directory)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+        # The process id may be reused in containers
+        self.path = os.path.join(self.directory, 'audit-%d-%s.spool' % (
+            os.getpid(), uuid.uuid4().hex[:8]))
+        self._file = io.open(self.path, 'ab')
+        fcntl.flock(self._file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+    def append(self, entry):
+        """Appends an audit log.
+
+        :param tuple entry: The ``(user_id, remote_addr, action)``.
+        :returns: The sequence number of the audit log.
+        """
+        self._seq += 1
+        self._write({'seq': self._seq, 'entry': _dump_entry(entry)})
+        self._pending.add(self._seq)
+        return self._seq
+
+    def done(self, seqs):
+        """Marks the audit logs as handled.
+
+        :param list seqs: The sequence numbers of audit logs.
+        """
+        self._pending.difference_update(seqs)
+        if self._pending:
+            self._write({'done': list(seqs)})
+        else:
+            self._file.truncate(0)
+
+    def take_over(self):
+        """Takes over the spool files of dead processes.
+
+        :returns: An iterator of the lists of pending audit logs. Each file
+                  is removed after the next one is requested.
+        """
+        for name in sorted(os.listdir(self.directory)):
+            path = os.path.join(self.directory, name)
+            if path == self.path or not name.endswith('.spool'):
+                continue
+            try:
+                spool_file = io.open(path, 'rb')
+            except IOError:
+                continue
+            with spool_file:
+                try:
+                    fcntl.flock(
+                        spool_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except IOError:
+                    continue  # The owner is alive
+                # The file may have been taken over by another process
+                # before it was locked here
+                if not os.path.exists(path) or os.stat(path).st_ino != \
+                        os.fstat(spool_file.fileno()).st_ino:
+                    continue
+                entries = _load_spool_file(spool_file)
+                logger.info('Take over %d audit logs from %s',
+                            len(entries), path)
+                yield entries
+                os.remove(path)
+
+    def _write(self, record):
+        self._file.write(json.dumps(record) + '\n')
+        self._file.flush()
+
+
+class AuditLogWriter(object):
+    """The background writer of audit logs.
+
+    The audit logs are put into a bounded queue in process, and written in
+    batches by a worker greenlet. So the write requests never wait for the
+    audit bookkeeping::
+
+        audit_log_writer.put(user_id, remote_addr, action)
+
+    The queued audit logs are kept in an :class:`AuditLogSpool` also, and
+    the ones left by a dead process are written by the writer started next.
+    Without the spool directory, the audit logs are written synchronously.
+
+    The caller is blocked for a while if the queue is full. The audit logs
+    which could not be queued or stored are written to the fallback logger.
+
+    :param maxsize: The max count of queued audit logs.
+    :param timeout: The seconds to wait for a full queue.
+    :param batch_size: The max count of audit logs in a transaction.
+    :param spool_dir: Optional. The directory of spool files.
+    """
+
+    def __init__(self, maxsize, timeout, batch_size, spool_dir=None):
+        self.queue = Queue(maxsize)
+        self.timeout = timeout
+        self.batch_size = batch_size
+        self.spool = AuditLogSpool(spool_dir) if spool_dir else None
+        self._running = False
+        self._worker = None
+        self._exit_hooked = False
+
+    def start(self):
+        if self._running:
+            return
+        if self.spool is not None and self.spool.path is None:
+            try:
+                self.spool.open()
+            except Exception:
+                logger.exception('Failed to open the spool of audit log')
+                capture_exception()
+                self.spool = None
+        self._running = True
+        self._worker = spawn(self._work)
+        if not self._exit_hooked:
+            self._exit_hooked = True
+            atexit.register(self.flush)
+
+    def stop(self):
+        self._running = False
+
+    def put(self, user_id, remote_addr, action):
+        """Queues an audit log to be written later.
+
+        :param int user_id: The id of operator.
+        :param str remote_addr: The IP address of operator.
+        :param tuple action: See :meth:`AuditLog.create`.
+        :returns: ``False`` if the queue overflowed.
+        """
+        self.start()
+        entry = (user_id, remote_addr, action)
+        if self.spool is None:
+            self.write([entry])
+            return True
+        seq = self.spool.append(entry)
+        try:
+            self.queue.put((seq, entry), timeout=self.timeout)
+        except Full:
+            monitor_client.increment('audit.writer.overflow')
+            self._fallback([entry])
+            self.spool.done([seq])
+            return False
+        return True
+
+    def flush(self):
+        """Writes all queued audit logs in the current greenlet."""
+        while True:
+            items = self._take()
+            if not items:
+                return
+            self._write_items(items)
+
+    def write(self, entries):
+        """Writes a batch of audit logs.
+
+        :param list entries: A list of ``(user_id, remote_addr, action)``.
+        """
+        try:
+            AuditLog.create_entries(entries)
+        except AuditLogLostError:
+            self._fallback(entries)
+            capture_exception(level=logging.WARNING)
+        except Exception:
+            logger.exception('Unexpected error of audit log')
+            self._fallback(entries)
+            capture_exception()
+        finally:
+            DBSession().close()
+        monitor_client.increment('audit.writer.written', value=len(entries))
+
+    def take_over(self):
+        """Writes the audit logs left in the spools of dead processes."""
+        if self.spool is None:
+            return
+        for entries in self.spool.take_over():
+            for chunk in chunked(entries, self.batch_size):
+                self.write(chunk)
+
+    def _write_items(self, items):
+        self.write([entry for _, entry in items])
+        self.spool.done([seq for seq, _ in items])
+
+    def _take(self, timeout=None):
+        items = []
+        try:
+            if timeout is not None:
+                items.append(self.queue.get(timeout=timeout))
+            while len(items) < self.batch_size:
+                items.append(self.queue.get_nowait())
+        except Empty:
+            pass
+        return items
+
+    def _work(self):
+        try:
+            self.take_over()
+        except Exception:
+            logger.exception('Failed to take over audit logs')
+            capture_exception()
+        while self._running:
+            items = self._take(timeout=1)
+            if not items:
+                continue
+            try:
+                self._write_items(items)
+            except Exception:
+                # The worker should keep going even if the spool is broken
+                logger.exception('Unexpected error of audit log writer')
+                capture_exception()
+
+    def _fallback(self, entries):
+        for user_id, _, action in entries:
+            fallback_logger.info(
+                '%s %s %r', user_id, action_types[action.action_type],
+                action.action_data)
+
+
+#: The writer shared in process
+audit_log_writer = AuditLogWriter(
+    settings.AUDIT_LOG_QUEUE_SIZE, settings.AUDIT_LOG_QUEUE_TIMEOUT,
+    settings.AUDIT_LOG_BATCH_SIZE, settings.AUDIT_LOG_SPOOL_DIR)
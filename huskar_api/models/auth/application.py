@@ -8,14 +8,14 @@ from huskar_sdk_v2.consts import SERVICE_SUBDOMAIN
 
 from huskar_api.models import (
     DeclarativeBase, TimestampMixin, CacheMixin, DBSession, cache_on_arguments,
-    huskar_client)
+    huskar_client, batch_invalidation)
 from huskar_api.models.db import UpsertMixin
 from huskar_api.models.signals import (
     team_will_be_archived, team_will_be_deleted)
 from huskar_api.models.exceptions import NameOccupiedError, OutOfSyncError
 from huskar_api.models.instance import InstanceManagement
 from huskar_api.models.const import SCOPE_APPLICATION
-from .team import Team, TeamNotEmptyError
+from .team import Team, TeamAdmin, TeamNotEmptyError
 from .user import User
 from .role import Authority
 
@@ -56,7 +56,7 @@ class Application(CacheMixin, DeclarativeBase):
         return cls.mget(ids)
 
     @classmethod
-    @cache_on_arguments(5 * 60)
+    @cache_on_arguments(5 * 60, negative_expiration_time=30)
     def get_id_by_name(cls, name):
         cond = (
             (cls.application_name == name) &
@@ -73,12 +73,31 @@ class Application(CacheMixin, DeclarativeBase):
         return sorted(r[0] for r in rs)
 
     @classmethod
-    @cache_on_arguments(5 * 60)
+    @cache_on_arguments(5 * 60, stale_time=60, redis_lock=True)
     def get_all_ids(cls):
         rs = DBSession().query(cls.id) \
                         .filter_by(status=cls.STATUS_ACTIVE).all()
         return sorted(r[0] for r in rs)
 
+    @classmethod
+    def get_authorized_ids(cls, user_id):
+        """Gets the ids of applications which a user can read or write.
+
+        It is equivalent to checking the ``READ`` and ``WRITE`` authority on
+        each application, but reads a few cached indexes instead of looking
+        up the authority of applications one by one.
+
+        :param user_id: The id of examined user.
+        :returns: A set of application ids.
+        """
+        user = User.get(user_id)
+        if user and user.is_admin:
+            return set(cls.get_all_ids())
+        ids = set(ApplicationAuth.get_application_ids(user_id))
+        for team_id in TeamAdmin.get_team_ids(user_id):
+            ids.update(cls.get_ids_by_team(team_id))
+        return ids
+
     def setup_default_zpath(self):
         im = InstanceManagement(
             huskar_client, self.application_name, SERVICE_SUBDOMAIN)
@@ -100,9 +119,10 @@ class Application(CacheMixin, DeclarativeBase):
                 db.add(instance)
         except IntegrityError:
             raise NameOccupiedError
-        cls.get_id_by_name.flush(application_name)
-        cls.get_ids_by_team.flush(team_id)
-        cls.get_all_ids.flush()
+        with batch_invalidation():
+            cls.get_id_by_name.flush(application_name)
+            cls.get_ids_by_team.flush(team_id)
+            cls.get_all_ids.flush()
         instance.setup_default_auth()
         instance.setup_default_zpath()
         return instance
@@ -110,26 +130,29 @@ class Application(CacheMixin, DeclarativeBase):
     @classmethod
     def delete(cls, application_id):
         application_id = int(application_id)
-        with DBSession().close_on_exit(False) as db:
-            application = cls.get(application_id)
-            auth_set = ApplicationAuth.search_by(
-                application_id=application_id)
-            for auth in auth_set:
-                db.delete(auth)
-            db.flush()
-            db.delete(application)
-        cls.get_id_by_name.flush(application.application_name)
-        cls.get_ids_by_team.flush(application.team_id)
-        cls.get_all_ids.flush()
-        cls.flush([application_id])
+        with batch_invalidation():
+            with DBSession().close_on_exit(False) as db:
+                application = cls.get(application_id)
+                auth_set = ApplicationAuth.search_by(
+                    application_id=application_id)
+                for auth in auth_set:
+                    db.delete(auth)
+                    ApplicationAuth.get_application_ids.flush(auth.user_id)
+                db.flush()
+                db.delete(application)
+            cls.get_id_by_name.flush(application.application_name)
+            cls.get_ids_by_team.flush(application.team_id)
+            cls.get_all_ids.flush()
+            cls.flush([application_id])
 
     def _set_status(self, status):
         with DBSession().close_on_exit(False):
             self.status = status
-        self.flush([self.id])
-        self.get_all_ids.flush()
-        self.get_ids_by_team.flush(self.team.id)
-        self.get_id_by_name.flush(self.application_name)
+        with batch_invalidation():
+            self.flush([self.id])
+            self.get_all_ids.flush()
+            self.get_ids_by_team.flush(self.team.id)
+            self.get_id_by_name.flush(self.application_name)
 
     def archive(self):
         self._set_status(self.STATUS_ARCHIVED)
@@ -150,8 +173,7 @@ class Application(CacheMixin, DeclarativeBase):
         orig_team_id = self.team_id
         with DBSession().close_on_exit(False):
             self.team_id = team_id
-        self.get_ids_by_team.flush(team_id)
-        self.get_ids_by_team.flush(orig_team_id)
+        self.get_ids_by_team.flush_many([(team_id,), (orig_team_id,)])
 
     @classmethod
     def check_default_user(cls, application_name):
@@ -310,11 +332,29 @@ class ApplicationAuth(TimestampMixin, CacheMixin, UpsertMixin,
         ids = cls.search_ids_by(authority, user_id, application_id)
         return ids[0] if ids else None
 
+    @classmethod
+    @cache_on_arguments(5 * 60)
+    def get_application_ids(cls, user_id):
+        """Gets the ids of applications which are granted to a user.
+
+        :param user_id: The id of owner.
+        :returns: A sorted list of application ids, whose ``READ`` or
+                  ``WRITE`` authority is granted to the user.
+        """
+        authorities = [Authority.READ.value, Authority.WRITE.value]
+        rs = DBSession().query(cls.application_id) \
+                        .filter(cls.user_id == user_id,
+                                cls.authority.in_(authorities)) \
+                        .distinct().all()
+        return sorted(r[0] for r in rs)
+
     @classmethod
     def flush_by(cls, authority, user_id, application_id):
         ids = cls.search_ids_by(authority, user_id, application_id)
-        cls.flush(ids)
-        cls.find_id.flush(authority, user_id, application_id)
+        with batch_invalidation():
+            cls.flush(ids)
+            cls.find_id.flush(authority, user_id, application_id)
+            cls.get_application_ids.flush(user_id)
 
     @classmethod
     def ensure(cls, authority, user_id, application_id):
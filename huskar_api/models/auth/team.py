@@ -11,7 +11,8 @@ from huskar_api.models.db import UpsertMixin
 from huskar_api.models.signals import (
     team_will_be_archived, team_will_be_deleted)
 from huskar_api.models import (
-    DeclarativeBase, CacheMixin, DBSession, cache_on_arguments)
+    DeclarativeBase, CacheMixin, DBSession, cache_on_arguments,
+    batch_invalidation)
 from huskar_api.models.exceptions import NameOccupiedError
 from .user import User
 from .role import Authority
@@ -43,7 +44,7 @@ class Team(CacheMixin, DeclarativeBase):
             return cls.get(team_id)
 
     @classmethod
-    @cache_on_arguments(5 * 60)
+    @cache_on_arguments(5 * 60, negative_expiration_time=30)
     def get_id_by_name(cls, name):
         cond = (
             (cls.team_name == name) &
@@ -52,7 +53,7 @@ class Team(CacheMixin, DeclarativeBase):
         return DBSession().query(cls.id).filter(cond).scalar()
 
     @classmethod
-    @cache_on_arguments(5 * 60)
+    @cache_on_arguments(5 * 60, stale_time=60, redis_lock=True)
     def get_all_ids(cls):
         rs = DBSession().query(cls.id) \
                         .filter_by(status=cls.STATUS_ACTIVE).all()
@@ -83,30 +84,33 @@ class Team(CacheMixin, DeclarativeBase):
         except IntegrityError:
             raise NameOccupiedError
 
-        cls.flush([instance.id])
-        cls.get_id_by_name.flush(instance.team_name)
-        cls.get_all_ids.flush()
+        with batch_invalidation():
+            cls.flush([instance.id])
+            cls.get_id_by_name.flush(instance.team_name)
+            cls.get_all_ids.flush()
         return instance
 
     def _set_status(self, status):
         with DBSession().close_on_exit(False):
             self.status = status
-        self.__class__.flush([self.id])
-        self.__class__.get_all_ids.flush()
-        self.__class__.get_id_by_name.flush(self.team_name)
+        with batch_invalidation():
+            self.__class__.flush([self.id])
+            self.__class__.get_all_ids.flush()
+            self.__class__.get_id_by_name.flush(self.team_name)
 
     @classmethod
     def delete(cls, team_id):
         team = cls.get(team_id)
-        with DBSession().close_on_exit(False) as db:
-            team_will_be_deleted.send(cls, db=db, team_id=team_id)
-            for user_id in TeamAdmin.get_user_ids(team_id):
-                TeamAdmin.discard(team_id, user_id)
-            db.query(cls).filter_by(id=team_id).delete()
-        if team is not None:  # can be skip safety (instance will be erased)
-            cls.get_id_by_name.flush(team.team_name)
-        cls.get_all_ids.flush()
-        cls.flush([team_id])
+        with batch_invalidation():
+            with DBSession().close_on_exit(False) as db:
+                team_will_be_deleted.send(cls, db=db, team_id=team_id)
+                for user_id in TeamAdmin.get_user_ids(team_id):
+                    TeamAdmin.discard(team_id, user_id)
+                db.query(cls).filter_by(id=team_id).delete()
+            if team is not None:  # can be skip safety (instance is erased)
+                cls.get_id_by_name.flush(team.team_name)
+            cls.get_all_ids.flush()
+            cls.flush([team_id])
 
     def rename_desc(self, new_desc):
         with DBSession().close_on_exit(False):
@@ -190,8 +194,9 @@ class TeamAdmin(CacheMixin, UpsertMixin, DeclarativeBase):
 
     @classmethod
     def flush_by(cls, team_id, user_id):
-        cls.get_user_ids.flush(team_id)
-        cls.get_team_ids.flush(user_id)
+        with batch_invalidation():
+            cls.get_user_ids.flush(team_id)
+            cls.get_team_ids.flush(user_id)
 
     @classmethod
     def ensure(cls, team_id, user_id):
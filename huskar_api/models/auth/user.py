@@ -12,7 +12,8 @@ from huskar_api import settings
 from huskar_api.extras.monitor import monitor_client
 from huskar_api.models.db import UpsertMixin
 from huskar_api.models import (
-    DeclarativeBase, TimestampMixin, CacheMixin, DBSession, cache_on_arguments)
+    DeclarativeBase, TimestampMixin, CacheMixin, DBSession, cache_on_arguments,
+    batch_invalidation)
 from huskar_api.models.exceptions import NameOccupiedError
 from huskar_api.models.signals import user_grant_admin, user_dismiss_admin
 
@@ -117,7 +118,7 @@ class User(TimestampMixin, CacheMixin, UpsertMixin, DeclarativeBase):
         return cls.mget(ids)
 
     @classmethod
-    @cache_on_arguments(5 * 60)
+    @cache_on_arguments(5 * 60, negative_expiration_time=30)
     def get_id_by_name(cls, name):
         return DBSession().query(cls.id).filter_by(
             username=name,
@@ -125,7 +126,7 @@ class User(TimestampMixin, CacheMixin, UpsertMixin, DeclarativeBase):
         ).scalar()
 
     @classmethod
-    @cache_on_arguments(5 * 60)
+    @cache_on_arguments(5 * 60, negative_expiration_time=30)
     def get_id_by_email(cls, email):
         return DBSession().query(cls.id).filter_by(
             email=email,
@@ -164,10 +165,11 @@ class User(TimestampMixin, CacheMixin, UpsertMixin, DeclarativeBase):
         except IntegrityError:
             raise NameOccupiedError
 
-        cls.flush([instance.id])
-        cls.get_id_by_name.flush(username)
-        cls.get_ids_of_normal.flush()
-        cls.get_id_by_email.flush(email)
+        with batch_invalidation():
+            cls.flush([instance.id])
+            cls.get_id_by_name.flush(username)
+            cls.get_ids_of_normal.flush()
+            cls.get_id_by_email.flush(email)
         return instance
 
     @classmethod
@@ -185,9 +187,10 @@ class User(TimestampMixin, CacheMixin, UpsertMixin, DeclarativeBase):
         instance = cls.get(rs.lastrowid)
         DBSession().refresh(instance)
 
-        cls.get_id_by_name.flush(application_name)
-        cls.get_ids_of_normal.flush()
-        cls.flush([instance.id])
+        with batch_invalidation():
+            cls.get_id_by_name.flush(application_name)
+            cls.get_ids_of_normal.flush()
+            cls.flush([instance.id])
 
         return instance
 
@@ -198,9 +201,11 @@ class User(TimestampMixin, CacheMixin, UpsertMixin, DeclarativeBase):
         with DBSession().close_on_exit(False):
             self.is_active = is_active
 
-        self.__class__.get_id_by_name.flush(self.username)
-        self.__class__.get_ids_of_normal.flush()
-        self.__class__.flush([self.id])
+        with batch_invalidation():
+            self.__class__.get_id_by_name.flush(self.username)
+            self.__class__.get_id_by_email.flush(self.email)
+            self.__class__.get_ids_of_normal.flush()
+            self.__class__.flush([self.id])
 
     def archive(self):
         self._set_active_status(is_active=False)
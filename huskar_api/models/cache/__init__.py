@@ -11,9 +11,16 @@ from sqlalchemy.orm.util import identity_key
 
 from .region import Cache
 from .hook import EventHook
+from .local import LocalCacheClient
+from .memo import ModelMemo, model_memo
+from .batch import InvalidationBatch, invalidation_batch, batch_invalidation
+from .stats import CacheStats, cache_stats, record_table_payload
 
 
-__all__ = ["Cache", "cache_mixin", "CacheMixinBase"]
+__all__ = ["Cache", "LocalCacheClient", "ModelMemo", "model_memo",
+           "InvalidationBatch", "invalidation_batch", "batch_invalidation",
+           "CacheStats", "cache_stats", "record_table_payload",
+           "cache_mixin", "CacheMixinBase"]
 
 
 logger = logging.getLogger(__name__)
@@ -95,9 +102,10 @@ class CacheMixinBase(object):
         _hit_counts = 0
         _objs = {}
         try:
-            vals = cls._cache_client.mget(
-                cls.gen_raw_key(id)
-                for id in pks)
+            with cls._stats_timer("mget"):
+                vals = cls._cache_client.mget(
+                    cls.gen_raw_key(id)
+                    for id in pks)
             if vals:
                 if from_raw:
                     cached = {
@@ -174,8 +182,11 @@ class CacheMixinBase(object):
 
     @classmethod
     def _statsd_incr(cls, key, val=1):
-        # TODO
-        pass
+        cache_stats.incr("table", cls.__tablename__, key, val)
+
+    @classmethod
+    def _stats_timer(cls, operation):
+        return cache_stats.timer("table", cls.__tablename__, operation)
 
     @classmethod
     def flush(cls, ids):
@@ -183,11 +194,12 @@ class CacheMixinBase(object):
 
         :param ids: a list of primary key values
         """
-        keys = itertools.chain(*[
+        keys = list(itertools.chain(*[
             (
                 cls.gen_raw_key(i),
-            ) for i in ids])
-        return cls._cache_client.delete(*keys)
+            ) for i in ids]))
+        model_memo.discard(keys)
+        return invalidation_batch.delete(cls._cache_client, *keys)
 
     @classmethod
     def from_cache(cls, rawdata):
@@ -221,10 +233,17 @@ class CacheMixinBase(object):
                     ident_key in cls._db_session.identity_map:
                 return cls._db_session.identity_map[ident_key]
 
+            # try load from memo of request
+            memo_val = model_memo.get(cls.gen_raw_key(_id))
+            if memo_val is not None:
+                return cls.from_cache(memo_val)
+
             try:
-                cached_val = cls._cache_client.get(cls.gen_raw_key(_id))
+                with cls._stats_timer("get"):
+                    cached_val = cls._cache_client.get(cls.gen_raw_key(_id))
                 if cached_val:
                     cls._statsd_incr("hit")
+                    model_memo.set(cls.gen_raw_key(_id), cached_val)
 
                     # load from cache
                     return cls.from_cache(cached_val)
@@ -238,6 +257,7 @@ class CacheMixinBase(object):
         obj = cls._db_session().query(cls).get(_id)
         if obj is not None:
             cls.set_raw(obj.__rawdata__, nx=True)
+            model_memo.set(cls.gen_raw_key(_id), obj.__rawdata__)
         return obj
 
     @classmethod
@@ -266,10 +286,18 @@ class CacheMixinBase(object):
                     if ident_key in cls._db_session.identity_map:
                         objs[i] = cls._db_session.identity_map[ident_key]
 
+            # load from memo of request
+            if model_memo.enabled:
+                for i in set(_ids) - set(objs):
+                    memo_val = model_memo.get(cls.gen_raw_key(i))
+                    if memo_val is not None:
+                        objs[i] = cls.from_cache(memo_val)
+
             # load from cache
             if len(_ids) > len(objs):
                 missed_ids = list(set(_ids) - set(objs))
                 _objs = cls._from_cache(missed_ids, from_raw=True)
+                cls._set_memo(_objs.values())
                 objs.update(_objs)
 
         lack_ids = set(_ids) - set(objs)
@@ -281,6 +309,7 @@ class CacheMixinBase(object):
                     query(cls).filter(pk.in_(lack_ids)).all()
                 if lack_objs:
                     cls.mset(lack_objs, nx=True)
+                    cls._set_memo(lack_objs)
 
                 cls._statsd_incr("miss", len(lack_ids))
 
@@ -292,6 +321,12 @@ class CacheMixinBase(object):
         # TODO hack to make mget return list
         return objs if as_dict else _dict2list(_ids, objs)
 
+    @classmethod
+    def _set_memo(cls, objs):
+        if model_memo.enabled:
+            for obj in objs:
+                model_memo.set(cls.gen_raw_key(obj.pk), obj.__rawdata__)
+
     @classmethod
     def mget_cache_only(cls, _ids, as_dict=False):
         if not _ids:
@@ -308,9 +343,11 @@ class CacheMixinBase(object):
         pk_name = cls.pk_name()
         ttl = expiration_time or cls.TABLE_CACHE_EXPIRATION_TIME
         key = cls.gen_raw_key(val[pk_name])
-        if nx:
-            return cls._cache_client.setnx(key, val, ex=ttl, nx=nx)
-        return cls._cache_client.set(key, val, expiration_time=ttl)
+        model_memo.discard([key])
+        with cls._stats_timer("set"):
+            if nx:
+                return cls._cache_client.setnx(key, val, ex=ttl, nx=nx)
+            return cls._cache_client.set(key, val, expiration_time=ttl)
 
     @classmethod
     def set_raw(cls, raw_val, expiration_time=None, nx=False):
@@ -338,11 +375,13 @@ class CacheMixinBase(object):
         objs = {
             cls.gen_raw_key(val.pk): val.__rawdata__ for val in vals
         }
+        model_memo.discard(objs)
         ttl = cls.TABLE_CACHE_EXPIRATION_TIME
-        if nx:
-            cls._cache_client.msetnx(objs, ex=ttl, nx=nx)
-            return
-        cls._cache_client.mset(objs, expiration_time=ttl)
+        with cls._stats_timer("mset"):
+            if nx:
+                cls._cache_client.msetnx(objs, ex=ttl, nx=nx)
+                return
+            cls._cache_client.mset(objs, expiration_time=ttl)
         return
 
     @classmethod
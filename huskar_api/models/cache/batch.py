@@ -0,0 +1,77 @@
+from __future__ import absolute_import
+
+import collections
+import contextlib
+import logging
+import threading
+
+from huskar_api.extras.raven import capture_exception
+
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidationBatch(object):
+    """The collector of cache invalidations in a unit of work.
+
+    The deleting of cache keys is deferred while a batch is open, and the
+    collected keys of each client are deleted in a single ``DEL`` command
+    once the outermost batch is closed::
+
+        with invalidation_batch.collect():
+            Application.get_all_ids.flush()
+            Application.flush([application_id])
+
+    The batch is local to the current greenlet. The keys are deleted even if
+    the unit of work raises an error, because an extra invalidation is
+    always safe.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    @property
+    def pending(self):
+        return getattr(self._local, 'pending', None)
+
+    @contextlib.contextmanager
+    def collect(self):
+        if self.pending is not None:
+            yield  # The nested batch is merged into the outermost one
+            return
+        self._local.pending = collections.OrderedDict()
+        try:
+            yield
+        finally:
+            pending, self._local.pending = self._local.pending, None
+            self._send(pending)
+
+    def delete(self, client, *keys):
+        """Deletes keys from a cache client, or defers it in a batch.
+
+        :param client: The cache client which has a ``delete`` method.
+        :param keys: The keys to be deleted.
+        :returns: The result of client if it is deleted at once.
+        """
+        pending = self.pending
+        if pending is None:
+            return client.delete(*keys)
+        pending_keys = pending.setdefault(id(client), (client, []))[1]
+        pending_keys.extend(keys)
+
+    def _send(self, pending):
+        for client, keys in pending.values():
+            keys = list(collections.OrderedDict.fromkeys(keys))
+            if not keys:
+                continue
+            try:
+                client.delete(*keys)
+            except Exception:
+                logger.exception('Failed to invalidate %r', keys)
+                capture_exception(level=logging.WARNING)
+
+
+#: The batch shared by all cache clients
+invalidation_batch = InvalidationBatch()
+#: The context manager to collect invalidations in a unit of work
+batch_invalidation = invalidation_batch.collect
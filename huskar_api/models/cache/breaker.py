@@ -0,0 +1,126 @@
+from __future__ import absolute_import
+
+import collections
+import contextlib
+import logging
+import time
+
+from redis.exceptions import ConnectionError, TimeoutError
+
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(ConnectionError):
+    """The call is rejected because the circuit breaker is open."""
+
+
+class CircuitBreaker(object):
+    """The circuit breaker of a redis client.
+
+    The breaker is opened if the rate of failed calls exceeds a threshold in
+    the recent seconds. A call is failed if it raises a connection error or
+    costs too much time. While the breaker is open, all calls are rejected
+    with :exc:`CircuitOpenError` at once. After a while the breaker turns
+    half-open, and lets a single call probe the server. It will be closed if
+    the probe succeeds, or opened again if not::
+
+        breaker = CircuitBreaker('redis_1')
+        if not breaker.allow():
+            raise CircuitOpenError()
+        with breaker.watch():
+            client.get('foo')
+
+    :param name: The name of breaker in logs.
+    :param error_rate: The threshold of failed rate to open the breaker.
+    :param slow_call_time: The seconds to consider a call as failed.
+    :param min_calls: The min count of calls in window to open the breaker.
+    :param window: The seconds of recent calls to calculate the failed rate.
+    :param open_time: The seconds to reject calls before probing.
+    """
+
+    STATE_CLOSED = 'closed'
+    STATE_OPEN = 'open'
+    STATE_HALF_OPEN = 'half-open'
+
+    def __init__(self, name, error_rate=0.5, slow_call_time=0.5,
+                 min_calls=20, window=10, open_time=5):
+        self.name = name
+        self.error_rate = error_rate
+        self.slow_call_time = slow_call_time
+        self.min_calls = min_calls
+        self.window = window
+        self.open_time = open_time
+        self.state = self.STATE_CLOSED
+        self.opened_at = 0
+        self.probed_at = 0
+        # The buckets of [second, count of calls, count of failed calls]
+        self.buckets = collections.deque()
+
+    def allow(self):
+        """Checks whether a call is allowed now."""
+        if self.state == self.STATE_CLOSED:
+            return True
+        now = time.time()
+        if self.state == self.STATE_OPEN:
+            if now < self.opened_at + self.open_time:
+                return False
+            self._transit(self.STATE_HALF_OPEN)
+        # A single probe is in flight. The lost probe is replaced after a
+        # while in case it is interrupted without any outcome.
+        if now < self.probed_at + self.open_time:
+            return False
+        self.probed_at = now
+        return True
+
+    def record(self, failed):
+        """Records the outcome of an allowed call.
+
+        :param failed: ``True`` if the call is failed.
+        """
+        if self.state == self.STATE_HALF_OPEN:
+            self._transit(self.STATE_OPEN if failed else self.STATE_CLOSED)
+            return
+        if self.state == self.STATE_OPEN:
+            return  # The call was started before opening
+
+        now = int(time.time())
+        while self.buckets and self.buckets[0][0] <= now - self.window:
+            self.buckets.popleft()
+        if not self.buckets or self.buckets[-1][0] != now:
+            self.buckets.append([now, 0, 0])
+        self.buckets[-1][1] += 1
+        self.buckets[-1][2] += int(failed)
+
+        if not failed:
+            return
+        calls = sum(bucket[1] for bucket in self.buckets)
+        failed_calls = sum(bucket[2] for bucket in self.buckets)
+        if calls >= self.min_calls and \
+                failed_calls >= calls * self.error_rate:
+            self._transit(self.STATE_OPEN)
+
+    @contextlib.contextmanager
+    def watch(self):
+        """Records the outcome of the call in context."""
+        started_at = time.time()
+        try:
+            yield
+        except (ConnectionError, TimeoutError):
+            self.record(failed=True)
+            raise
+        except Exception:
+            # The server is reachable if it responds any error
+            self.record(failed=False)
+            raise
+        else:
+            elapsed = time.time() - started_at
+            self.record(failed=elapsed >= self.slow_call_time)
+
+    def _transit(self, state):
+        logger.warning('Circuit breaker of %s is %s', self.name, state)
+        self.state = state
+        self.buckets.clear()
+        self.probed_at = 0
+        if state == self.STATE_OPEN:
+            self.opened_at = time.time()
@@ -9,6 +9,8 @@ from redis import RedisError
 from redis.client import StrictPipeline, StrictRedis
 from redis.connection import ConnectionPool
 
+from .breaker import CircuitBreaker, CircuitOpenError
+
 
 logger = logging.getLogger(__name__)
 
@@ -36,9 +38,11 @@ class RedisConnectionPoolMixin(object):
             kwargs['max_connections'] = 100
 
         kwargs.pop('timeout', None)
+        circuit_breaker_options = kwargs.pop('circuit_breaker_options', None)
 
         connection_pool = ConnectionPool.from_url(url, db=db, **kwargs)
-        return cls(connection_pool=connection_pool)
+        return cls(connection_pool=connection_pool,
+                   circuit_breaker_options=circuit_breaker_options)
 
 
 class _FaultTolerantMeta(type):
@@ -62,6 +66,8 @@ class _FaultTolerantMeta(type):
 
             try:
                 return func(self, *orig_args, **kw)
+            except CircuitOpenError:
+                return fallback(*args, **kw)
             except RedisError as e:
                 a = ", ".join(repr(a) for a in args) if args else ''
                 k = ", ".join("{}={!r}".format(k, v)
@@ -105,6 +111,10 @@ def _zero(*args, **kwargs):
 class FaultTolerantStrictRedis(RedisConnectionPoolMixin, StrictRedis):
     """Return fallbacks when actual methods failed.
 
+    All commands and pipelines are guarded by a circuit breaker of the
+    client. While the breaker is open, the covered methods return their
+    fallbacks at once, and the others raise :exc:`CircuitOpenError`.
+
     .. note::
 
         ``help(<method>)`` can not get true function signature of original
@@ -128,7 +138,7 @@ class FaultTolerantStrictRedis(RedisConnectionPoolMixin, StrictRedis):
         ("ttl", _zero),
     ]
 
-    def __init__(self, **kwargs):
+    def __init__(self, circuit_breaker_options=None, **kwargs):
         if kwargs.get('connection_pool') is not None:
             self.host = kwargs['connection_pool'].connection_kwargs.\
                 get('host', 'UNKOWN')
@@ -138,30 +148,49 @@ class FaultTolerantStrictRedis(RedisConnectionPoolMixin, StrictRedis):
             self.host = kwargs.get('host', 'localhost')
             self.port = kwargs.get('port', 6379)
         self.url = "%s_%s" % (self.host.replace('.', '_'), self.port)
+        self.circuit_breaker = CircuitBreaker(
+            self.url, **(circuit_breaker_options or {}))
         kwargs['max_connections'] = 100
         super(FaultTolerantStrictRedis, self).__init__(**kwargs)
 
     def pipeline(self, transaction=False, shard_hint=None):
-        return FaultTolerantPipeline(
+        pipe = FaultTolerantPipeline(
             self.connection_pool,
             self.response_callbacks,
             transaction,
             shard_hint)
+        pipe.circuit_breaker = self.circuit_breaker
+        return pipe
 
     def execute_command(self, *args, **options):
-        res = super(FaultTolerantStrictRedis,
-                    self).execute_command(*args, **options)
+        if not self.circuit_breaker.allow():
+            raise CircuitOpenError(
+                'Circuit breaker of %s is open' % self.url)
+        with self.circuit_breaker.watch():
+            res = super(FaultTolerantStrictRedis,
+                        self).execute_command(*args, **options)
         return res
 
 
 class FaultTolerantPipeline(StrictPipeline):
 
+    circuit_breaker = None
+
     def execute(self, raise_on_error=True):
         commands = len(self.command_stack)
 
+        breaker = self.circuit_breaker
+        if breaker is not None and not breaker.allow():
+            self.reset()
+            return list(itertools.repeat(None, commands))
+
         try:
-            return super(FaultTolerantPipeline,
-                         self).execute(raise_on_error)
+            if breaker is None:
+                return super(FaultTolerantPipeline,
+                             self).execute(raise_on_error)
+            with breaker.watch():
+                return super(FaultTolerantPipeline,
+                             self).execute(raise_on_error)
         except Exception as exc:
             logger.exception(exc)
             return list(itertools.repeat(None, commands))
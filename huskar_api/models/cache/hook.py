@@ -6,6 +6,8 @@ import itertools
 from meepo2.signals import signal
 from meepo2.apps.eventsourcing import sqlalchemy_es_pub
 
+from .batch import batch_invalidation
+
 
 def catch_cache_update_exc(func):
     @functools.wraps(func)
@@ -89,11 +91,13 @@ class EventHook(sqlalchemy_es_pub):
 
     # after commit
     def session_commit(self, session):
-        if getattr(session, "pending_rawdata", None):
-            self._pub_cache_events("rawdata", session.pending_rawdata)
-            del session.pending_rawdata
+        # the deleted objects are flushed in one round trip
+        with batch_invalidation():
+            if getattr(session, "pending_rawdata", None):
+                self._pub_cache_events("rawdata", session.pending_rawdata)
+                del session.pending_rawdata
 
-        super(EventHook, self).session_commit(session)
+            super(EventHook, self).session_commit(session)
 
     # after rollback
     def session_rollback(self, session):
@@ -0,0 +1,166 @@
+from __future__ import absolute_import
+
+import collections
+import json
+import logging
+import time
+
+import gevent
+
+from huskar_api.extras.raven import capture_exception
+
+
+logger = logging.getLogger(__name__)
+
+
+class LocalCacheClient(object):
+    """The in-process cache in front of a wrapped redis client.
+
+    It works as the first tier of table cache. The values are kept in a
+    bounded LRU dictionary with a short TTL. Any writing and deleting will
+    publish the invalidated keys on a redis channel, which all processes
+    subscribe to drop their local copies::
+
+        client = LocalCacheClient(
+            cache_manager.make_client(namespace='foo'), redis_client,
+            channel='foo:invalidation', max_size=10000, ttl=5)
+        client.spawn_subscribing_thread()
+
+    :param client: The wrapped redis client of table cache.
+    :param redis_client: The raw redis client for pub/sub.
+    :param channel: The name of invalidation channel.
+    :param max_size: The max count of local entries.
+    :param ttl: The max seconds of keeping a local entry.
+    """
+
+    def __init__(self, client, redis_client, channel, max_size, ttl):
+        assert max_size > 0
+        self.client = client
+        self.redis_client = redis_client
+        self.channel = channel
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = collections.OrderedDict()
+        self.invalidation_seq = 0
+
+    def __contains__(self, raw_key):
+        return self._get_local(raw_key) is not None
+
+    def _get_local(self, raw_key):
+        entry = self.entries.pop(raw_key, None)
+        if entry is None:
+            return
+        expires_at, value = entry
+        if expires_at < time.time():
+            return
+        self.entries[raw_key] = entry
+        return entry
+
+    def _set_local(self, raw_key, value, seq=None):
+        # The value may be outdated if any key was invalidated during
+        # fetching, so we do not keep it.
+        if seq is not None and seq != self.invalidation_seq:
+            return
+        if value is None:
+            return
+        self.entries.pop(raw_key, None)
+        self.entries[raw_key] = (time.time() + self.ttl, value)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def _discard_local(self, raw_keys):
+        self.invalidation_seq += 1
+        for raw_key in raw_keys:
+            self.entries.pop(raw_key, None)
+
+    def clear(self):
+        """Drops all local entries."""
+        self.invalidation_seq += 1
+        self.entries.clear()
+
+    def publish(self, raw_keys):
+        """Invalidates keys in all processes."""
+        self._discard_local(raw_keys)
+        try:
+            self.redis_client.publish(self.channel, json.dumps(raw_keys))
+        except Exception:
+            logger.exception('Failed to publish invalidation %r', raw_keys)
+            capture_exception(level=logging.WARNING)
+
+    def get(self, raw_key, **kwargs):
+        entry = self._get_local(raw_key)
+        if entry is not None:
+            return entry[1]
+        seq = self.invalidation_seq
+        value = self.client.get(raw_key, **kwargs)
+        self._set_local(raw_key, value, seq)
+        return value
+
+    def mget(self, raw_keys, **kwargs):
+        raw_keys = list(raw_keys)
+        values = {}
+        for raw_key in raw_keys:
+            entry = self._get_local(raw_key)
+            if entry is not None:
+                values[raw_key] = entry[1]
+        missed_keys = [k for k in raw_keys if k not in values]
+        if missed_keys:
+            seq = self.invalidation_seq
+            missed_values = self.client.mget(missed_keys, **kwargs)
+            for raw_key, value in zip(missed_keys, missed_values):
+                self._set_local(raw_key, value, seq)
+                values[raw_key] = value
+        return [values.get(k) for k in raw_keys]
+
+    def set(self, raw_key, val, *args, **kwargs):
+        result = self.client.set(raw_key, val, *args, **kwargs)
+        self.publish([raw_key])
+        return result
+
+    def mset(self, mapping, *args, **kwargs):
+        result = self.client.mset(mapping, *args, **kwargs)
+        self.publish(list(mapping))
+        return result
+
+    def setnx(self, key, val, *args, **kwargs):
+        # The value is filled by a missed reading, not a changing
+        return self.client.setnx(key, val, *args, **kwargs)
+
+    def msetnx(self, mapping, *args, **kwargs):
+        return self.client.msetnx(mapping, *args, **kwargs)
+
+    def delete(self, *raw_keys):
+        result = self.client.delete(*raw_keys)
+        self.publish(list(raw_keys))
+        return result
+
+    def _handle_message(self, message):
+        if message.get('type') != 'message':
+            return
+        try:
+            raw_keys = json.loads(message['data'])
+        except (TypeError, ValueError):
+            logger.warning('Unrecognized invalidation %r', message)
+            return
+        self._discard_local(raw_keys)
+
+    def _run_subscribing(self, retry_interval):
+        while True:
+            pubsub = self.redis_client.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(self.channel)
+                # The invalidations may be missed before subscribed
+                self.clear()
+                for message in pubsub.listen():
+                    self._handle_message(message)
+            except Exception:
+                logger.exception('Failed to subscribe %s', self.channel)
+                capture_exception(level=logging.WARNING)
+            finally:
+                self.clear()
+                pubsub.close()
+            gevent.sleep(retry_interval)
+
+    def spawn_subscribing_thread(self, retry_interval=1):
+        """Spawns a greenlet to receive invalidations of other processes."""
+        return gevent.spawn(self._run_subscribing, retry_interval)
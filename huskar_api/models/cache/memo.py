@@ -0,0 +1,61 @@
+from __future__ import absolute_import
+
+import threading
+
+
+class ModelMemo(object):
+    """The identity map of cached rows in the scope of a request.
+
+    The same rows are usually fetched several times in a request, but the
+    identity map of SQLAlchemy is dropped once the session is closed. The
+    memo keeps the raw data of fetched rows to save the round trips of
+    table cache::
+
+        model_memo.enable()
+        try:
+            handle_request()
+        finally:
+            model_memo.disable()
+
+    It is disabled by default, so the background greenlets never read the
+    rows which may be outdated.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    @property
+    def entries(self):
+        return getattr(self._local, 'entries', None)
+
+    @property
+    def enabled(self):
+        return self.entries is not None
+
+    def enable(self):
+        """Enables the memo with nothing in the current greenlet."""
+        self._local.entries = {}
+
+    def disable(self):
+        """Disables the memo and drops all rows in the current greenlet."""
+        self._local.entries = None
+
+    def get(self, raw_key):
+        entries = self.entries
+        if entries is not None:
+            return entries.get(raw_key)
+
+    def set(self, raw_key, rawdata):
+        entries = self.entries
+        if entries is not None and rawdata is not None:
+            entries[raw_key] = rawdata
+
+    def discard(self, raw_keys):
+        entries = self.entries
+        if entries is not None:
+            for raw_key in raw_keys:
+                entries.pop(raw_key, None)
+
+
+#: The memo shared by all cached models
+model_memo = ModelMemo()
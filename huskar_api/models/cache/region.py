@@ -1,25 +1,54 @@
 from __future__ import absolute_import
 
 import bz2
+import zlib
 import cPickle as pickle
 import urlparse
 import logging
 
+from huskar_api import settings
 from .client import FaultTolerantStrictRedis
 
 logger = logging.getLogger(__name__)
 
 
-# enable zlib with level 6
+#: The headers of versioned payloads. The legacy payloads without header are
+#: compressed by bz2, which always start with ``BZh``.
+CODEC_HEADER_RAW = b'\x01p'
+CODEC_HEADER_ZLIB = b'\x01z'
+CODEC_HEADER_LENGTH = 2
+
+#: The pickled data smaller than it will not be compressed. See also
+#: ``tools/benchmark/cache_codec.py``.
+COMPRESS_THRESHOLD = 1024
+COMPRESS_LEVEL = 1
+
+
 def zdumps(x):
-    return bz2.compress(pickle.dumps(x, pickle.HIGHEST_PROTOCOL), 6)
+    data = pickle.dumps(x, pickle.HIGHEST_PROTOCOL)
+    # The versioned payloads could not be read by the previous release, so
+    # they are written only after all processes have been upgraded.
+    if not settings.CACHE_VERSIONED_CODEC:
+        return bz2.compress(data, 6)
+    if len(data) < COMPRESS_THRESHOLD:
+        return CODEC_HEADER_RAW + data
+    return CODEC_HEADER_ZLIB + zlib.compress(data, COMPRESS_LEVEL)
 
 
 def zloads(x):
+    header = x[:CODEC_HEADER_LENGTH]
+    if header == CODEC_HEADER_RAW:
+        return pickle.loads(x[CODEC_HEADER_LENGTH:])
+    if header == CODEC_HEADER_ZLIB:
+        return pickle.loads(zlib.decompress(x[CODEC_HEADER_LENGTH:]))
     return pickle.loads(bz2.decompress(x))
 
 
 class _RedisWrapper(object):
+    #: The optional callback to record the size of encoded values. It accepts
+    #: the raw key and the size.
+    on_payload = None
+
     def __init__(self, dsn, namespace=None, socket_timeout=1,
                  socket_connect_timeout=3, **kwargs):
         self.namespace = namespace
@@ -32,15 +61,29 @@ class _RedisWrapper(object):
             return raw_key
         return "{0}:{1}".format(self.namespace, raw_key)
 
+    def _dumps(self, raw_key, val, dumps):
+        data = dumps(val)
+        if self.on_payload is not None:
+            self.on_payload(raw_key, len(data))
+        return data
+
+    def _loads(self, raw_key, data, loads):
+        if self.on_payload is not None:
+            self.on_payload(raw_key, len(data))
+        return loads(data)
+
     def set(self, raw_key, val, expiration_time=None, dumps=zdumps):
-        return self.client.set(self._keygen(raw_key), dumps(val),
+        return self.client.set(self._keygen(raw_key),
+                               self._dumps(raw_key, val, dumps),
                                expiration_time)
 
     def setnx(self, key, val, ex=None, nx=True, dumps=zdumps):
-        return self.client.set(self._keygen(key), dumps(val), ex=ex, nx=nx)
+        return self.client.set(self._keygen(key),
+                               self._dumps(key, val, dumps), ex=ex, nx=nx)
 
     def msetnx(self, mapping, ex=None, nx=True, dumps=zdumps):
-        mapping = {self._keygen(k): dumps(v) for k, v in mapping.items()}
+        mapping = {self._keygen(k): self._dumps(k, v, dumps)
+                   for k, v in mapping.items()}
         with self.client.pipeline(transaction=False) as p:
             for k, v in mapping.items():
                 p.set(k, v, ex=ex, nx=nx)
@@ -50,7 +93,8 @@ class _RedisWrapper(object):
         if not mapping:
             return
 
-        mapping = {self._keygen(k): dumps(v) for k, v in mapping.items()}
+        mapping = {self._keygen(k): self._dumps(k, v, dumps)
+                   for k, v in mapping.items()}
         if not expiration_time:
             self.client.mset(mapping)
         else:
@@ -62,15 +106,16 @@ class _RedisWrapper(object):
     def get(self, raw_key, loads=zloads):
         val = self.client.get(self._keygen(raw_key))
         if val:
-            return loads(val)
+            return self._loads(raw_key, val, loads)
 
     def mget(self, raw_keys, loads=zloads):
         if not raw_keys:
             return []
 
+        raw_keys = list(raw_keys)
         keys = (self._keygen(k) for k in raw_keys)
-        return [loads(v) if v is not None else v
-                for v in self.client.mget(keys)]
+        return [self._loads(k, v, loads) if v is not None else v
+                for k, v in zip(raw_keys, self.client.mget(keys))]
 
     def delete(self, *raw_keys):
         if not raw_keys:
@@ -111,10 +156,14 @@ class Cache(object):
 
     :param name: service name, should set on settings
     :param namespace: cache client namespace
+    :param circuit_breaker_options: the options of circuit breaker in each
+                                    client
     """
     def __init__(self, url, namespace=None, socket_timeout=1,
-                 socket_connect_timeout=3, max_pool_size=100, timeout=5):
+                 socket_connect_timeout=3, max_pool_size=100, timeout=5,
+                 circuit_breaker_options=None):
         self._socket_timeout = socket_timeout
+        self._circuit_breaker_options = circuit_breaker_options
         self._socket_connect_timeout = socket_connect_timeout
         self._max_connections = max_pool_size
         self._timeout = timeout
@@ -155,9 +204,12 @@ class Cache(object):
                 self._dsn, socket_timeout=socket_timeout,
                 socket_connect_timeout=socket_connect_timeout,
                 max_connections=self._max_connections,
-                timeout=self._timeout)
+                timeout=self._timeout,
+                circuit_breaker_options=self._circuit_breaker_options)
 
         return _RedisWrapper(self._dsn, namespace or self.namespace,
                              socket_timeout, socket_connect_timeout,
                              max_connections=self._max_connections,
-                             timeout=self._timeout)
+                             timeout=self._timeout,
+                             circuit_breaker_options=(
+                                 self._circuit_breaker_options))
@@ -0,0 +1,113 @@
+from __future__ import absolute_import
+
+import collections
+import contextlib
+import time
+
+from huskar_api.extras.monitor import monitor_client
+
+
+class _Summary(object):
+    __slots__ = ('count', 'total', 'max')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def to_dict(self):
+        mean = float(self.total) / self.count if self.count else 0
+        return {'count': self.count, 'mean': mean, 'max': self.max}
+
+
+class CacheStats(object):
+    """The statistics of cache usage.
+
+    All numbers are emitted through :data:`monitor_client` and aggregated in
+    process, which is useful to tune the expiration of caches. The cache is
+    identified by a kind and a name, e.g. ``('table', 'application')`` for
+    the table cache or ``('function', 'huskar_api.models.auth.team:get_id')``
+    for the ``cache_on_arguments``::
+
+        cache_stats.incr('table', 'application', 'hit')
+        with cache_stats.timer('table', 'application', 'get'):
+            client.get(key)
+        cache_stats.payload('table', 'application', len(data))
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.counters = collections.defaultdict(collections.Counter)
+        self.timings = collections.defaultdict(_Summary)
+        self.payloads = collections.defaultdict(_Summary)
+
+    def incr(self, kind, name, key, value=1):
+        """Counts an event of cache, e.g. ``hit`` or ``miss``."""
+        if not value:
+            return
+        self.counters[kind, name][key] += value
+        monitor_client.increment(
+            'cache.%s' % key, tags={kind: name}, value=value)
+
+    def timing(self, kind, name, operation, seconds):
+        """Records the time usage of a cache operation."""
+        milliseconds = seconds * 1000
+        self.timings[kind, name, operation].add(milliseconds)
+        monitor_client.timing('cache.timer', milliseconds, tags={
+            kind: name, 'operation': operation})
+
+    @contextlib.contextmanager
+    def timer(self, kind, name, operation):
+        started_at = time.time()
+        try:
+            yield
+        finally:
+            self.timing(kind, name, operation, time.time() - started_at)
+
+    def payload(self, kind, name, size):
+        """Records the size of an encoded cache value."""
+        self.payloads[kind, name].add(size)
+        monitor_client.payload('cache.payload', data_length=size, tags={
+            kind: name})
+
+    def snapshot(self):
+        """Dumps the aggregated statistics.
+
+        :returns: A dict like ``{kind: {name: stats}}``. The ``stats`` is a
+                  dict which includes ``hit``, ``miss``, ``hit_rate``,
+                  ``timings`` and ``payload``.
+        """
+        data = collections.defaultdict(dict)
+
+        def get_stats(kind, name):
+            return data[kind].setdefault(name, {
+                'hit': 0, 'miss': 0, 'hit_rate': None, 'timings': {},
+                'payload': None})
+
+        for (kind, name), counter in self.counters.items():
+            stats = get_stats(kind, name)
+            stats.update(counter)
+            total = stats['hit'] + stats['miss']
+            if total:
+                stats['hit_rate'] = float(stats['hit']) / total
+        for (kind, name, operation), summary in self.timings.items():
+            get_stats(kind, name)['timings'][operation] = summary.to_dict()
+        for (kind, name), summary in self.payloads.items():
+            get_stats(kind, name)['payload'] = summary.to_dict()
+        return dict(data)
+
+
+def record_table_payload(raw_key, size):
+    # The raw key of table cache is "{table}|{pk}" or "{table}|{pk}|{ver}"
+    cache_stats.payload('table', raw_key.partition('|')[0], size)
+
+
+#: The statistics shared in process
+cache_stats = CacheStats()
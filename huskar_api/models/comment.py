@@ -1,5 +1,9 @@
 from __future__ import absolute_import
 
+import collections
+
+from dogpile.cache.api import NO_VALUE
+from more_itertools import chunked
 from sqlalchemy import Column, Integer, Unicode, UniqueConstraint
 
 from huskar_api.models.db import UpsertMixin
@@ -8,7 +12,8 @@ from . import (
     DeclarativeBase, TimestampMixin, CacheMixin, DBSession, cache_on_arguments)
 
 
-__all__ = ['Comment', 'set_comment', 'get_comment']
+__all__ = ['Comment', 'set_comment', 'set_comments', 'get_comment',
+           'get_comments']
 
 
 class Comment(TimestampMixin, CacheMixin, UpsertMixin, DeclarativeBase):
@@ -22,6 +27,7 @@ class Comment(TimestampMixin, CacheMixin, UpsertMixin, DeclarativeBase):
     )
 
     TYPE_CHOICES = frozenset(['switch', 'config'])
+    BATCH_SIZE = 500
 
     id = Column(Integer, primary_key=True)
     application = Column(Unicode(128, collation='utf8mb4_bin'),
@@ -34,14 +40,8 @@ class Comment(TimestampMixin, CacheMixin, UpsertMixin, DeclarativeBase):
 
     @classmethod
     def create(cls, application, cluster, key_type, key_name, key_comment):
-        assert key_type in cls.TYPE_CHOICES
-        stmt = cls.upsert().values(
-            application=application,
-            cluster=cluster,
-            key_type=key_type,
-            key_name=key_name,
-            key_comment=key_comment,
-        )
+        stmt = cls.upsert().values([cls._make_row(
+            application, cluster, key_type, key_name, key_comment)])
         with DBSession() as db:
             rs = db.execute(stmt)
 
@@ -53,6 +53,67 @@ class Comment(TimestampMixin, CacheMixin, UpsertMixin, DeclarativeBase):
 
         return instance
 
+    @classmethod
+    def create_many(cls, application, key_type, items):
+        """Creates or updates comments in bulk.
+
+        The comments are written with multi-row upsert statements.
+
+        :param items: A list of ``(cluster, key_name, key_comment)`` tuples.
+        """
+        for chunk in chunked(items, cls.BATCH_SIZE):
+            stmt = cls.upsert().values([cls._make_row(
+                application, cluster, key_type, key_name, key_comment,
+            ) for cluster, key_name, key_comment in chunk])
+            with DBSession() as db:
+                db.execute(stmt)
+            cls._flush_many(application, key_type, [
+                (cluster, key_name) for cluster, key_name, _ in chunk])
+
+    @classmethod
+    def _make_row(cls, application, cluster, key_type, key_name, key_comment):
+        assert key_type in cls.TYPE_CHOICES
+        return dict(
+            application=application,
+            cluster=cluster,
+            key_type=key_type,
+            key_name=key_name,
+            key_comment=key_comment,
+        )
+
+    @classmethod
+    def delete_many(cls, application, key_type, pairs):
+        """Deletes comments in bulk.
+
+        :param pairs: A list of ``(cluster, key_name)`` tuples.
+        """
+        assert key_type in cls.TYPE_CHOICES
+        for chunk in chunked(pairs, cls.BATCH_SIZE):
+            comment_ids = list(
+                cls.find_ids(application, key_type, chunk).values())
+            if not comment_ids:
+                continue
+            with DBSession() as db:
+                db.query(cls).filter(cls.id.in_(comment_ids)).delete(
+                    synchronize_session=False)
+            cls._flush_many(application, key_type, chunk, comment_ids)
+
+    @classmethod
+    def _flush_many(cls, application, key_type, pairs, comment_ids=None):
+        if comment_ids is None:
+            comment_ids = [comment_id for comment_id, in DBSession().query(
+                cls.id).filter(
+                    cls.application == application,
+                    cls.key_type == key_type,
+                    cls.cluster.in_({cluster for cluster, _ in pairs}),
+                    cls.key_name.in_({key_name for _, key_name in pairs}),
+                )]
+        if comment_ids:
+            cls.flush(comment_ids)
+        cls.find_id.flush_many([
+            (application, cluster, key_type, key_name)
+            for cluster, key_name in pairs])
+
     @classmethod
     def find(cls, application, cluster, key_type, key_name):
         assert key_type in cls.TYPE_CHOICES
@@ -61,7 +122,7 @@ class Comment(TimestampMixin, CacheMixin, UpsertMixin, DeclarativeBase):
             return cls.get(comment_id)
 
     @classmethod
-    @cache_on_arguments(5 * 60)
+    @cache_on_arguments(5 * 60, negative_expiration_time=30)
     def find_id(cls, application, cluster, key_type, key_name):
         assert key_type in cls.TYPE_CHOICES
         return DBSession().query(cls.id).filter_by(
@@ -71,6 +132,51 @@ class Comment(TimestampMixin, CacheMixin, UpsertMixin, DeclarativeBase):
             key_name=key_name,
         ).scalar()
 
+    @classmethod
+    def find_ids(cls, application, key_type, pairs):
+        """Finds the ids of comments in bulk.
+
+        The cache of :meth:`Comment.find_id` is shared. All cached ids are
+        fetched in one round trip, and the missed ones are queried in one SQL
+        statement.
+
+        :param pairs: A list of ``(cluster, key_name)`` tuples.
+        :returns: A dict which maps ``(cluster, key_name)`` to the id of
+                  comment. The keys without comment are not included.
+        """
+        assert key_type in cls.TYPE_CHOICES
+        pairs = list(set(pairs))
+        cached_ids = cls.find_id.get_many(
+            [(application, cluster, key_type, key_name)
+             for cluster, key_name in pairs])
+
+        comment_ids = {}
+        missed_pairs = []
+        for pair, comment_id in zip(pairs, cached_ids):
+            if comment_id is NO_VALUE:
+                missed_pairs.append(pair)
+            elif comment_id:
+                comment_ids[pair] = comment_id
+        if not missed_pairs:
+            return comment_ids
+
+        rows = DBSession().query(cls.id, cls.cluster, cls.key_name).filter(
+            cls.application == application,
+            cls.key_type == key_type,
+            cls.cluster.in_({cluster for cluster, _ in missed_pairs}),
+            cls.key_name.in_({key_name for _, key_name in missed_pairs}),
+        ).all()
+        found_ids = {(cluster, key_name): comment_id
+                     for comment_id, cluster, key_name in rows}
+        cls.find_id.set_many(
+            ((application, cluster, key_type, key_name),
+             found_ids.get((cluster, key_name)))
+            for cluster, key_name in missed_pairs)
+        comment_ids.update(
+            (pair, found_ids[pair]) for pair in missed_pairs
+            if pair in found_ids)
+        return comment_ids
+
     @classmethod
     def delete(cls, application, cluster, key_type, key_name):
         comment = cls.find(application, cluster, key_type, key_name)
@@ -97,6 +203,24 @@ def get_comment(application, cluster, key_type, key_name, default=u''):
     return default
 
 
+def get_comments(application, key_type, pairs, default=u''):
+    """Gets the comments of multiple keys in bulk.
+
+    :param str application: The name of application.
+    :param str key_type: ``"config"`` or ``"switch"``.
+    :param list pairs: A list of ``(cluster, key_name)`` tuples.
+    :pramm str default: The value will be used if comment does not exist.
+    :returns: A dict which maps ``(cluster, key_name)`` to comment content.
+    """
+    comment_ids = Comment.find_ids(application, key_type, pairs)
+    comments = Comment.mget(list(set(comment_ids.values())), as_dict=True)
+    result = {}
+    for pair in pairs:
+        comment = comments.get(comment_ids.get(pair))
+        result[pair] = comment.key_comment if comment else default
+    return result
+
+
 def set_comment(application, cluster, key_type, key_name, value):
     """Sets the comment of specific key.
 
@@ -110,3 +234,22 @@ def set_comment(application, cluster, key_type, key_name, value):
     if value:
         return Comment.create(application, cluster, key_type, key_name, value)
     Comment.delete(application, cluster, key_type, key_name)
+
+
+def set_comments(application, key_type, items):
+    """Sets the comments of multiple keys in bulk.
+
+    :param str application: The name of application.
+    :param str key_type: ``"config"`` or ``"switch"``.
+    :param list items: A list of ``(cluster, key_name, value)`` tuples. The
+                       matched comment will be removed if the value is falsey.
+                       The last one wins if a key appears more than once.
+    """
+    values = collections.OrderedDict()
+    for cluster, key_name, value in items:
+        values[cluster, key_name] = unicode(value).strip() if value else None
+    Comment.create_many(application, key_type, [
+        (cluster, key_name, value)
+        for (cluster, key_name), value in values.items() if value])
+    Comment.delete_many(application, key_type, [
+        pair for pair, value in values.items() if not value])
@@ -134,15 +134,29 @@ class ContainerManagement(object):
         :param huskar_client: The instance of huskar client.
         :returns: An iterator which generates ``(container_id, is_stale)``
         """
-        directory_path = cls._ZPATH_BARRIER_DIRECTORY
-        container_ids = huskar_client.client.get_children(directory_path)
-        for container_id in sorted(container_ids):
+        for container_id in cls.list_barrier_container_ids(huskar_client):
             management = cls(huskar_client, container_id)
-            if management.has_barrier():
-                yield container_id, False
-            else:
-                management._unset_barrier()
-                yield container_id, True
+            yield container_id, management.vacuum_stale_barrier()
+
+    @classmethod
+    def list_barrier_container_ids(cls, huskar_client):
+        """Lists the containers which have barriers, stale or not.
+
+        :param huskar_client: The instance of huskar client.
+        :returns: A sorted list of container ids.
+        """
+        directory_path = cls._ZPATH_BARRIER_DIRECTORY
+        return sorted(huskar_client.client.get_children(directory_path))
+
+    def vacuum_stale_barrier(self):
+        """Deletes the barrier of this container if it is stale.
+
+        :returns: ``True`` if the barrier is stale and has been deleted.
+        """
+        if self.has_barrier():
+            return False
+        self._unset_barrier()
+        return True
 
     def raise_for_unbound(self, application_name, cluster_name, key):
         """
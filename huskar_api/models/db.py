@@ -62,10 +62,15 @@ class Upsert(Insert):
 def mysql_upsert(insert_stmt, compiler, **kwargs):
     # A modified version of https://gist.github.com/timtadh/7811458.
     # The license (3-Clause BSD) is in the repository root.
-    parameters = insert_stmt.parameters
+    parameters = insert_stmt.parameters or {}
     if insert_stmt._has_multi_parameters:
-        parameters = parameters[0]  # pragma: no cover  # TODO: fix
-    keys = list(parameters or {})
+        # The multi-row VALUES are rendered by the default compiler, and
+        # each row is updated with its own VALUES() on duplicate key.
+        keys = []
+        for row in parameters:
+            keys.extend(key for key in row if key not in keys)
+    else:
+        keys = list(parameters)
     pk = insert_stmt.table.primary_key
     auto = None
     if (len(pk.columns) == 1 and
@@ -2,7 +2,9 @@ from __future__ import absolute_import
 
 import time
 import hashlib
+import itertools
 
+from more_itertools import chunked
 from sqlalchemy import Column, BigInteger, Unicode, Binary, Index
 from sqlalchemy.dialects.mysql import TINYINT
 
@@ -91,6 +93,9 @@ class InfraDownstream(CacheMixin, TimestampMixin, UpsertMixin,
 
 
 class Builder(object):
+    #: The max count of rows in a multi-row upsert statement
+    BATCH_SIZE = 500
+
     def __init__(self, cls):
         self._cls = cls
         self._stmts = []
@@ -127,7 +132,8 @@ class Builder(object):
             user_scope_type=user_scope_type,
             user_scope_name=user_scope_name,
             user_field_name=user_field_name)
-        stmt = self._cls.upsert().values(
+        # The rows will be written with multi-row upsert statements
+        row = dict(
             application_name=infra_application_name,
             user_hash_bytes=user_hash_bytes,
             user_application_name=user_application_name,
@@ -137,7 +143,7 @@ class Builder(object):
             user_scope_name=user_scope_name,
             user_field_name=user_field_name,
             version=self._timestamp)
-        self._stmts.append(stmt)
+        self._stmts.append(row)
         return self
 
     def unbind(self, user_application_name, user_infra_type, user_infra_name,
@@ -162,15 +168,24 @@ class Builder(object):
         self._stmts.append(stmt)
         return self
 
-    def unbind_stale(self):
-        stmt = self._cls.__table__.delete().where(
-            self._cls.version < self._timestamp)
+    def unbind_stale(self, user_application_name=None):
+        condition = self._cls.version < self._timestamp
+        if user_application_name is not None:
+            condition &= (
+                self._cls.user_application_name == user_application_name)
+        stmt = self._cls.__table__.delete().where(condition)
         self._stmts.append(stmt)
         return self
 
     def commit(self):
         stmts, self._stmts = self._stmts, []
         with DBSession().close_on_exit(False) as db:
-            for stmt in stmts:
-                db.execute(stmt)
+            groups = itertools.groupby(stmts, lambda s: isinstance(s, dict))
+            for is_row, group in groups:
+                if not is_row:
+                    for stmt in group:
+                        db.execute(stmt)
+                    continue
+                for rows in chunked(group, self.BATCH_SIZE):
+                    db.execute(self._cls.upsert().values(rows))
         return self
@@ -1,7 +1,9 @@
 from __future__ import absolute_import
 
-from .management import InstanceManagement
+from .management import InstanceManagement, CachedInstanceManagement
 from .schema import InfraInfo
+from .importer import InstanceImporter
 
 
-__all__ = ['InstanceManagement', 'InfraInfo']
+__all__ = ['InstanceManagement', 'CachedInstanceManagement', 'InfraInfo',
+           'InstanceImporter']
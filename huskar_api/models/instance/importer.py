@@ -0,0 +1,173 @@
+from __future__ import absolute_import
+
+import collections
+import logging
+
+from gevent import sleep
+from kazoo.exceptions import (
+    NoNodeError, NodeExistsError, BadVersionError, RolledBackError)
+from huskar_sdk_v2.utils import encode_key
+
+from huskar_api import settings
+from huskar_api.extras.payload import zk_payload
+from huskar_api.models.utils import check_znode_path
+from .management import InstanceManagement
+from .schema import Instance
+
+
+logger = logging.getLogger(__name__)
+
+
+ImportItem = collections.namedtuple(
+    'ImportItem', 'application_name cluster_name key value')
+ImportResult = collections.namedtuple(
+    'ImportResult', 'application_name cluster_name key status message')
+
+
+class InstanceImporter(object):
+    """The engine of importing instances in batches.
+
+    The instances are written with ZooKeeper multi-op transactions. Each
+    transaction includes a bounded chunk of instances, so the importing is
+    atomic per chunk. The existence of instances is checked with pipelined
+    asynchronous requests before a transaction is committed.
+
+    :param huskar_client: The instance of huskar client.
+    :param type_name: The type of instance, which chould be ``service``,
+                      ``switch`` or ``config``.
+    :param overwrite: ``True`` if existed instances should be overwritten.
+    :param chunk_size: Optional. The max count of operations in a transaction.
+    """
+
+    STATUS_CREATED = 'created'
+    STATUS_UPDATED = 'updated'
+    STATUS_SKIPPED = 'skipped'
+    STATUS_FAILED = 'failed'
+
+    #: The statuses which mean the instance has been written
+    AFFECTED_STATUSES = frozenset([STATUS_CREATED, STATUS_UPDATED])
+
+    #: The max total size of data in a transaction, which should be less than
+    #: the ``jute.maxbuffer`` of ZooKeeper.
+    MAX_TRANSACTION_BYTES = 512 * 1024
+
+    #: The exceptions which mean the chunk could be retried
+    RETRYABLE_EXCEPTIONS = (NoNodeError, NodeExistsError, BadVersionError)
+
+    def __init__(self, huskar_client, type_name, overwrite=False,
+                 chunk_size=None, max_retry=3, retry_interval=0.5):
+        assert type_name in InstanceManagement.TYPE_NAME_CHOICES
+        self.client = huskar_client.client
+        self.type_name = type_name
+        self.overwrite = overwrite
+        self.chunk_size = chunk_size or settings.INSTANCE_IMPORT_CHUNK_SIZE
+        self.max_retry = max_retry
+        self.retry_interval = retry_interval
+
+    def run(self, items):
+        """Imports instances.
+
+        :param items: A list of :class:`ImportItem`.
+        :returns: A list of :class:`ImportResult` in the same order.
+        """
+        items = [ImportItem(*item) for item in items]
+        self._ensure_cluster_paths(items)
+        results = []
+        for chunk in self._iter_chunks(items):
+            results.extend(self._import_chunk(chunk))
+        return results
+
+    def _make_path(self, item):
+        check_znode_path(item.application_name, item.cluster_name, item.key)
+        return Instance.PATH_PATTERN.format(
+            type_name=self.type_name, application_name=item.application_name,
+            cluster_name=item.cluster_name, key=encode_key(item.key))
+
+    def _make_data(self, item):
+        data, _ = Instance.MARSHMALLOW_SCHEMA.dumps(item.value)
+        return data
+
+    def _ensure_cluster_paths(self, items):
+        # The transaction could not create parent nodes implicitly
+        cluster_paths = sorted(set(
+            self._make_path(item).rsplit('/', 1)[0] for item in items))
+        for cluster_path in cluster_paths:
+            self.client.ensure_path(cluster_path)
+
+    def _iter_chunks(self, items):
+        chunk = []
+        chunk_paths = set()
+        chunk_bytes = 0
+        for item in items:
+            path = self._make_path(item)
+            size = len(path) + len(self._make_data(item))
+            # A path should not be touched twice in the same transaction
+            if chunk and (
+                    len(chunk) >= self.chunk_size or path in chunk_paths or
+                    chunk_bytes + size > self.MAX_TRANSACTION_BYTES):
+                yield chunk
+                chunk = []
+                chunk_paths = set()
+                chunk_bytes = 0
+            chunk.append(item)
+            chunk_paths.add(path)
+            chunk_bytes += size
+        if chunk:
+            yield chunk
+
+    def _fetch_stats(self, chunk):
+        async_results = [
+            self.client.exists_async(self._make_path(item)) for item in chunk]
+        return [r.get() for r in async_results]
+
+    def _import_chunk(self, chunk):
+        for i in xrange(self.max_retry):
+            stats = self._fetch_stats(chunk)
+            transaction = self.client.transaction()
+            statuses = []
+            for item, stat in zip(chunk, stats):
+                path = self._make_path(item)
+                data = self._make_data(item)
+                if stat is None:
+                    transaction.create(path, data)
+                    statuses.append(self.STATUS_CREATED)
+                elif self.overwrite:
+                    transaction.set_data(path, data, version=stat.version)
+                    statuses.append(self.STATUS_UPDATED)
+                else:
+                    statuses.append(self.STATUS_SKIPPED)
+
+            if transaction.operations:
+                errors = [
+                    r for r in transaction.commit()
+                    if isinstance(r, Exception) and
+                    not isinstance(r, RolledBackError)]
+            else:
+                errors = []
+
+            if not errors:
+                for item, status in zip(chunk, statuses):
+                    if status in self.AFFECTED_STATUSES:
+                        zk_payload(payload_data=self._make_data(item),
+                                   payload_type='multi')
+                return [self._make_result(item, status)
+                        for item, status in zip(chunk, statuses)]
+
+            logger.info('Failed to import a chunk of %d instances: %r',
+                        len(chunk), errors)
+            if not all(isinstance(e, self.RETRYABLE_EXCEPTIONS)
+                       for e in errors):
+                break
+            if i != self.max_retry - 1:
+                sleep(self.retry_interval)
+
+        message = 'resource is modified by another request'
+        if errors and not isinstance(errors[0], self.RETRYABLE_EXCEPTIONS):
+            message = repr(errors[0])
+        return [self._make_result(item, self.STATUS_FAILED, message)
+                for item in chunk]
+
+    def _make_result(self, item, status, message=None):
+        return ImportResult(
+            item.application_name, item.cluster_name, item.key, status,
+            message)
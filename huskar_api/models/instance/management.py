@@ -14,10 +14,13 @@ from huskar_api.models.route import ClusterResolver
 from .schema import Instance
 
 
-class InstanceManagement(object):
-    """The facade of configuration management.
+class BaseInstanceManagement(object):
+    """The read-only part of instance management, including the cluster
+    resolving (symlink and route).
+
+    The subclasses should implement :meth:`get_service_info` and
+    :meth:`get_cluster_info`.
 
-    :param huskar_client: The instance of huskar client.
     :param application_name: The name of current application.
     :param type_name: The type of instance, which chould be ``service``,
                       ``switch`` or ``config``.
@@ -25,9 +28,8 @@ class InstanceManagement(object):
 
     TYPE_NAME_CHOICES = (SERVICE_SUBDOMAIN, SWITCH_SUBDOMAIN, CONFIG_SUBDOMAIN)
 
-    def __init__(self, huskar_client, application_name, type_name):
+    def __init__(self, application_name, type_name):
         assert type_name in self.TYPE_NAME_CHOICES
-        self.huskar_client = huskar_client
         self.application_name = application_name
         self.type_name = type_name
         self.cluster_resolver = ClusterResolver(
@@ -44,6 +46,39 @@ class InstanceManagement(object):
         self.from_application_name = from_application_name
         self.from_cluster_name = from_cluster_name
 
+    def resolve_cluster_name(self, cluster_name):
+        """Resolves the cluster name and returns the name of physical cluster.
+
+        See :class:`ClusterResolver` for details.
+
+        :param cluster_name: The original cluster name, or the intent of route.
+        :returns: The physical cluster name or ``None``.
+        """
+        if self.type_name != SERVICE_SUBDOMAIN:
+            return
+        if (self.from_application_name and self.from_cluster_name and
+                cluster_name in settings.ROUTE_INTENT_LIST):
+            physical_name = self.cluster_resolver.resolve(
+                cluster_name=self.from_cluster_name,
+                from_application_name=self.from_application_name,
+                intent=cluster_name)
+            return physical_name or self.from_cluster_name
+        return self.cluster_resolver.resolve(cluster_name)
+
+
+class InstanceManagement(BaseInstanceManagement):
+    """The facade of configuration management.
+
+    :param huskar_client: The instance of huskar client.
+    :param application_name: The name of current application.
+    :param type_name: The type of instance, which chould be ``service``,
+                      ``switch`` or ``config``.
+    """
+
+    def __init__(self, huskar_client, application_name, type_name):
+        super(InstanceManagement, self).__init__(application_name, type_name)
+        self.huskar_client = huskar_client
+
     def list_cluster_names(self):
         """Gets all cluster names of current application.
 
@@ -120,24 +155,33 @@ class InstanceManagement(object):
         info.load()
         return info, physical_name
 
-    def resolve_cluster_name(self, cluster_name):
-        """Resolves the cluster name and returns the name of physical cluster.
+    def get_instances(self, cluster_name, keys, resolve=True):
+        """Gets the details of multiple instances in the same cluster.
 
-        See :class:`ClusterResolver` for details.
+        The reading requests are pipelined instead of waiting the responses
+        one by one.
 
-        :param cluster_name: The original cluster name, or the intent of route.
-        :returns: The physical cluster name or ``None``.
+        :param cluster_name: The name of cluster.
+        :param keys: The list of instance keys.
+        :param resolve: ``False`` if you don't wanna resolving the cluster.
+        :raises MalformedDataError: The data source is malformed.
+        :returns: The list of :class:`Instance` and the physical cluster name.
         """
-        if self.type_name != SERVICE_SUBDOMAIN:
-            return
-        if (self.from_application_name and self.from_cluster_name and
-                cluster_name in settings.ROUTE_INTENT_LIST):
-            physical_name = self.cluster_resolver.resolve(
-                cluster_name=self.from_cluster_name,
-                from_application_name=self.from_application_name,
-                intent=cluster_name)
-            return physical_name or self.from_cluster_name
-        return self.cluster_resolver.resolve(cluster_name)
+        if resolve:
+            physical_name = self.resolve_cluster_name(cluster_name)
+            cluster_name = physical_name or cluster_name
+        else:
+            physical_name = None
+        client = self.huskar_client.client
+        infos = [self._make_instance(cluster_name, key) for key in keys]
+        async_results = [client.get_async(info.path) for info in infos]
+        for info, async_result in zip(infos, async_results):
+            try:
+                data, stat = async_result.get()
+            except NoNodeError:
+                continue
+            info.feed(data, stat)
+        return infos, physical_name
 
     def delete_cluster(self, cluster_name):
         """Deletes the cluster by its name.
@@ -199,3 +243,79 @@ class InstanceManagement(object):
             application_name=self.application_name,
             cluster_name=cluster_name,
             key=encode_key(key))
+
+
+class CachedInstanceManagement(BaseInstanceManagement):
+    """The read-only counterpart of :class:`InstanceManagement`.
+
+    It reads everything from a synchronized tree holder instead of ZooKeeper.
+    The cluster resolving (symlink and route) is supported also.
+
+    :param tree_holder: The :class:`.TreeHolder` of the same application and
+                        type. It should be synchronized already.
+    :param application_name: The name of current application.
+    :param type_name: The type of instance.
+    """
+
+    def __init__(self, tree_holder, application_name, type_name):
+        assert tree_holder.application_name == application_name
+        assert tree_holder.type_name == type_name
+        super(CachedInstanceManagement, self).__init__(
+            application_name, type_name)
+        self.tree_holder = tree_holder
+        #: The max ``mzxid`` of instances which have been read
+        self.last_zxid = 0
+
+    def list_cluster_names(self):
+        names = self.tree_holder.get_children(
+            self.type_name, self.application_name)
+        return sorted(names or [])
+
+    def list_instance_keys(self, cluster_name, resolve=True):
+        if resolve:
+            physical_name = self.resolve_cluster_name(cluster_name)
+            cluster_name = physical_name or cluster_name
+        keys = self.tree_holder.get_children(
+            self.type_name, self.application_name, cluster_name)
+        return [decode_key(k) for k in sorted(keys or [])]
+
+    def get_service_info(self):
+        assert self.type_name == SERVICE_SUBDOMAIN
+        return self.tree_holder.get_service_info()
+
+    def get_cluster_info(self, cluster_name):
+        assert self.type_name == SERVICE_SUBDOMAIN
+        return self.tree_holder.get_cluster_info(cluster_name)
+
+    def get_instance(self, cluster_name, key, resolve=True):
+        if resolve:
+            physical_name = self.resolve_cluster_name(cluster_name)
+            cluster_name = physical_name or cluster_name
+        else:
+            physical_name = None
+        info = self._make_instance(cluster_name, key)
+        node = self.tree_holder.get_node(
+            self.type_name, self.application_name, cluster_name,
+            encode_key(key))
+        if node is not None:
+            info.feed(node.data, node.stat)
+            self.last_zxid = max(self.last_zxid, node.stat.mzxid)
+        return info, physical_name
+
+    def get_instances(self, cluster_name, keys, resolve=True):
+        if resolve:
+            physical_name = self.resolve_cluster_name(cluster_name)
+            cluster_name = physical_name or cluster_name
+        else:
+            physical_name = None
+        infos = [self.get_instance(cluster_name, key, resolve=False)[0]
+                 for key in keys]
+        return infos, physical_name
+
+    def _make_instance(self, cluster_name, key):
+        return Instance(
+            None,
+            type_name=self.type_name,
+            application_name=self.application_name,
+            cluster_name=cluster_name,
+            key=encode_key(key))
@@ -3,6 +3,8 @@ from __future__ import absolute_import
 from .management import RouteManagement
 from .resolver import ClusterResolver
 from .hijack_stage import lookup_route_stage
+from .declaration import UpstreamDeclarer
 
 
-__all__ = ['RouteManagement', 'ClusterResolver', 'lookup_route_stage']
+__all__ = ['RouteManagement', 'ClusterResolver', 'lookup_route_stage',
+           'UpstreamDeclarer']
@@ -0,0 +1,104 @@
+from __future__ import absolute_import
+
+import logging
+import time
+
+import gevent
+from gevent.event import Event
+
+from huskar_api import settings
+from huskar_api.extras.monitor import monitor_client
+from huskar_api.extras.raven import capture_exception
+from huskar_api.models.exceptions import OutOfSyncError
+from .management import RouteManagement
+
+
+logger = logging.getLogger(__name__)
+
+
+class UpstreamDeclarer(object):
+    """The in-process aggregator of upstream declarations.
+
+    The declarations from long polling connections are queued here instead
+    of being written on the request path. The duplicated declarations are
+    merged, and the declarations which have been present in the last known
+    dependency are skipped. A background greenlet writes the queued ones at
+    most once per application in each interval.
+
+    :param huskar_client: The instance of huskar client.
+    :param interval: Optional. The seconds between two writing rounds.
+    :param cache_ttl: Optional. The seconds to trust the last known
+                      dependency of an application.
+    """
+
+    def __init__(self, huskar_client, interval=None, cache_ttl=None):
+        self.huskar_client = huskar_client
+        self._interval = interval or settings.ROUTE_DECLARE_UPSTREAM_INTERVAL
+        self._cache_ttl = (
+            cache_ttl or settings.ROUTE_DECLARE_UPSTREAM_CACHE_TTL)
+        self._pending = {}
+        self._dependencies = {}
+        self._stopped = Event()
+
+    def declare(self, application_name, cluster_name, upstream_names):
+        """Queues an upstream declaration.
+
+        :param application_name: The name of source application.
+        :param cluster_name: The name of source cluster.
+        :param upstream_names: A name list of upstream applications.
+        """
+        pairs = frozenset(
+            (upstream_name, cluster_name) for upstream_name in upstream_names)
+        if not pairs:
+            return
+        if self._is_declared(application_name, pairs):
+            monitor_client.increment('route.declare_upstream', tags={
+                'result': 'skipped'})
+            return
+        self._pending.setdefault(application_name, set()).update(pairs)
+        monitor_client.increment('route.declare_upstream', tags={
+            'result': 'queued'})
+
+    def flush(self):
+        """Writes all queued declarations to ZooKeeper."""
+        pending, self._pending = self._pending, {}
+        for application_name, pairs in pending.iteritems():
+            try:
+                self._write(application_name, pairs)
+            except OutOfSyncError:
+                # Try again in the next round
+                self._pending.setdefault(application_name, set()).update(
+                    pairs)
+            except Exception:
+                logger.warning(
+                    'Failed to declare upstream of %s', application_name)
+                capture_exception(level=logging.WARNING)
+
+    def spawn_declaring_thread(self):
+        self._stopped.clear()
+        return gevent.spawn(self._worker)
+
+    def stop(self):
+        """Stops the declaring thread without waiting the next round."""
+        self._stopped.set()
+
+    def _worker(self):
+        while not self._stopped.wait(self._interval):
+            self.flush()
+
+    def _is_declared(self, application_name, pairs):
+        dependency, expires_at = self._dependencies.get(
+            application_name, (None, 0))
+        if dependency is None or time.time() >= expires_at:
+            return False
+        return all(cluster_name in dependency.get(upstream_name, ())
+                   for upstream_name, cluster_name in pairs)
+
+    def _write(self, application_name, pairs):
+        route_management = RouteManagement(
+            self.huskar_client, application_name, None)
+        dependency = route_management.declare_upstream_pairs(sorted(pairs))
+        self._dependencies[application_name] = (
+            dict(dependency), time.time() + self._cache_ttl)
+        monitor_client.increment('route.declare_upstream', tags={
+            'result': 'written'})
@@ -148,13 +148,32 @@ class RouteManagement(object):
 
         :param application_names: A name list of applications.
         """
+        self.declare_upstream_pairs(
+            (application_name, self.cluster_name)
+            for application_name in application_names)
+
+    def declare_upstream_pairs(self, pairs):
+        """Declares multiple applications as upstream of multiple clusters.
+
+        It is the same as :meth:`RouteManagement.declare_upstream`, but the
+        clusters of this application are specified with the pairs instead of
+        :attr:`RouteManagement.cluster_name`.
+
+        :param pairs: A list of ``(application_name, cluster_name)`` tuples.
+                      The ``application_name`` is the upstream and the
+                      ``cluster_name`` is a cluster of this application.
+        :raises OutOfSyncError: The service info has been modified by another
+                                request.
+        :returns: The frozen dependency since this change.
+        """
         service_info = safe_call(self.make_service_info)
         snapshot = service_info.freeze_dependency()
-        for application_name in application_names:
-            service_info.add_dependency(application_name, self.cluster_name)
-        if service_info.freeze_dependency() == snapshot:
-            return
-        service_info.save()
+        for application_name, cluster_name in pairs:
+            service_info.add_dependency(application_name, cluster_name)
+        dependency = service_info.freeze_dependency()
+        if dependency != snapshot:
+            service_info.save()
+        return dependency
 
     def _check_route_arguments(self, application_name, cluster_name):
         if not self._is_empty_cluster(application_name, cluster_name):
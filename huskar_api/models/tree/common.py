@@ -1,5 +1,7 @@
 from __future__ import absolute_import
 
+import bisect
+import hashlib
 import collections
 import operator
 
@@ -34,6 +36,45 @@ class ClusterMap(object):
             self.resolved_names[_name].discard(cluster_name)
 
 
+class HashRing(object):
+    """A consistent hashing ring of numbered nodes.
+
+    Adding a node moves about ``1 / node_count`` keys only, so most trees
+    stay in their sessions if the count of sessions is changed.
+
+    :param node_count: The count of nodes, which are numbered from zero.
+    :param replicas: The count of virtual nodes for each node.
+    """
+
+    __slots__ = ('node_count', 'hashes', 'nodes')
+
+    def __init__(self, node_count, replicas=100):
+        assert node_count > 0
+        self.node_count = node_count
+        ring = sorted(
+            (self.hash('%d-%d' % (node, replica)), node)
+            for node in xrange(node_count) for replica in xrange(replicas))
+        self.hashes = [h for h, _ in ring]
+        self.nodes = [n for _, n in ring]
+
+    @staticmethod
+    def hash(key):
+        return int(hashlib.md5(key).hexdigest()[:8], 16)
+
+    def get_node(self, key):
+        """Gets the node of specified key.
+
+        :param key: The string key.
+        :returns: The number of node.
+        """
+        if self.node_count == 1:
+            return 0
+        if isinstance(key, unicode):
+            key = key.encode('utf-8')
+        index = bisect.bisect(self.hashes, self.hash(key))
+        return self.nodes[index % len(self.nodes)]
+
+
 class Path(tuple):
     """The structured path."""
 
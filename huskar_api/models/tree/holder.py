@@ -34,6 +34,8 @@ class TreeHolder(object):
     :param semaphore: Optional semaphore for throttle. We acquire it before
                       starting and release it after initialized (whether
                       success or failure).
+    :param client: Optional. The kazoo client whose session will be used. The
+                   default one is the client of tree hub.
     """
 
     tree_changed = blinker.signal('tree_changed')
@@ -44,17 +46,20 @@ class TreeHolder(object):
         TreeEvent.CONNECTION_LOST: 'LOST',
     }
 
-    def __init__(self, tree_hub, application_name, type_name, semaphore=None):
+    def __init__(self, tree_hub, application_name, type_name, semaphore=None,
+                 client=None):
         assert type_name in ('service', 'switch', 'config')
 
         self.hub = tree_hub
         self.application_name = application_name
         self.type_name = type_name
+        self.client = client or self.hub.client
         self.path = make_path(self.hub.base_path, type_name, application_name)
-        self.cache = make_cache(self.hub.client, self.path)
+        self.cache = make_cache(self.client, self.path)
         self.initialized = Event()
         self._started = False
         self._closed = False
+        self._connected = True
         self.cluster_resolver = ClusterResolver(
             self.get_service_info, self.get_cluster_info)
         if semaphore is None:
@@ -104,10 +109,26 @@ class TreeHolder(object):
             })
         raise TreeTimeoutError(self.application_name, self.type_name)
 
+    def is_synchronized(self):
+        """Checks whether the cached data is ready for reading.
+
+        :returns: ``True`` if the tree has been initialized, is not closed and
+                  its ZooKeeper session is connected.
+        """
+        return (self.initialized.is_set() and not self._closed and
+                self._connected)
+
+    def get_node(self, *args, **kwargs):
+        """Gets the data and stat of specified znode from cached data.
+
+        :returns: A ``(data, stat)`` named tuple or ``None``.
+        """
+        path = make_path(self.hub.base_path, *args, **kwargs)
+        return self.cache.get_data(path)
+
     def get_data(self, *args, **kwargs):
         """Gets the data of specified znode from cached data."""
-        path = make_path(self.hub.base_path, *args, **kwargs)
-        node = self.cache.get_data(path)
+        node = self.get_node(*args, **kwargs)
         return node and node.data
 
     def get_children(self, *args, **kwargs):
@@ -228,6 +249,8 @@ class TreeHolder(object):
         # - TreeEvent.CONNECTION_LOST
         if event.event_type in self.CONNECTIVE_EVENTS:
             event_name = self.CONNECTIVE_EVENTS[event.event_type]
+            self._connected = (
+                event.event_type == TreeEvent.CONNECTION_RECONNECTED)
             logger.info(
                 'Connective event %s happened on %s', event_name, self.path)
             monitor_client.increment('tree_holder.events.connective', 1)
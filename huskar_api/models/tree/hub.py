@@ -4,6 +4,7 @@ import logging
 
 from gevent.lock import Semaphore
 
+from .common import HashRing
 from .holder import TreeHolder
 from .watcher import TreeWatcher
 
@@ -12,19 +13,48 @@ logger = logging.getLogger(__name__)
 
 
 class TreeHub(object):
-    """The hub for holding multiple trees."""
-
-    def __init__(self, huskar_client, startup_max_concurrency=None):
+    """The hub for holding multiple trees.
+
+    The trees could be spread over multiple ZooKeeper sessions. Each tree is
+    assigned to a session by consistent hashing of its application and type,
+    so the watch events of trees are dispatched in different connections.
+
+    :param huskar_client: The instance of huskar client.
+    :param startup_max_concurrency: Optional. The max count of trees which
+                                    are starting at the same time in each
+                                    session.
+    :param extra_clients: Optional. The extra huskar clients whose sessions
+                          will be shared by trees.
+    """
+
+    def __init__(self, huskar_client, startup_max_concurrency=None,
+                 extra_clients=()):
         self.base_path = huskar_client.base_path
         self.client = huskar_client.client
+        self.clients = [huskar_client.client]
+        self.clients.extend(c.client for c in extra_clients)
+        self.client_ring = HashRing(len(self.clients))
         self.tree_map = {}
         self.tree_holder_class = TreeHolder
         self.tree_watcher_class = TreeWatcher
         self.lock = Semaphore()
         if startup_max_concurrency:
-            self.throttle = Semaphore(startup_max_concurrency)
+            self.throttles = [Semaphore(startup_max_concurrency)
+                              for _ in self.clients]
         else:
-            self.throttle = None
+            self.throttles = [None for _ in self.clients]
+
+    @property
+    def throttle(self):
+        return self.throttles[0]
+
+    def get_client_index(self, application_name, type_name):
+        """Gets the index of session which the tree should be assigned to.
+
+        :returns: An index of :attr:`TreeHub.clients`.
+        """
+        return self.client_ring.get_node(
+            '%s:%s' % (application_name, type_name))
 
     def get_tree_holder(self, application_name, type_name):
         """Gets a tree holder which specified by its type and application.
@@ -40,12 +70,26 @@ class TreeHub(object):
         with self.lock:
             key = (application_name, type_name)
             if key not in self.tree_map:
+                index = self.get_client_index(application_name, type_name)
                 holder = self.tree_holder_class(
-                    self, application_name, type_name, self.throttle)
+                    self, application_name, type_name, self.throttles[index],
+                    client=self.clients[index])
                 holder.start()
                 self.tree_map[key] = holder
             return self.tree_map[key]
 
+    def peek_tree_holder(self, application_name, type_name):
+        """Gets a synchronized tree holder without creating it.
+
+        It is useful for serving reads from an existing tree cache while
+        falling back to ZooKeeper if there is nothing to be reused.
+
+        :returns: A :class:`TreeHolder` instance or ``None``.
+        """
+        holder = self.tree_map.get((application_name, type_name))
+        if holder is not None and holder.is_synchronized():
+            return holder
+
     def release_tree_holder(self, application_name, type_name):
         """Releases the tree holder.
 
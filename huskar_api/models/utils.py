@@ -5,16 +5,25 @@ import functools
 import itertools
 import inspect
 import json
+import logging
+import math
+import random
 import re
+import time
+import uuid
 
 from huskar_sdk_v2.consts import OVERALL
 from more_itertools import peekable, first
+from dogpile.cache.api import NO_VALUE
 from dogpile.cache.util import function_key_generator
 from gevent import sleep
+from gevent.event import AsyncResult
 
 from huskar_api import settings
 from huskar_api.models.const import MAGIC_CONFIG_KEYS
+from huskar_api.models.cache.batch import invalidation_batch
 from huskar_api.models.cache.region import zdumps, zloads
+from huskar_api.models.cache.stats import cache_stats
 from huskar_api.extras.raven import capture_exception
 
 
@@ -26,6 +35,16 @@ __all__ = [
     'merge_instance_list',
 ]
 
+logger = logging.getLogger(__name__)
+
+# Deletes the lock only if it is still held by the same token
+RELEASE_LOCK_SCRIPT = '''
+if redis.call("get", KEYS[1]) == ARGV[1] then
+  return redis.call("del", KEYS[1])
+end
+return 0
+'''
+
 
 def retry(exceptions, interval, max_retry):
     """A decorator with arguments to make view functions could be retried.
@@ -49,35 +68,234 @@ def retry(exceptions, interval, max_retry):
 
 
 def make_cache_decorator(redis_client):
-    """Creates a decorator to apply cache on arguments."""
+    """Creates a decorator to apply cache on arguments.
+
+    The decorated function is protected from cache stampede:
+
+    - The concurrent computing of the same key is coalesced into one in
+      process, and optionally into one in cluster with a redis lock.
+    - The cached result is recomputed by a single caller before it is
+      expired, with a probability which grows while the expiration is
+      approaching and the computing is slow.
+    - The expired result could still be served in ``stale_time`` seconds
+      while a single caller is recomputing it.
+
+    The ``None`` result is cached too, because the entries are enveloped and
+    a missed entry is not ``None`` anymore. It could be kept in a shorter
+    ``negative_expiration_time``.
+
+    The hits, misses, time usage and payload size are recorded in
+    :data:`~huskar_api.models.cache.stats.cache_stats` with the name
+    ``{module}:{function}``.
+    """
+
+    def cache_on_arguments(expiration_time, stale_time=0, redis_lock=False,
+                           lock_timeout=5, beta=1.0,
+                           negative_expiration_time=None):
+        """Applies cache on arguments.
+
+        :param expiration_time: The seconds to keep the result fresh.
+        :param stale_time: Optional. The seconds to keep serving the expired
+                           result while it is being recomputed.
+        :param redis_lock: Optional. ``True`` to coalesce the computing of
+                           missed results between processes.
+        :param lock_timeout: The max seconds to hold the redis lock.
+        :param beta: The factor of early recomputation. ``0`` disables it.
+        :param negative_expiration_time: Optional. The seconds to keep the
+                                         ``None`` result fresh. It is the
+                                         same as ``expiration_time`` by
+                                         default.
+        """
+        if negative_expiration_time is None:
+            negative_expiration_time = expiration_time
 
-    def cache_on_arguments(expiration_time):
         def decorator(fn):
+            inflight = {}
             fn_generate_key = function_key_generator(
-                'cache_on_arguments:v1', fn, to_str=unicode)
+                'cache_on_arguments:v2', fn, to_str=unicode)
             fn_args = inspect.getargspec(fn)
             fn_has_self = fn_args[0] and fn_args[0][0] in ('self', 'cls')
+            stats_name = '%s:%s' % (fn.__module__, fn.__name__)
 
-            @functools.wraps(fn)
-            def wrapper(*args, **kwargs):
-                key = fn_generate_key(*args, **kwargs)
-                val = redis_client.get(key)
+            def stats_timer(operation):
+                return cache_stats.timer('function', stats_name, operation)
+
+            def stats_incr(key, value=1):
+                cache_stats.incr('function', stats_name, key, value)
+
+            def load_entry(val):
+                if val is None:
+                    return
+                cache_stats.payload('function', stats_name, len(val))
+                # (result, the time to be expired, the seconds of computing)
+                return zloads(val)
+
+            def get_expiration_time(val):
                 if val is None:
+                    return negative_expiration_time
+                return expiration_time
+
+            def get_ttl(val):
+                return int(get_expiration_time(val) + stale_time)
+
+            def dump_entry(val, delta=0):
+                expires_at = time.time() + get_expiration_time(val)
+                data = zdumps((val, expires_at, delta))
+                cache_stats.payload('function', stats_name, len(data))
+                return data
+
+            def should_recompute(expires_at, delta):
+                now = time.time()
+                if now >= expires_at:
+                    return True
+                if not beta or not delta:
+                    return False
+                # The "XFetch" algorithm of probabilistic early expiration
+                gap = -delta * beta * math.log(1 - random.random())
+                return now + gap >= expires_at
+
+            def acquire_lock(key):
+                # The token tells the holder of lock, or None if failed
+                token = uuid.uuid4().hex
+                if not redis_lock or redis_client.set(
+                        '%s:lock' % key, token, nx=True, ex=lock_timeout):
+                    return token
+
+            def release_lock(key, token):
+                if not redis_lock or token is None:
+                    return
+                try:
+                    redis_client.eval(
+                        RELEASE_LOCK_SCRIPT, 1, '%s:lock' % key, token)
+                except Exception as e:
+                    # The lock will be expired in lock_timeout anyway
+                    logger.warning('Failed to release lock %s: %s', key, e)
+
+            def wait_for_lock(key):
+                deadline = time.time() + lock_timeout
+                while time.time() < deadline:
+                    sleep(0.05)
+                    entry = load_entry(redis_client.get(key))
+                    if entry is not None:
+                        return entry
+                    # The lock is released or the redis is unavailable
+                    if redis_client.ttl('%s:lock' % key) <= 0:
+                        return
+
+            def compute(key, args, kwargs, token):
+                result = AsyncResult()
+                inflight[key] = result
+                try:
+                    started_at = time.time()
                     val = fn(*args, **kwargs)
-                    redis_client.set(key, zdumps(val), expiration_time)
-                    return val
+                    delta = time.time() - started_at
+                    cache_stats.timing(
+                        'function', stats_name, 'compute', delta)
+                    with stats_timer('set'):
+                        redis_client.set(
+                            key, dump_entry(val, delta), get_ttl(val))
+                except Exception as e:
+                    result.set_exception(e)
+                    raise
                 else:
-                    return zloads(val)
+                    result.set(val)
+                    return val
+                finally:
+                    # A later computing may have taken the place after the
+                    # waiters timed out
+                    if inflight.get(key) is result:
+                        del inflight[key]
+                    release_lock(key, token)
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                key = fn_generate_key(*args, **kwargs)
+                with stats_timer('get'):
+                    entry = load_entry(redis_client.get(key))
+                if entry is not None:
+                    val, expires_at, delta = entry
+                    if not should_recompute(expires_at, delta):
+                        stats_incr('hit')
+                        return val
+                    # Serves the current result if anyone is recomputing
+                    token = None if key in inflight else acquire_lock(key)
+                    if token is None:
+                        stats_incr('hit')
+                        stats_incr('stale')
+                        return val
+                    stats_incr('miss')
+                    return compute(key, args, kwargs, token)
+
+                stats_incr('miss')
+                if key in inflight:
+                    result = inflight[key]
+                    result.wait(lock_timeout)
+                    if result.ready():
+                        return result.get()
+                token = acquire_lock(key)
+                if token is None:
+                    entry = wait_for_lock(key)
+                    if entry is not None:
+                        return entry[0]
+                # The lock of others is never released by this computing
+                return compute(key, args, kwargs, token)
 
             def generate_key(*args, **kwargs):
                 args = ((None,) + args) if fn_has_self else args
                 return fn_generate_key(*args, **kwargs)
 
             def flush(*args, **kwargs):
-                return redis_client.delete(generate_key(*args, **kwargs))
+                return invalidation_batch.delete(
+                    redis_client, generate_key(*args, **kwargs))
+
+            def flush_many(args_list):
+                """Deletes the cached results of multiple calls at once.
+
+                :param args_list: A list of positional arguments.
+                """
+                keys = [generate_key(*args) for args in args_list]
+                if keys:
+                    return invalidation_batch.delete(redis_client, *keys)
+
+            def get_many(args_list):
+                """Gets the cached results of multiple calls at once.
+
+                :param args_list: A list of positional arguments.
+                :returns: A list of results. The missed or expired one is
+                          ``NO_VALUE``.
+                """
+                keys = [generate_key(*args) for args in args_list]
+                if not keys:
+                    return []
+                now = time.time()
+                with stats_timer('mget'):
+                    entries = [
+                        load_entry(val) for val in redis_client.mget(keys)]
+                results = [NO_VALUE if entry is None or entry[1] <= now
+                           else entry[0] for entry in entries]
+                hit_count = sum(1 for r in results if r is not NO_VALUE)
+                stats_incr('hit', hit_count)
+                stats_incr('miss', len(results) - hit_count)
+                return results
+
+            def set_many(pairs, nx=False):
+                """Caches the results of multiple calls in a pipeline.
+
+                :param pairs: A list of ``(args, result)`` tuples.
+                :param nx: ``True`` to keep the existing results.
+                """
+                with stats_timer('mset'), \
+                        redis_client.pipeline(transaction=False) as pipe:
+                    for args, val in pairs:
+                        pipe.set(generate_key(*args), dump_entry(val),
+                                 get_ttl(val), nx=nx)
+                    pipe.execute()
 
             wrapper.generate_key = generate_key
             wrapper.flush = flush
+            wrapper.flush_many = flush_many
+            wrapper.get_many = get_many
+            wrapper.set_many = set_many
             wrapper.original = fn
 
             return wrapper
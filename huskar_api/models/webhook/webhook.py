@@ -7,7 +7,7 @@ from sqlalchemy.exc import IntegrityError
 
 from huskar_api.models import (
     DeclarativeBase, TimestampMixin, CacheMixin, DBSession,
-    cache_on_arguments)
+    cache_on_arguments, batch_invalidation)
 
 
 class Webhook(TimestampMixin, CacheMixin, DeclarativeBase):
@@ -26,9 +26,10 @@ class Webhook(TimestampMixin, CacheMixin, DeclarativeBase):
         with DBSession().close_on_exit(False) as db:
             instance = cls(url=url, hook_type=hook_type)
             db.add(instance)
-        cls.flush([instance.id])
-        cls.get_all_ids.flush()
-        cls.get_ids_by_type.flush(hook_type)
+        with batch_invalidation():
+            cls.flush([instance.id])
+            cls.get_all_ids.flush()
+            cls.get_ids_by_type.flush(hook_type)
         return instance
 
     def update_url(self, url):
@@ -39,9 +40,10 @@ class Webhook(TimestampMixin, CacheMixin, DeclarativeBase):
     def delete(self):
         with DBSession().close_on_exit(False) as db:
             db.delete(self)
-        self.flush([self.id])
-        self.get_all_ids.flush()
-        self.get_ids_by_type.flush(self.hook_type)
+        with batch_invalidation():
+            self.flush([self.id])
+            self.get_all_ids.flush()
+            self.get_ids_by_type.flush(self.hook_type)
 
     @classmethod
     def get_all(cls):
@@ -49,7 +51,7 @@ class Webhook(TimestampMixin, CacheMixin, DeclarativeBase):
         return cls.mget(ids)
 
     @classmethod
-    @cache_on_arguments(10 * 60)
+    @cache_on_arguments(10 * 60, stale_time=60, redis_lock=True)
     def get_all_ids(cls):
         rs = DBSession().query(cls.id).all()
         return sorted(r[0] for r in rs)
@@ -131,11 +133,14 @@ class WebhookSubscription(TimestampMixin, CacheMixin, DeclarativeBase):
                            application_id=application_id,
                            action_type=action_type)
             db.add(instance)
-        cls.flush([cls.id])
-        cls.get_id.flush(application_id, webhook_id, action_type)
-        cls.get_ids.flush(application_id, webhook_id, action_type)
-        cls.get_ids.flush(application_id, webhook_id, None)
-        cls.get_ids.flush(application_id, None, None)
+        with batch_invalidation():
+            cls.flush([instance.id])
+            cls.get_id.flush(application_id, webhook_id, action_type)
+            cls.get_ids.flush_many([
+                (application_id, webhook_id, action_type),
+                (application_id, webhook_id, None),
+                (application_id, None, None),
+            ])
         return instance
 
     @classmethod
@@ -157,7 +162,7 @@ class WebhookSubscription(TimestampMixin, CacheMixin, DeclarativeBase):
         return ids[0] if ids else None
 
     @classmethod
-    @cache_on_arguments(10 * 60)
+    @cache_on_arguments(10 * 60, stale_time=60, redis_lock=True)
     def get_ids(cls, application_id, webhook_id, action_type):
         conds = {name: value for name, value in [
             ('application_id', application_id),
@@ -171,15 +176,15 @@ class WebhookSubscription(TimestampMixin, CacheMixin, DeclarativeBase):
     def delete(self):
         with DBSession().close_on_exit(False) as db:
             db.delete(self)
-        self.flush([self.id])
-        self.get_id.flush(
-            self.application_id, self.webhook_id, self.action_type)
-        self.get_ids.flush(
-            self.application_id, self.webhook_id, self.action_type)
-        self.get_ids.flush(
-            self.application_id, self.webhook_id, None)
-        self.get_ids.flush(
-            self.application_id, None, None)
+        with batch_invalidation():
+            self.flush([self.id])
+            self.get_id.flush(
+                self.application_id, self.webhook_id, self.action_type)
+            self.get_ids.flush_many([
+                (self.application_id, self.webhook_id, self.action_type),
+                (self.application_id, self.webhook_id, None),
+                (self.application_id, None, None),
+            ])
 
     @property
     def webhook(self):
@@ -1,10 +1,12 @@
 from __future__ import absolute_import
 
+import collections
+import copy
 import logging
 
 from marshmallow import ValidationError
 from kazoo.exceptions import NoNodeError, NodeExistsError, BadVersionError
-from kazoo.protocol.states import EventType
+from kazoo.protocol.states import EventType, KazooState
 
 from huskar_api.extras.payload import zk_payload
 from .exceptions import MalformedDataError, OutOfSyncError
@@ -13,16 +15,97 @@ from .utils import check_znode_path
 logger = logging.getLogger(__name__)
 
 
+class ZnodeCache(object):
+    """A process-wide read-through cache of parsed znodes.
+
+    The entries are keyed by path and invalidated by one-shot data watches,
+    which are registered while the znodes are read. The least recently used
+    entries will be evicted if the cache is full.
+
+    A znode may be read by different models, so the raw data is kept and the
+    parsed data is cached for each kind of model separately.
+
+    :param client: The ZooKeeper client whose reads will be cached.
+    :param max_size: The max count of cached znodes.
+    """
+
+    def __init__(self, client, max_size):
+        assert max_size > 0
+        self.client = client
+        self.max_size = max_size
+        self.entries = collections.OrderedDict()
+        self.invalidation_seq = 0
+        client.add_listener(self._handle_state)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, path):
+        return path in self.entries
+
+    def get(self, path, parse, parse_key):
+        """Gets the parsed data and stat of a znode.
+
+        :param path: The path of znode.
+        :param parse: The function to parse raw data. Its result should be
+                      pickleable and will be copied before returning.
+        :param parse_key: The hashable key of the ``parse`` function. The
+                          parsed data is shared by the callers of same key.
+        :raises NoNodeError: The znode does not exist.
+        :returns: A tuple ``(data, stat)``.
+        """
+        entry = self.entries.pop(path, None)
+        if entry is None:
+            seq = self.invalidation_seq
+            raw_data, stat = self.client.get(path, watch=self._handle_event)
+            # The data may be outdated if any watch was triggered during
+            # fetching, so we do not keep it.
+            if seq != self.invalidation_seq:
+                return parse(raw_data), stat
+            entry = (raw_data, stat, {})
+        self.entries[path] = entry
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+        raw_data, stat, parsed = entry
+        if parse_key not in parsed:
+            parsed[parse_key] = parse(raw_data)
+        return copy.deepcopy(parsed[parse_key]), stat
+
+    def discard(self, path):
+        """Removes a znode from the cache."""
+        self.invalidation_seq += 1
+        self.entries.pop(path, None)
+
+    def clear(self):
+        """Removes all znodes from the cache."""
+        self.invalidation_seq += 1
+        self.entries.clear()
+
+    def _handle_event(self, event):
+        self.discard(event.path)
+
+    def _handle_state(self, state):
+        # The watches may be lost while the connection is interrupted
+        if state != KazooState.CONNECTED:
+            self.clear()
+
+
 class ZnodeModel(object):
     """A data mapper between ZooKeeper and in-memory model.
 
     This mapper could prevent concurrent writing by optimistic concurrencty
     control.
+
+    The reading could be served by :attr:`ZnodeModel.cache` if it has been
+    installed for the same client.
     """
 
     PATH_PATTERN = None
     MARSHMALLOW_SCHEMA = None
 
+    #: The optional :class:`ZnodeCache` which is shared by all models
+    cache = None
+
     _MALFORMED_DATA_EXCEPTIONS = (ValueError, ValidationError)
 
     def __init__(self, client, **kwargs):
@@ -45,16 +128,54 @@ class ZnodeModel(object):
 
         :raises MalformedDataError: The data source is malformed.
         """
+        cache = self._get_cache()
         try:
-            data, stat = self.client.get(self.path)
+            if cache is None:
+                data, stat = self.client.get(self.path)
+            else:
+                data, stat = cache.get(
+                    self.path, self._parse, type(self))
         except NoNodeError:
             return
+        if cache is None:
+            self.feed(data, stat)
+            return
+        self.stat = stat
+        if data is not None:
+            self.data = data
+
+    def feed(self, data, stat):
+        """Parses the data and stat which have been fetched elsewhere.
+
+        It is useful for filling a model with the data of a cached znode
+        instead of reading ZooKeeper again.
+
+        :param data: The raw data of the znode.
+        :param stat: The :class:`kazoo.protocol.states.ZnodeStat` of the znode.
+        :raises MalformedDataError: The data source is malformed.
+        """
         self.stat = stat
         if data:
-            try:
-                self.data, _ = self.MARSHMALLOW_SCHEMA.loads(data)
-            except self._MALFORMED_DATA_EXCEPTIONS as e:
-                raise MalformedDataError(self, e)
+            self.data = self._parse(data)
+
+    def _parse(self, data):
+        if not data:
+            return
+        try:
+            data, _ = self.MARSHMALLOW_SCHEMA.loads(data)
+        except self._MALFORMED_DATA_EXCEPTIONS as e:
+            raise MalformedDataError(self, e)
+        return data
+
+    def _get_cache(self):
+        cache = self.cache
+        if cache is not None and cache.client is self.client:
+            return cache
+
+    def _discard_cache(self):
+        cache = self._get_cache()
+        if cache is not None:
+            cache.discard(self.path)
 
     def save(self, version=None):
         """Saves the data in this instance to ZooKeeper.
@@ -68,6 +189,8 @@ class ZnodeModel(object):
         """
         data, _ = self.MARSHMALLOW_SCHEMA.dumps(self.data)
         self.MARSHMALLOW_SCHEMA.loads(data)  # raise ValidationError if need
+        # The cached znode is outdated whether the writing succeeds or not
+        self._discard_cache()
         if self.stat is None:
             try:
                 self.client.create(self.path, data, makepath=True)
@@ -98,6 +221,7 @@ class ZnodeModel(object):
             raise OutOfSyncError()
         if version is None:
             version = self.stat.version
+        self._discard_cache()
         try:
             self.client.delete(self.path, version=version, recursive=False)
         except BadVersionError as e:
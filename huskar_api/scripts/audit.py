@@ -0,0 +1,169 @@
+from __future__ import absolute_import
+
+import collections
+import datetime
+import logging
+import re
+
+from sqlalchemy import text
+
+from huskar_api import settings
+from .db import get_engine
+
+
+__all__ = ['create_audit_partitions', 'archive_audit_partitions']
+
+logger = logging.getLogger(__name__)
+
+#: The tables which are partitioned by "created_at" monthly
+AUDIT_TABLES = ['audit_log', 'audit_index', 'audit_index_instance']
+
+PARTITION_NAME_RE = re.compile(r'^p(\d{4})(\d{2})$')
+
+
+def _add_months(month, count):
+    year, index = divmod(month.year * 12 + month.month - 1 + count, 12)
+    return datetime.date(year, index + 1, 1)
+
+
+def _parse_month(partition_name):
+    match = PARTITION_NAME_RE.match(partition_name)
+    if match is not None:
+        return datetime.date(int(match.group(1)), int(match.group(2)), 1)
+
+
+def _list_partitions(connection, table_name):
+    rs = connection.execute(text(
+        'SELECT PARTITION_NAME FROM information_schema.PARTITIONS '
+        'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table_name '
+        'ORDER BY PARTITION_ORDINAL_POSITION'), table_name=table_name)
+    return [r[0] for r in rs if r[0]]
+
+
+def _make_partition(month):
+    return "PARTITION p{0:%Y%m} VALUES LESS THAN (TO_DAYS('{1}'))".format(
+        month, _add_months(month, 1).isoformat())
+
+
+def create_audit_partitions(months=None):
+    """Creates the monthly partitions of audit tables in advance.
+
+    The new partitions are split from the ``pmax`` partition, which should
+    be empty if this script runs regularly.
+
+    :param months: The count of months to be created after the current one.
+                   Default is ``AUDIT_PARTITION_AHEAD_MONTHS``.
+    """
+    if months is None:
+        months = settings.AUDIT_PARTITION_AHEAD_MONTHS
+    this_month = datetime.date.today().replace(day=1)
+    last_month = _add_months(this_month, months)
+    with get_engine().connect() as connection:
+        for table_name in AUDIT_TABLES:
+            partition_names = _list_partitions(connection, table_name)
+            if 'pmax' not in partition_names:
+                logger.warning('Skip %s because it is not partitioned.',
+                               table_name)
+                continue
+            bounded_months = [
+                m for m in map(_parse_month, partition_names) if m]
+            # The missed months must be split from "pmax" also, or their
+            # audit logs would be kept in "pmax" forever
+            month = this_month
+            if bounded_months:
+                month = _add_months(max(bounded_months), 1)
+            partitions = []
+            while month <= last_month:
+                partitions.append(_make_partition(month))
+                month = _add_months(month, 1)
+            if not partitions:
+                continue
+            partitions.append('PARTITION pmax VALUES LESS THAN MAXVALUE')
+            connection.execute(
+                'ALTER TABLE {0} REORGANIZE PARTITION pmax INTO ({1})'.format(
+                    table_name, ', '.join(partitions)))
+            logger.info('[%s] Created %d partitions',
+                        table_name, len(partitions) - 1)
+
+
+def archive_audit_partitions(months=None):
+    """Moves the old partitions of audit tables to compressed cold tables.
+
+    Each partition is exchanged with an empty table named like
+    ``audit_log_archive_201801``, which will be compressed and then the
+    partition will be dropped. The cold tables could be dumped and dropped
+    by DBA at any time.
+
+    The audit logs and their indices are archived month by month, and the
+    archiving stops at the first failure. It is safe to run again after a
+    failure.
+
+    :param months: The count of recent months to be kept.
+                   Default is ``AUDIT_RETENTION_MONTHS``.
+    """
+    if months is None:
+        months = settings.AUDIT_RETENTION_MONTHS
+    this_month = datetime.date.today().replace(day=1)
+    cutoff_month = _add_months(this_month, -months)
+    with get_engine().connect() as connection:
+        partitions = collections.defaultdict(list)
+        for table_name in AUDIT_TABLES:
+            for partition_name in _list_partitions(connection, table_name):
+                month = _parse_month(partition_name)
+                if month is not None and month < cutoff_month:
+                    partitions[month].append((table_name, partition_name))
+        for month in sorted(partitions):
+            for table_name, partition_name in partitions[month]:
+                archive_name = '{0}_archive_{1:%Y%m}'.format(
+                    table_name, month)
+                try:
+                    _archive_partition(
+                        connection, table_name, partition_name,
+                        archive_name)
+                except Exception as e:
+                    logger.exception('[%s] Failed to archive %s into %s: %s',
+                                     table_name, partition_name,
+                                     archive_name, e)
+                    return
+                logger.info('[%s] Archived %s into %s',
+                            table_name, partition_name, archive_name)
+
+
+def _archive_partition(connection, table_name, partition_name, archive_name):
+    _execute(connection, table_name, 'CREATE TABLE IF NOT EXISTS {0} LIKE {1}',
+             archive_name, table_name)
+    if _list_partitions(connection, archive_name):
+        _execute(connection, table_name, 'ALTER TABLE {0} REMOVE PARTITIONING',
+                 archive_name)
+    # The partition has been exchanged already if it is empty
+    if _count_rows(connection, '{0} PARTITION ({1})'.format(
+            table_name, partition_name)):
+        if _count_rows(connection, archive_name):
+            raise RuntimeError('{0} is not empty'.format(archive_name))
+        # The row format of both tables should be the same while exchanging
+        _execute(connection, table_name,
+                 'ALTER TABLE {0} EXCHANGE PARTITION {1} WITH TABLE {2}',
+                 table_name, partition_name, archive_name)
+    if _get_row_format(connection, archive_name) != 'Compressed':
+        _execute(connection, table_name,
+                 'ALTER TABLE {0} ROW_FORMAT=COMPRESSED', archive_name)
+    _execute(connection, table_name, 'ALTER TABLE {0} DROP PARTITION {1}',
+             table_name, partition_name)
+
+
+def _get_row_format(connection, table_name):
+    return connection.execute(text(
+        'SELECT ROW_FORMAT FROM information_schema.TABLES '
+        'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table_name'),
+        table_name=table_name).scalar()
+
+
+def _count_rows(connection, table_reference):
+    return connection.execute(
+        'SELECT COUNT(*) FROM {0}'.format(table_reference)).scalar()
+
+
+def _execute(connection, table_name, statement, *args):
+    statement = statement.format(*args)
+    connection.execute(statement)
+    logger.info('[%s] Done: %s', table_name, statement)
@@ -0,0 +1,153 @@
+from __future__ import absolute_import
+
+import collections
+import io
+import logging
+import os
+import time
+
+from gevent import sleep
+from gevent.pool import Pool
+
+
+logger = logging.getLogger(__name__)
+
+
+def _get_job_name(job):
+    # The job may be wrapped by functools.partial
+    job = getattr(job, 'func', job)
+    return getattr(job, '__name__', repr(job))
+
+
+class RateLimiter(object):
+    """Spaces out the operations to keep a global rate.
+
+    :param rate: The max count of operations per second. ``None`` or ``0``
+                 means unlimited.
+    """
+
+    def __init__(self, rate=None):
+        self.interval = 1.0 / rate if rate else 0
+        self.next_time = 0
+
+    def acquire(self, cost=1):
+        """Blocks the current greenlet until the operations are allowed.
+
+        :param cost: The count of operations which will be performed.
+        """
+        if not self.interval:
+            return
+        now = time.time()
+        wait_time = self.next_time - now
+        self.next_time = max(self.next_time, now) + self.interval * cost
+        if wait_time > 0:
+            sleep(wait_time)
+
+
+class Checkpoint(object):
+    """The progress of finished jobs, which is persisted in a local file.
+
+    :param path: The path of the checkpoint file. ``None`` disables the
+                 persistence.
+    :param max_age: Optional. The seconds to keep the checkpoint file since
+                    it was written last time. An older file is left by a run
+                    which was not finished, and will be ignored.
+    """
+
+    def __init__(self, path=None, max_age=None):
+        self.path = path
+        self.finished = set()
+        if path and max_age and os.path.exists(path) and \
+                time.time() - os.path.getmtime(path) > max_age:
+            logger.info('Discard the expired checkpoint %s', path)
+            os.remove(path)
+        if path and os.path.exists(path):
+            with io.open(path, encoding='utf-8') as checkpoint_file:
+                self.finished.update(
+                    line.rstrip(u'\n') for line in checkpoint_file)
+            logger.info('Resume from %d finished jobs in %s',
+                        len(self.finished), path)
+
+    def __contains__(self, key):
+        return key in self.finished
+
+    def mark(self, key):
+        self.finished.add(key)
+        if self.path:
+            with io.open(self.path, 'a', encoding='utf-8') as checkpoint_file:
+                checkpoint_file.write(u'%s\n' % key)
+
+    def discard(self):
+        """Removes the checkpoint file after all jobs are finished."""
+        self.finished.clear()
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class Executor(object):
+    """The concurrent and rate-limited executor of maintenance jobs.
+
+    Example::
+
+        executor = Executor(concurrency=10, rate=100)
+        summary = executor.run(vacuum, application_names)
+
+    A job is called with an item and returns an iterable of outcomes, which
+    will be counted in the summary. The job should call
+    :meth:`Executor.acquire` before touching ZooKeeper, so the load of
+    ZooKeeper is predictable whatever the concurrency is. A job which raises
+    an exception or yields an ``'error'`` is not recorded as finished.
+
+    :param concurrency: The max count of running jobs.
+    :param rate: Optional. The max count of operations per second.
+    :param checkpoint_path: Optional. The file to record finished jobs. The
+                            jobs recorded in it will be skipped, and it will
+                            be removed after all jobs are finished.
+    :param checkpoint_max_age: Optional. See :class:`Checkpoint`.
+    """
+
+    def __init__(self, concurrency, rate=None, checkpoint_path=None,
+                 checkpoint_max_age=None):
+        self.pool = Pool(max(concurrency, 1))
+        self.rate_limiter = RateLimiter(rate)
+        self.checkpoint = Checkpoint(checkpoint_path, checkpoint_max_age)
+
+    def acquire(self, cost=1):
+        self.rate_limiter.acquire(cost)
+
+    def run(self, job, items, key=unicode):
+        """Runs the job with all items and waits for them.
+
+        :param job: The function which accepts an item.
+        :param items: The iterable of items.
+        :param key: The function to make a checkpoint key of an item.
+        :returns: A :class:`collections.Counter` of outcomes.
+        """
+        summary = collections.Counter()
+        started_at = time.time()
+        for item in items:
+            item_key = key(item)
+            if item_key in self.checkpoint:
+                summary['resumed'] += 1
+                continue
+            self.pool.spawn(self._run_job, job, item, item_key, summary)
+        self.pool.join()
+        if not summary['error']:
+            self.checkpoint.discard()
+        logger.info('Summary of %s in %.2fs: %s', _get_job_name(job),
+                    time.time() - started_at,
+                    ', '.join('%s=%d' % i for i in sorted(summary.items())))
+        return summary
+
+    def _run_job(self, job, item, item_key, summary):
+        outcomes = collections.Counter()
+        try:
+            outcomes.update(job(item))
+        except Exception as e:
+            logger.exception('Failed to run %s with %r: %s',
+                             _get_job_name(job), item, e)
+            outcomes['error'] += 1
+        summary.update(outcomes)
+        # The job which met any error will be run again in the next time
+        if not outcomes['error']:
+            self.checkpoint.mark(item_key)
@@ -3,7 +3,11 @@ from __future__ import absolute_import
 import logging
 import collections
 
-from huskar_api.models import huskar_client
+from kazoo.exceptions import NoNodeError
+from more_itertools import chunked
+
+from huskar_api import settings
+from huskar_api.models import huskar_client, redis_client
 from huskar_api.models.auth import Application
 from huskar_api.models.infra import InfraDownstream, extract_application_names
 from huskar_api.models.instance import InfraInfo
@@ -12,6 +16,8 @@ from huskar_api.models.const import INFRA_CONFIG_KEYS
 
 logger = logging.getLogger(__name__)
 
+REDIS_KEY_VERSIONS = 'huskar_api.scripts.infra.versions'
+
 
 InfraUpstreamInfo = collections.namedtuple('InfraUpstreamInfo', [
     'infra_type',
@@ -23,8 +29,9 @@ InfraUpstreamInfo = collections.namedtuple('InfraUpstreamInfo', [
 ])
 
 
-def _collect_infra_upstream(client, application_name):
-    for infra_type in INFRA_CONFIG_KEYS:
+def _make_infra_infos(client, application_name):
+    infra_infos = []
+    for infra_type in sorted(INFRA_CONFIG_KEYS):
         try:
             infra_info = InfraInfo(client, application_name, infra_type)
         except ValueError:
@@ -32,7 +39,39 @@ def _collect_infra_upstream(client, application_name):
                 'ValueError with appid: %s type: %s',
                 application_name, infra_type)
             continue
-        infra_info.load()
+        infra_infos.append((infra_type, infra_info))
+    return infra_infos
+
+
+def _fetch_infra_infos(client, infra_infos):
+    # Sends all requests before waiting for any of them
+    async_results = [
+        client.get_async(info.path) for _, info in infra_infos]
+    for (_, infra_info), async_result in zip(infra_infos, async_results):
+        try:
+            data, stat = async_result.get()
+        except NoNodeError:
+            infra_info.feed(None, None)
+            continue
+        infra_info.feed(data, stat)
+
+
+def _fetch_infra_stats(client, infra_infos):
+    # Only the stats are fetched, which are enough to compare versions
+    async_results = [
+        client.exists_async(info.path) for _, info in infra_infos]
+    for (_, infra_info), async_result in zip(infra_infos, async_results):
+        infra_info.feed(None, async_result.get())
+
+
+def _make_infra_version(infra_infos):
+    return ','.join(
+        '%s:%d' % (infra_type, info.stat.mzxid if info.stat else 0)
+        for infra_type, info in infra_infos)
+
+
+def _iter_infra_upstream(infra_infos):
+    for infra_type, infra_info in infra_infos:
         infra_data = infra_info.data or {}
         for scope_type, scope_data in infra_data.iteritems():
             for scope_name, scope_dict in scope_data.iteritems():
@@ -50,6 +89,12 @@ def _collect_infra_upstream(client, application_name):
                             infra_application_name)
 
 
+def _collect_infra_upstream(client, application_name):
+    infra_infos = _make_infra_infos(client, application_name)
+    _fetch_infra_infos(client, infra_infos)
+    return _iter_infra_upstream(infra_infos)
+
+
 def _bind_infra_upstream(builder, iterator, application_name):
     for upstream in sorted(frozenset(iterator)):
         builder.bind(
@@ -63,24 +108,76 @@ def _bind_infra_upstream(builder, iterator, application_name):
         yield upstream
 
 
-def collect_infra_config():
+def _load_infra_versions():
+    return redis_client.hgetall(REDIS_KEY_VERSIONS) or {}
+
+
+def _save_infra_versions(versions):
+    if versions:
+        redis_client.hmset(REDIS_KEY_VERSIONS, versions)
+
+
+def collect_infra_config(incremental=False):
+    """Collects the downstream of infra config from ZooKeeper.
+
+    The infra znodes of applications are fetched concurrently in chunks, and
+    their versions (``mzxid``) are recorded after the bindings committed.
+
+    :param incremental: ``True`` to skip the applications whose infra znodes
+                        are unchanged since the last collecting. Only the
+                        stats of znodes are fetched to compare versions, and
+                        the data of changed ones are fetched then. The stale
+                        bindings of deleted applications will be kept until
+                        the next full collecting.
+    """
     logger.info('Looking up application list')
-    application_list = Application.get_all()
+    application_names = [
+        application.application_name
+        for application in Application.get_all()]
+    last_versions = _load_infra_versions() if incremental else {}
     builder = InfraDownstream.bindmany()
     client = huskar_client.client
+    skipped_count = 0
 
-    for application in application_list:
-        application_name = application.application_name
-        logger.info('Collecting %s', application_name)
-        iterator = _collect_infra_upstream(client, application_name)
-        iterator = _bind_infra_upstream(builder, iterator, application_name)
-        for upstream in iterator:
-            logger.info('Recorded %r', upstream)
-            InfraDownstream.flush_cache_by_application(
-                upstream.infra_application_name)
+    for chunk in chunked(application_names, settings.INFRA_COLLECT_CHUNK_SIZE):
+        chunk_infra_infos = [
+            (name, _make_infra_infos(client, name)) for name in chunk]
+        if incremental:
+            _fetch_infra_stats(client, [
+                item for _, infra_infos in chunk_infra_infos
+                for item in infra_infos])
+            changed_infra_infos = [
+                (name, infra_infos) for name, infra_infos in chunk_infra_infos
+                if last_versions.get(name) != _make_infra_version(infra_infos)]
+            skipped_count += len(chunk_infra_infos) - len(changed_infra_infos)
+            chunk_infra_infos = changed_infra_infos
+        _fetch_infra_infos(client, [
+            item for _, infra_infos in chunk_infra_infos
+            for item in infra_infos])
+        versions = {}
+        for application_name, infra_infos in chunk_infra_infos:
+            version = _make_infra_version(infra_infos)
+            logger.info('Collecting %s', application_name)
+            iterator = _iter_infra_upstream(infra_infos)
+            iterator = _bind_infra_upstream(
+                builder, iterator, application_name)
+            for upstream in iterator:
+                logger.info('Recorded %r', upstream)
+                InfraDownstream.flush_cache_by_application(
+                    upstream.infra_application_name)
+            if incremental:
+                builder.unbind_stale(application_name)
+            versions[application_name] = version
         builder.commit()
-        logger.info('Committed %s', application_name)
+        _save_infra_versions(versions)
+        logger.info('Committed %d applications', len(versions))
+
+    if not incremental:
+        logger.info('Deleting stale records')
+        builder.unbind_stale().commit()
+    logger.info('Done with %d unchanged applications', skipped_count)
+
 
-    logger.info('Deleting stale records')
-    builder.unbind_stale().commit()
-    logger.info('Done')
+def refresh_infra_config():
+    """Collects the downstream of changed infra config only."""
+    collect_infra_config(incremental=True)
@@ -1,6 +1,8 @@
 from __future__ import absolute_import
 
+import functools
 import logging
+import os
 
 from huskar_sdk_v2.consts import (
     SERVICE_SUBDOMAIN, SWITCH_SUBDOMAIN, CONFIG_SUBDOMAIN)
@@ -12,49 +14,95 @@ from huskar_api.models.instance import InstanceManagement
 from huskar_api.models.container import ContainerManagement
 from huskar_api.models.exceptions import (
     NotEmptyError, OutOfSyncError, MalformedDataError)
+from .executor import Executor
 
 
 logger = logging.getLogger(__name__)
 
 
-def _vacuum_empty_clusters(type_name):
-    for application_name in application_manifest.as_list():
-        if application_name in settings.AUTH_APPLICATION_BLACKLIST:
-            continue
-        logger.info('[%s] Check application %s', type_name, application_name)
-        im = InstanceManagement(huskar_client, application_name, type_name)
+def _make_executor(checkpoint_name):
+    checkpoint_path = None
+    if settings.VACUUM_CHECKPOINT_DIR:
+        checkpoint_path = os.path.join(
+            settings.VACUUM_CHECKPOINT_DIR, '%s.checkpoint' % checkpoint_name)
+    return Executor(
+        settings.VACUUM_CONCURRENCY, settings.VACUUM_RATE_LIMIT,
+        checkpoint_path, settings.VACUUM_CHECKPOINT_MAX_AGE)
+
+
+def _iter_application_names(type_names):
+    application_names = application_manifest.as_list()
+    for type_name in type_names:
+        for application_name in application_names:
+            if application_name in settings.AUTH_APPLICATION_BLACKLIST:
+                continue
+            yield type_name, application_name
+
+
+def _vacuum_empty_clusters(executor, item):
+    type_name, application_name = item
+    logger.info('[%s] Check application %s', type_name, application_name)
+    im = InstanceManagement(huskar_client, application_name, type_name)
+    executor.acquire()
+    try:
+        cluster_names = im.list_cluster_names()
+    except Exception as e:
+        logger.exception('Skip %s because %s.', application_name, e)
+        yield 'error'
+        return
+    for cluster_name in cluster_names:
+        ident = (application_name, type_name, cluster_name)
+        # Two loads and a delete for each cluster
+        executor.acquire(3)
         try:
-            for cluster_name in im.list_cluster_names():
-                ident = (application_name, type_name, cluster_name)
-                try:
-                    im.delete_cluster(cluster_name)
-                except OutOfSyncError:
-                    logger.info('Skip %r because of changed version.', ident)
-                except NotEmptyError as e:
-                    logger.info(
-                        'Skip %r because %s.', ident, e.args[0].lower())
-                except MalformedDataError:
-                    logger.info('Skip %r because of unrecognized data.', ident)
-                else:
-                    logger.info('Okay %r is gone.', ident)
+            im.delete_cluster(cluster_name)
+        except OutOfSyncError:
+            logger.info('Skip %r because of changed version.', ident)
+            yield 'skipped'
+        except NotEmptyError as e:
+            logger.info('Skip %r because %s.', ident, e.args[0].lower())
+            yield 'skipped'
+        except MalformedDataError:
+            logger.info('Skip %r because of unrecognized data.', ident)
+            yield 'skipped'
         except Exception as e:
-            logger.exception('Skip %s because %s.', application_name, e)
+            logger.exception('Skip %r because %s.', ident, e)
+            yield 'error'
+        else:
+            logger.info('Okay %r is gone.', ident)
+            yield 'deleted'
 
 
 def vacuum_empty_clusters():
     logger.info('Begin to vacuum empty clusters')
-    for type_name in (
-            SERVICE_SUBDOMAIN, SWITCH_SUBDOMAIN, CONFIG_SUBDOMAIN):
-        _vacuum_empty_clusters(type_name)
+    executor = _make_executor('vacuum_empty_clusters')
+    items = _iter_application_names(
+        (SERVICE_SUBDOMAIN, SWITCH_SUBDOMAIN, CONFIG_SUBDOMAIN))
+    summary = executor.run(
+        functools.partial(_vacuum_empty_clusters, executor), items,
+        key=u':'.join)
     logger.info('Done to vacuum empty clusters')
+    return summary
+
+
+def _vacuum_stale_barrier(executor, container_id):
+    management = ContainerManagement(huskar_client, container_id)
+    # An exists and an optional delete for each barrier
+    executor.acquire(2)
+    if management.vacuum_stale_barrier():
+        logger.info('Delete stale barrier of container %s', container_id)
+        yield 'deleted'
+    else:
+        logger.info('Skip barrier of container %s', container_id)
+        yield 'skipped'
 
 
 def vacuum_stale_barriers():
     logger.info('Begin to vacuum stale container barriers')
-    vacuum_iterator = ContainerManagement.vacuum_stale_barriers(huskar_client)
-    for container_id, is_stale in vacuum_iterator:
-        if is_stale:
-            logger.info('Delete stale barrier of container %s', container_id)
-        else:
-            logger.info('Skip barrier of container %s', container_id)
+    executor = _make_executor('vacuum_stale_barriers')
+    container_ids = ContainerManagement.list_barrier_container_ids(
+        huskar_client)
+    summary = executor.run(
+        functools.partial(_vacuum_stale_barrier, executor), container_ids)
     logger.info('Done to vacuum stale container barriers')
+    return summary
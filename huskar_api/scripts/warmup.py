@@ -0,0 +1,153 @@
+from __future__ import absolute_import
+
+import collections
+import logging
+
+from sqlalchemy import func
+
+from huskar_api import settings
+from huskar_api.models import DBSession
+from huskar_api.models.auth import (
+    User, Team, Application, ApplicationAuth, Authority)
+from huskar_api.models.webhook.webhook import WebhookSubscription
+
+
+__all__ = ['warm_up_caches']
+
+logger = logging.getLogger(__name__)
+
+
+def _iter_chunks(model, chunk_size):
+    """Iterates all rows of a table in chunks ordered by primary key.
+
+    The keyset of primary key is used instead of offset, so the cost of
+    each query is constant even on the tail of a large table.
+    """
+    pk = model.pk_attribute()
+    last_pk = None
+    while True:
+        query = DBSession().query(model)
+        if last_pk is not None:
+            query = query.filter(pk > last_pk)
+        rows = query.order_by(pk.asc()).limit(chunk_size).all()
+        # Detaches the rows to keep the identity map small
+        DBSession().close()
+        if not rows:
+            return
+        yield rows
+        last_pk = getattr(rows[-1], model.pk_name())
+
+
+def _warm_up_users(users):
+    users = [user for user in users if user.is_active]
+    User.get_id_by_name.set_many(
+        [((user.username,), user.id) for user in users], nx=True)
+    User.get_id_by_email.set_many(
+        [((user.email,), user.id) for user in users if user.email], nx=True)
+
+
+def _warm_up_teams(teams):
+    teams = [team for team in teams if team.status == Team.STATUS_ACTIVE]
+    Team.get_id_by_name.set_many(
+        [((team.team_name,), team.id) for team in teams], nx=True)
+
+
+def _warm_up_applications(applications):
+    applications = [application for application in applications
+                    if application.status == Application.STATUS_ACTIVE]
+    Application.get_id_by_name.set_many(
+        [((application.application_name,), application.id)
+         for application in applications], nx=True)
+
+
+def _warm_up_application_auths(auths):
+    # The authority is passed as enum in the key of cache
+    ApplicationAuth.find_id.set_many(
+        [((Authority(auth.authority), auth.user_id, auth.application_id),
+          auth.id) for auth in auths], nx=True)
+
+
+def _warm_up_webhook_subscriptions(subscriptions):
+    WebhookSubscription.get_id.set_many(
+        [((sub.application_id, sub.webhook_id, sub.action_type), sub.id)
+         for sub in subscriptions], nx=True)
+    WebhookSubscription.get_ids.set_many(
+        [((sub.application_id, sub.webhook_id, sub.action_type), [sub.id])
+         for sub in subscriptions], nx=True)
+
+
+def _warm_up_application_ids_by_team():
+    # The lists are collected from a single query instead of the chunks, so
+    # a concurrent change could hardly be overridden by an outdated list.
+    rs = DBSession().query(Application.team_id, Application.id) \
+                    .filter_by(status=Application.STATUS_ACTIVE) \
+                    .order_by(Application.id.asc()).all()
+    ids_by_team = collections.defaultdict(list)
+    for team_id, application_id in rs:
+        ids_by_team[team_id].append(application_id)
+    Application.get_ids_by_team.set_many(
+        [((team_id,), ids) for team_id, ids in ids_by_team.items()], nx=True)
+
+
+def _warm_up_webhook_subscription_ids():
+    rs = DBSession().query(
+        WebhookSubscription.application_id, WebhookSubscription.webhook_id,
+        WebhookSubscription.id).order_by(WebhookSubscription.id.asc()).all()
+    ids_by_args = collections.defaultdict(list)
+    for application_id, webhook_id, subscription_id in rs:
+        ids_by_args[application_id, webhook_id, None].append(subscription_id)
+        ids_by_args[application_id, None, None].append(subscription_id)
+    WebhookSubscription.get_ids.set_many(ids_by_args.items(), nx=True)
+
+
+#: The tables to warm up, with the hooks of rows and the hooks of lists
+WARM_UP_TABLES = collections.OrderedDict([
+    ('user', (User, _warm_up_users, [User.get_ids_of_normal])),
+    ('team', (Team, _warm_up_teams, [Team.get_all_ids])),
+    ('application', (Application, _warm_up_applications, [
+        Application.get_all_ids, _warm_up_application_ids_by_team])),
+    ('application_auth', (ApplicationAuth, _warm_up_application_auths, [])),
+    ('webhook_subscription', (
+        WebhookSubscription, _warm_up_webhook_subscriptions,
+        [_warm_up_webhook_subscription_ids])),
+])
+
+
+def warm_up_table(table_name, chunk_size=None):
+    """Fills the cache of a table before the traffic comes.
+
+    The rows are written to the table cache and the name-to-id caches with
+    ``SET NX`` in pipelines, so the values filled by requests meanwhile are
+    never overridden.
+
+    :param table_name: The name of table in :data:`WARM_UP_TABLES`.
+    :param chunk_size: The count of rows fetched in a query.
+    :returns: The count of warmed up rows.
+    """
+    model, warm_up_rows, warm_up_lists = WARM_UP_TABLES[table_name]
+    chunk_size = chunk_size or settings.CACHE_WARMUP_CHUNK_SIZE
+    total = DBSession().query(func.count(model.pk_attribute())).scalar()
+    count = 0
+    for rows in _iter_chunks(model, chunk_size):
+        model.mset(rows, nx=True)
+        warm_up_rows(rows)
+        count += len(rows)
+        logger.info('[%s] Warmed up %d/%d rows', table_name, count, total)
+    for warm_up_list in warm_up_lists:
+        warm_up_list()
+    DBSession().close()
+    logger.info('[%s] Warmed up %d lists', table_name, len(warm_up_lists))
+    return count
+
+
+def warm_up_caches():
+    """Fills the caches of identity and organization tables.
+
+    It should be run after the cache cluster is flushed or replaced, to
+    prevent the cold cache from sending all requests to the database.
+    """
+    for table_name in WARM_UP_TABLES:
+        try:
+            warm_up_table(table_name)
+        except Exception as e:
+            logger.exception('Skip %s because %s.', table_name, e)
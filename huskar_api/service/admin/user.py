@@ -6,7 +6,7 @@ import datetime
 from flask import abort
 from werkzeug.security import safe_str_cmp
 
-from huskar_api.models import DBSession, cache_manager
+from huskar_api.models import DBSession, cache_manager, batch_invalidation
 from huskar_api.models.auth import User
 from huskar_api.extras.email import deliver_email, EmailTemplate
 
@@ -56,5 +56,9 @@ def reset_password(username, token, new_password):
 
 # TODO deprecate
 def change_email(user, new_email):
+    old_email = user.email
     with DBSession().close_on_exit(False):
         user.email = new_email
+    with batch_invalidation():
+        User.get_id_by_email.flush(old_email)
+        User.get_id_by_email.flush(new_email)
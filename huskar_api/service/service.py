@@ -84,6 +84,97 @@ class ServiceData(DataBase):
                 raise OutOfSyncError(e)
             return cls.info_class(new_value, stat)
 
+    @classmethod
+    def save_many(cls, application, entries):
+        """Register multiple service instances of an application.
+
+        It does the same thing as :meth:`ServiceData.save` for each entry,
+        but the requests to ZooKeeper are pipelined. The failure of an entry
+        does not affect others.
+
+        :param str application: The name of application (appid).
+        :param list entries: A list of ``(cluster, key, value, runtime,
+                             version)`` tuples. The meanings of items are the
+                             same as :meth:`ServiceData.save`.
+        :returns: A list of ``(old_data, result)`` in the same order. The
+                  ``old_data`` is the raw value before saving, and the
+                  ``result`` is either an info or an exception instance of
+                  :exc:`ServiceValueError` or :exc:`OutOfSyncError`.
+        """
+        raw_client = cls.client.raw_client
+        service_paths = [
+            cls.client.get_path(application, cluster, encode_key(key))
+            for cluster, key, _, _, _ in entries]
+        clusters = sorted(set(cluster for cluster, _, _, _, _ in entries))
+        for cluster in clusters:
+            cls.check_cluster_name_in_creation(application, cluster)
+            raw_client.ensure_path(cls.client.get_path(application, cluster))
+
+        results = [None] * len(entries)
+        old_data = [None] * len(entries)
+        writings = []
+        reading_results = [raw_client.get_async(service_path)
+                           for service_path in service_paths]
+        for index, (entry, service_path, reading_result) in enumerate(
+                zip(entries, service_paths, reading_results)):
+            _, _, value, runtime, version = entry
+            try:
+                remote_value, stat = reading_result.get()
+            except NoNodeError:
+                if not value:
+                    results[index] = ServiceValueError(
+                        '`value` should be provided while creating service.')
+                    continue
+                new_value = {}
+                new_value.update(value or {})
+                new_value.update(runtime or {})
+                json_new_value = json.dumps(new_value)
+                writing_result = raw_client.create_async(
+                    service_path, json_new_value)
+                writings.append(
+                    (index, new_value, json_new_value, writing_result))
+            else:
+                old_data[index] = remote_value
+                if version is None:
+                    version = stat.version
+                try:
+                    remote_value = json.loads(remote_value)
+                except (ValueError, TypeError):
+                    logger.warning('Failed to parse %r', service_path)
+                    remote_value = {}
+                new_value = dict(remote_value)
+                new_value.update(value or {})
+                new_value.update(runtime or {})
+                json_new_value = json.dumps(new_value)
+                writing_result = raw_client.set_async(
+                    service_path, json_new_value, version=version)
+                writings.append(
+                    (index, new_value, json_new_value, writing_result))
+
+        created = []
+        for index, new_value, json_new_value, writing_result in writings:
+            try:
+                stat = writing_result.get()
+            except (NoNodeError, NodeExistsError, BadVersionError) as e:
+                results[index] = OutOfSyncError(e)
+                continue
+            if old_data[index] is None:
+                zk_payload(payload_data=json_new_value, payload_type='create')
+                created.append((index, new_value, raw_client.exists_async(
+                    service_paths[index])))
+            else:
+                zk_payload(payload_data=json_new_value, payload_type='set')
+                results[index] = cls.info_class(new_value, stat)
+
+        for index, new_value, exists_result in created:
+            stat = exists_result.get()
+            if stat is None:
+                results[index] = OutOfSyncError()
+            else:
+                results[index] = cls.info_class(new_value, stat)
+
+        return zip(old_data, results)
+
 
 class ServiceLink(object):
     @classmethod
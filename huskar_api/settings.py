@@ -81,7 +81,14 @@ ZK_SETTINGS = {
 CACHE_SETTINGS = {
     'default': config.get('REDIS_URL', default=None),
 }
+# The options of circuit breaker in each redis client, e.g. "error_rate",
+# "slow_call_time", "min_calls", "window" and "open_time"
+CACHE_CIRCUIT_BREAKER_OPTIONS = config.get(
+    'CACHE_CIRCUIT_BREAKER_OPTIONS', default={})
 CACHE_CONTROL_SETTINGS = config.get('CACHE_CONTROL_SETTINGS', {})
+# Writes the versioned payloads of Redis cache instead of the legacy bz2 ones.
+# Enable it after all processes are able to read the versioned payloads.
+CACHE_VERSIONED_CODEC = config.get('CACHE_VERSIONED_CODEC', default=False)
 
 LEGACY_APPLICATION_LIST = frozenset(config.get(
     'LEGACY_APPLICATION_LIST', default=[]
@@ -150,12 +157,61 @@ LONG_POLLING_MAX_LIFE_SPAN_EXCLUDE = frozenset(config.get(
     'LONG_POLLING_MAX_LIFE_SPAN_EXCLUDE', default=[]))
 TREE_HOLDER_STARTUP_MAX_CONCURRENCY = config.get(
     'TREE_HOLDER_STARTUP_MAX_CONCURRENCY', default=50)
+# The count of ZooKeeper sessions which tree holders are spread over
+TREE_HUB_SESSION_COUNT = max(
+    config.get('TREE_HUB_SESSION_COUNT', default=1), 1)
 TREE_HOLDER_CLEANER_OLD_OFFSET = config.get(
     'TREE_HOLDER_CLEANER_OLD_OFFSET', default=7)  # 7 days
 TREE_HOLDER_CLEANER_CONDITION = config.get(
     'TREE_HOLDER_CLEANER_CONDITION', default='')
 TREE_HOLDER_CLEANER_PERIOD = config.get(
     'TREE_HOLDER_CLEANER_PERIOD', default=600)
+# The endpoints which read from tree holders if "consistency" is absent
+TREE_CACHED_READ_ENDPOINTS = frozenset(config.get(
+    'TREE_CACHED_READ_ENDPOINTS', default=[]))
+# The interval (seconds) of writing the queued upstream declarations
+ROUTE_DECLARE_UPSTREAM_INTERVAL = config.get(
+    'ROUTE_DECLARE_UPSTREAM_INTERVAL', default=10)
+# The seconds to trust the last known dependency of an application
+ROUTE_DECLARE_UPSTREAM_CACHE_TTL = config.get(
+    'ROUTE_DECLARE_UPSTREAM_CACHE_TTL', default=600)
+# The max count of znodes in the read-through cache of models (0 to disable)
+ZNODE_CACHE_MAX_SIZE = config.get('ZNODE_CACHE_MAX_SIZE', default=0)
+# The count of applications whose infra config is collected concurrently
+INFRA_COLLECT_CHUNK_SIZE = config.get('INFRA_COLLECT_CHUNK_SIZE', default=50)
+# The max count of concurrent jobs of vacuum scripts
+VACUUM_CONCURRENCY = config.get('VACUUM_CONCURRENCY', default=10)
+# The max count of ZooKeeper operations per second of vacuum scripts
+VACUUM_RATE_LIMIT = config.get('VACUUM_RATE_LIMIT', default=200)
+# The directory to keep progress checkpoints of vacuum scripts (optional)
+VACUUM_CHECKPOINT_DIR = config.get('VACUUM_CHECKPOINT_DIR', default=None)
+# The seconds to resume from a checkpoint since it was written last time, so
+# the items failed permanently do not keep a checkpoint for later runs
+VACUUM_CHECKPOINT_MAX_AGE = config.get(
+    'VACUUM_CHECKPOINT_MAX_AGE', default=43200)
+# The count of rows fetched in a query of the cache warm-up script
+CACHE_WARMUP_CHUNK_SIZE = config.get('CACHE_WARMUP_CHUNK_SIZE', default=500)
+# The max count of entries in a request of bulk service registration
+SERVICE_BULK_REGISTRY_MAX_SIZE = config.get(
+    'SERVICE_BULK_REGISTRY_MAX_SIZE', default=500)
+# The max count of instances written in one transaction of batch importing
+INSTANCE_IMPORT_CHUNK_SIZE = config.get(
+    'INSTANCE_IMPORT_CHUNK_SIZE', default=100)
+# The max count of audit logs waiting for the asynchronous writer
+AUDIT_LOG_QUEUE_SIZE = config.get('AUDIT_LOG_QUEUE_SIZE', default=10000)
+# The seconds to wait for a full queue before falling back to the logger
+AUDIT_LOG_QUEUE_TIMEOUT = config.get('AUDIT_LOG_QUEUE_TIMEOUT', default=0.5)
+# The max count of audit logs written in a transaction by the writer
+AUDIT_LOG_BATCH_SIZE = config.get('AUDIT_LOG_BATCH_SIZE', default=100)
+# The directory of spool files which keep the queued audit logs on disk.
+# The audit logs are written synchronously without it.
+AUDIT_LOG_SPOOL_DIR = config.get('AUDIT_LOG_SPOOL_DIR', default=None)
+# The count of monthly audit partitions to be created in advance
+AUDIT_PARTITION_AHEAD_MONTHS = config.get(
+    'AUDIT_PARTITION_AHEAD_MONTHS', default=3)
+# The count of recent months kept in audit tables, and the older partitions
+# are moved to cold tables by the archival script
+AUDIT_RETENTION_MONTHS = config.get('AUDIT_RETENTION_MONTHS', default=12)
 
 CONFIG_PREFIX_BLACKLIST = config.get(
     'CONFIG_PREFIX_BLACKLIST', default=['FX_'])
@@ -166,6 +222,11 @@ CONCURRENT_LIMITER_SETTINGS = config.get(
 
 TABLE_CACHE_EXPIRATION_TIME = config.get(
     'TABLE_CACHE_EXPIRATION_TIME', default=60 * 10)
+# The max count of table cache entries in process memory (0 to disable)
+TABLE_LOCAL_CACHE_MAX_SIZE = config.get(
+    'TABLE_LOCAL_CACHE_MAX_SIZE', default=0)
+TABLE_LOCAL_CACHE_EXPIRATION_TIME = config.get(
+    'TABLE_LOCAL_CACHE_EXPIRATION_TIME', default=5)
 
 FRAMEWORK_VERSIONS = config.get('FRAMEWORK_VERSIONS', default={})
 DANGEROUS_ACTION_NAMES_EXCLUDE_LIST = frozenset(config.get(
@@ -203,6 +264,7 @@ must_allow_all_via_api_endpoints = {
         'api.application',
         'api.application_token',
         'api.service_registry',
+        'api.service_bulk',
         'api.long_polling',
         'api.internal_container_registry',
     ]),
@@ -335,6 +397,12 @@ def update_tree_holder_cleaner_condition(value):
     TREE_HOLDER_CLEANER_CONDITION = value
 
 
+@config_manager.on_change('TREE_CACHED_READ_ENDPOINTS')
+def update_tree_cached_read_endpoints(value):
+    global TREE_CACHED_READ_ENDPOINTS
+    TREE_CACHED_READ_ENDPOINTS = frozenset(value or [])
+
+
 @config_manager.on_change('ALLOW_ALL_VIA_API_ENDPOINTS')
 def update_allow_all_via_api_endpoints(value):
     global ALLOW_ALL_VIA_API_ENDPOINTS
@@ -7,6 +7,7 @@ switch = bootstrap.get_huskar_switch()
 SWITCH_ENABLE_ROUTE_FORCE_CLUSTERS = 'switch_enable_route_force_clusters'
 SWITCH_ENABLE_MINIMAL_MODE = 'enable_minimal_mode'
 SWITCH_ENABLE_AUDIT_LOG = 'enable_audit_log'
+SWITCH_ENABLE_ASYNC_AUDIT_LOG = 'enable_async_audit_log'
 SWITCH_ENABLE_SENTRY_MESSAGE = 'enable_sentry_message'
 SWITCH_ENABLE_SENTRY_EXCEPTION = 'enable_sentry_exception'
 SWITCH_VALIDATE_SCHEMA = 'validate_schema'
@@ -27,6 +27,9 @@ case $1 in
     dumpdb)
         exec "${wrapper[@]}" python run.py huskar_api.scripts.db:dumpdb
         ;;
+    warmup)
+        exec "${wrapper[@]}" python run.py huskar_api.scripts.warmup:warm_up_caches
+        ;;
     initadmin)
         exec "${wrapper[@]}" python run.py huskar_api.cli:main initadmin
         ;;
@@ -80,6 +83,7 @@ case $1 in
         printf '    alembic\t\tMigrates the database schema.\n'
         printf '    initdb\t\tDrops and creates all database tables.\n'
         printf '    dumpdb\t\tDumps the schema and alembic version of database.\n'
+        printf '    warmup\t\tFills the caches of identity tables.\n'
         printf '    testall\t\tRuns testing for all modules.\n'
         printf '    test\t\tRuns testing for specified arguments.\n'
         printf '    docs\t\tBuilds docs with auto-reload support.\n'
@@ -208,6 +208,15 @@ def test_pagination(client, faker, test_user, test_team, admin_token):
     assert len(d) == 0
     assert [i['id'] for i in d] == []
 
+    d = request_with({'limit': 30})
+    assert [i['id'] for i in d] == audit_ids[:30]
+    d = request_with({'limit': 30, 'before_id': d[-1]['id']})
+    assert [i['id'] for i in d] == audit_ids[30:60]
+    d = request_with({'before_id': audit_ids[89]})
+    assert [i['id'] for i in d] == audit_ids[90:]
+    d = request_with({'before_id': audit_ids[-1]})
+    assert d == []
+
 
 @mark.parametrize('test_audit', ['data'], indirect=True)
 @mark.xparametrize
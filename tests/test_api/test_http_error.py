@@ -6,6 +6,7 @@ from flask import request, abort
 from huskar_api import settings
 from huskar_api.app import create_app
 from huskar_api.ext import sentry
+from huskar_api.models.cache import model_memo
 
 
 @fixture
@@ -133,3 +134,11 @@ def test_blacklist(mocker, client):
 
     r = request()
     assert r.status_code == 200
+
+
+def test_500_disables_model_memo(mocker, client):
+    mocker.spy(model_memo, 'enable')
+    r = client.get('/api/internal_server_error')
+    assert r.status_code == 500
+    assert model_memo.enable.call_count == 1
+    assert not model_memo.enabled
@@ -332,6 +332,47 @@ def test_get_data_failed(
         assert r.json['data'] is None
 
 
+def test_get_data_with_cached_consistency(
+        client, zk, test_application_name, test_application_token, mocker,
+        data_type):
+    from huskar_api.api.long_polling import tree_hub
+
+    path = '/huskar/%s/%s/stable/DB_URL' % (data_type, test_application_name)
+    url = '/api/%s/%s/stable' % (data_type, test_application_name)
+    headers = {'Authorization': test_application_token}
+    zk.create(path, b'foo', makepath=True)
+
+    r = client.get(url + '?consistency=cached', headers=headers)
+    assert_response_ok(r)
+    assert r.headers['X-Huskar-Data-Source'] == 'zookeeper'
+    assert [i['value'] for i in r.json['data']] == ['foo']
+
+    holder = tree_hub.get_tree_holder(test_application_name, data_type)
+    holder.block_until_initialized(5)
+    try:
+        r = client.get(url + '?consistency=cached&key=DB_URL', headers=headers)
+        assert_response_ok(r)
+        assert r.headers['X-Huskar-Data-Source'] == 'cache'
+        assert r.headers['X-Huskar-Data-Zxid'] == str(zk.get(path)[1].mzxid)
+        assert r.json['data']['value'] == 'foo'
+
+        mocker.patch.object(
+            settings, 'TREE_CACHED_READ_ENDPOINTS', ['api.%s' % data_type])
+        r = client.get(url, headers=headers)
+        assert_response_ok(r)
+        assert r.headers['X-Huskar-Data-Source'] == 'cache'
+        assert [i['value'] for i in r.json['data']] == ['foo']
+
+        r = client.get(url + '?consistency=strong', headers=headers)
+        assert r.headers['X-Huskar-Data-Source'] == 'zookeeper'
+    finally:
+        tree_hub.release_tree_holder(test_application_name, data_type)
+
+    r = client.get(url + '?consistency=whatever', headers=headers)
+    assert r.status_code == 400
+    assert r.json['message'] == 'Unrecognized "consistency"'
+
+
 def test_get_data_from_public_domain_application(
         client, zk, faker, test_application, test_application_token,
         data_type):
@@ -526,6 +567,7 @@ def test_batch_export(
     headers = {'Authorization': test_application_token}
     r = client.get(url, headers=headers)
     assert_response_ok(r)
+    assert r.is_streamed is True
     assert all(item['meta']['version'] > -1 for item in r.json['data'])
     assert sorted(
         {k: v for k, v in item.iteritems() if k != 'meta'}
@@ -589,7 +631,13 @@ def test_batch_import(
     }
     r = client.post(url, headers=headers, data=data)
     assert_response_ok(r)
-    assert r.json['data'] == response_data
+    assert r.json['data']['import_num'] == response_data['import_num']
+    results = r.json['data']['results']
+    assert len(results) == len(request_content or [])
+    assert [(i['cluster'], i['key']) for i in results] == [
+        (i['cluster'], i['key']) for i in request_content or []]
+    assert sum(1 for i in results if i['status'] in (
+        'created', 'updated')) == response_data['import_num']
 
     for node in changed_tree:
         path = '/huskar/%s/%s%s' % (
@@ -752,6 +800,7 @@ def test_batch_config_with_merge(
     }
     r = client.get(url, headers=headers)
     assert_response_ok(r)
+    assert r.is_streamed is True
     assert all(item['meta']['version'] > -1 for item in r.json['data'])
     assert sorted(
         {k: v for k, v in item.iteritems() if k != 'meta'}
@@ -11,7 +11,8 @@ from huskar_api import settings
 from huskar_api.models import huskar_client
 from huskar_api.models.exceptions import TreeTimeoutError
 from huskar_api.models.auth import Application, User, Authority
-from huskar_api.models.route import RouteManagement
+from huskar_api.api import long_polling
+from huskar_api.models.route import RouteManagement, UpstreamDeclarer
 from huskar_api.models.catalog import ServiceInfo
 from huskar_api.models.tree.holder import TreeHolder
 from huskar_api.switch import (
@@ -2619,6 +2620,9 @@ def test_declare_upstream(
         # Initial state
         zk.delete('/huskar/service/%s' % from_application_name, recursive=True)
         zk.delete('/huskar/service/%s' % to_application_name, recursive=True)
+        mocker.patch.object(
+            long_polling, 'upstream_declarer',
+            UpstreamDeclarer(huskar_client))
 
         route_management = RouteManagement(
             huskar_client, from_application_name, from_cluster_name)
@@ -2635,6 +2639,7 @@ def test_declare_upstream(
         'X-Cluster-Name': from_cluster_name,
     })
     assert r.status_code == 200, r.json
+    long_polling.upstream_declarer.flush()
     assert sorted(route_management.list_route()) == [
         (to_application_name, 'direct', None),
     ]
@@ -2647,6 +2652,7 @@ def test_declare_upstream(
         'Authorization': test_application_token,
     })
     assert r.status_code == 200, r.json
+    long_polling.upstream_declarer.flush()
     assert sorted(route_management.list_route()) == []
 
     # Declare nothing because of switched off
@@ -2660,6 +2666,7 @@ def test_declare_upstream(
         'X-Cluster-Name': from_cluster_name,
     })
     assert r.status_code == 200, r.json
+    long_polling.upstream_declarer.flush()
     assert sorted(route_management.list_route()) == []
     is_switched_on = True
 
@@ -2675,6 +2682,7 @@ def test_declare_upstream(
         'X-Cluster-Name': from_cluster_name,
     })
     assert r.status_code == 200, r.json
+    long_polling.upstream_declarer.flush()
     assert sorted(route_management.list_route()) == []
     mocker.patch._patches.pop().stop()  # a bit of tricky
 
@@ -6,11 +6,15 @@ from gevent import sleep
 from kazoo.exceptions import NodeExistsError
 from pytest import fixture, mark
 
+from huskar_api import settings
 from huskar_api.models import huskar_client
+from huskar_api.models.audit import AuditLog, audit_log_writer
 from huskar_api.models.container import ContainerManagement
 from huskar_api.models.instance.schema import Instance
 from huskar_api.models.exceptions import OutOfSyncError
 from huskar_api.models.dataware.zookeeper import service_client
+from huskar_api.switch import (
+    SWITCH_ENABLE_AUDIT_LOG, SWITCH_ENABLE_ASYNC_AUDIT_LOG)
 from ..utils import assert_response_ok
 
 
@@ -191,6 +195,105 @@ def test_service_registry_deregister(
     assert not zk.exists(path)
 
 
+def test_service_bulk_registration(
+        client, zk, db, test_application_name, test_application_token):
+    path = '/huskar/service/%s/stable' % test_application_name
+    instance = {
+        'ip': '10.0.0.1', 'port': {'main': 80}, 'state': 'up', 'meta': {}}
+    zk.create('%s/10.0.0.2_80' % path, json.dumps(instance), makepath=True)
+    zk.create('%s/10.0.0.3_80' % path, json.dumps(instance), makepath=True)
+    zk.set('%s/10.0.0.3_80' % path, json.dumps(instance))
+
+    url = '/api/service-bulk/%s' % test_application_name
+    headers = {'Authorization': test_application_token}
+    entries = [
+        {'cluster': 'stable', 'key': '10.0.0.1_80', 'value': instance},
+        {'cluster': 'stable', 'key': '10.0.0.2_80',
+         'runtime': json.dumps({'state': 'down'})},
+        {'cluster': 'stable', 'key': '10.0.0.3_80',
+         'runtime': {'state': 'down'}, 'version': 0},
+        {'cluster': 'stable', 'key': '10.0.0.4_80',
+         'runtime': {'state': 'down'}},
+        {'cluster': 'stable', 'key': '10.0.0.1_80', 'value': instance},
+        {'cluster': 'alta1-alta1-stable', 'key': '10.0.0.1_80',
+         'value': instance},
+        {'cluster': 'stable', 'key': '10.0.0.5_80',
+         'runtime': {'state': 'unknown'}},
+    ]
+    r = client.post(url, data=json.dumps(entries), headers=headers,
+                    content_type='application/json')
+    assert_response_ok(r)
+    assert [(i['key'], i['status']) for i in r.json['data']] == [
+        ('10.0.0.1_80', 'SUCCESS'),
+        ('10.0.0.2_80', 'SUCCESS'),
+        ('10.0.0.3_80', 'Conflict'),
+        ('10.0.0.4_80', 'BadRequest'),
+        ('10.0.0.1_80', 'BadRequest'),
+        ('10.0.0.1_80', 'DuplicatedEZonePrefixError'),
+        ('10.0.0.5_80', 'BadRequest'),
+    ]
+    assert r.json['data'][0]['data']['value'] == instance
+    assert r.json['data'][1]['data']['value'] == dict(instance, state='down')
+    assert r.json['data'][2]['data'] is None
+    assert r.json['data'][3]['message'] == \
+        '`value` should be provided while creating service.'
+    assert r.json['data'][4]['message'] == 'the entry is duplicated.'
+    assert r.json['data'][6]['message'] == \
+        'runtime state must be "up" or "down".'
+
+    assert json.loads(zk.get('%s/10.0.0.1_80' % path)[0]) == instance
+    assert json.loads(zk.get('%s/10.0.0.2_80' % path)[0]) == \
+        dict(instance, state='down')
+    assert json.loads(zk.get('%s/10.0.0.3_80' % path)[0]) == instance
+    assert not zk.exists('%s/10.0.0.4_80' % path)
+
+    db.rollback()
+    audit_logs = db.query(AuditLog).order_by(AuditLog.id.asc()).all()
+    assert [a.action_name for a in audit_logs] == ['UPDATE_SERVICE'] * 2
+    assert [json.loads(a.action_data)['key'] for a in audit_logs] == [
+        '10.0.0.1_80', '10.0.0.2_80']
+
+
+def test_service_bulk_registration_with_async_audit_log(
+        client, db, test_application_name, test_application_token, mocker,
+        mock_switches):
+    mock_switches({
+        SWITCH_ENABLE_AUDIT_LOG: True, SWITCH_ENABLE_ASYNC_AUDIT_LOG: True})
+    put = mocker.patch.object(audit_log_writer, 'put', autospec=True)
+    instance = {
+        'ip': '10.0.0.1', 'port': {'main': 80}, 'state': 'up', 'meta': {}}
+    entries = [
+        {'cluster': 'stable', 'key': '10.0.0.1_80', 'value': instance},
+        {'cluster': 'stable', 'key': '10.0.0.2_80', 'value': instance},
+    ]
+    r = client.post(
+        '/api/service-bulk/%s' % test_application_name,
+        data=json.dumps(entries), content_type='application/json',
+        headers={'Authorization': test_application_token})
+    assert_response_ok(r)
+
+    assert put.call_count == 2
+    assert [c[0][2].action_data['key'] for c in put.call_args_list] == [
+        '10.0.0.1_80', '10.0.0.2_80']
+    assert db.query(AuditLog).count() == 0
+
+
+def test_service_bulk_registration_failed(
+        client, test_application_name, test_application_token, mocker):
+    url = '/api/service-bulk/%s' % test_application_name
+    headers = {'Authorization': test_application_token}
+    r = client.post(url, data='{}', headers=headers,
+                    content_type='application/json')
+    assert r.status_code == 400
+    assert r.json['message'] == 'request data should be a JSON array.'
+
+    mocker.patch.object(settings, 'SERVICE_BULK_REGISTRY_MAX_SIZE', 1)
+    r = client.post(url, data='[{}, {}]', headers=headers,
+                    content_type='application/json')
+    assert r.status_code == 400
+    assert r.json['message'] == 'the count of entries should not exceed 1.'
+
+
 @mark.xparametrize('valid_container_service')
 def test_add_service_instance_from_container(
         client, test_application_name, zk, add_service, minimal_mode,
@@ -463,6 +566,38 @@ def test_get_service_instance_from_linked_cluster(
     assert_response_value(r.json['data'], value, runtime, whole)
 
 
+def test_get_service_list_from_tree_cache(
+        client, test_application_name, test_application_token, zk):
+    from huskar_api.api.long_polling import tree_hub
+
+    path = '/huskar/service/%s/stable' % test_application_name
+    zk.create(path, '{"link":["alta-foo"]}', makepath=True)
+    path = '/huskar/service/%s/alta-foo/169.254.0.1_80' % test_application_name
+    zk.create(path, '{"ip":"169.254.0.1","port":{"main":80}}', makepath=True)
+    _, stat = zk.get(path)
+
+    url = '/api/service/%s/stable' % test_application_name
+    headers = {'Authorization': test_application_token}
+    query_string = {'consistency': 'cached'}
+    holder = tree_hub.get_tree_holder(test_application_name, 'service')
+    holder.block_until_initialized(5)
+    try:
+        r = client.get(url, query_string=query_string, headers=headers)
+        assert_response_ok(r)
+        assert r.headers['X-Huskar-Data-Source'] == 'cache'
+        assert r.headers['X-Huskar-Data-Zxid'] == str(stat.mzxid)
+        assert [(d['key'], d['cluster_physical_name'])
+                for d in r.json['data']] == [('169.254.0.1_80', 'alta-foo')]
+        assert r.json['data'][0]['meta']['version'] == stat.version
+    finally:
+        tree_hub.release_tree_holder(test_application_name, 'service')
+
+    r = client.get(url, query_string=query_string, headers=headers)
+    assert_response_ok(r)
+    assert r.headers['X-Huskar-Data-Source'] == 'zookeeper'
+    assert [d['key'] for d in r.json['data']] == ['169.254.0.1_80']
+
+
 @mark.xparametrize('valid_service')
 def test_get_service_instance_from_linked_cluster_not_resolve(
         client, test_application_name, test_application_token, zk, add_service,
@@ -0,0 +1,26 @@
+from __future__ import absolute_import
+
+from huskar_api.models.auth import Team
+from ..utils import assert_response_ok
+
+
+def test_get_cache_stats(client, admin_token, test_team):
+    Team.flush([test_team.id])
+    Team.get(test_team.id, force=True)
+
+    r = client.get(
+        '/api/_internal/ops/cache-stats',
+        headers={'Authorization': admin_token})
+    assert_response_ok(r)
+    stats = r.json['data']['table']['team']
+    assert stats['miss'] > 0
+    assert stats['timings']['set']['count'] > 0
+    assert stats['payload']['count'] > 0
+
+
+def test_get_cache_stats_without_admin(client, test_token):
+    r = client.get(
+        '/api/_internal/ops/cache-stats',
+        headers={'Authorization': test_token})
+    assert r.status_code == 400
+    assert r.json['status'] == 'NoAuthError'
@@ -3,6 +3,9 @@ from __future__ import absolute_import
 from pytest import fixture
 
 from huskar_api.models.auth import Team, TeamAdmin
+from huskar_api.models.audit import audit_log_writer
+from huskar_api.switch import (
+    SWITCH_ENABLE_AUDIT_LOG, SWITCH_ENABLE_ASYNC_AUDIT_LOG)
 from ..utils import assert_response_ok
 
 
@@ -23,6 +26,23 @@ def test_add_team(client, db, admin_token):
     assert db.query(Team.team_name).all() == [('foo',)]
 
 
+def test_add_team_with_async_audit_log(
+        client, db, admin_token, admin_user, mocker, mock_switches,
+        last_audit_log):
+    mock_switches({
+        SWITCH_ENABLE_AUDIT_LOG: True, SWITCH_ENABLE_ASYNC_AUDIT_LOG: True})
+    put = mocker.patch.object(audit_log_writer, 'put', autospec=True)
+
+    r = client.post('/api/team', data={'team': 'foo'},
+                    headers={'Authorization': admin_token})
+    assert r.status_code == 201
+
+    put.assert_called_once_with(admin_user.id, '127.0.0.1', mocker.ANY)
+    action = put.call_args[0][2]
+    assert action.action_data['team_name'] == 'foo'
+    assert last_audit_log() is None
+
+
 def test_add_team_without_authority(client, db, test_token):
     assert db.query(Team.team_name).all() == []
 
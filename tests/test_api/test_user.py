@@ -261,6 +261,10 @@ def test_change_email(client, db, add_test_user,
         add_test_user(fields)
 
     username = input_data.pop('username')
+    old_email = presented_data[0]['email']
+    # The cached lookups should be refreshed after the email changed
+    assert User.get_by_email(old_email).username == username
+    assert User.get_by_email(expected_email) is None
 
     url = '/api/user/%s' % username
     headers = {'Authorization': input_token}
@@ -277,6 +281,8 @@ def test_change_email(client, db, add_test_user,
     row = result_set.fetchone()
     assert row['password'] == expected_password
     assert row['email'] == expected_email
+    assert User.get_by_email(old_email) is None
+    assert User.get_by_email(expected_email).username == username
 
 
 @mark.xparametrize
@@ -8,7 +8,8 @@ from pytest import fixture, raises, mark
 from huskar_api import settings
 from huskar_api.app import create_app
 from huskar_api.api.utils import (
-    api_response, with_etag, deliver_email_safe, with_cache_control)
+    api_response, api_stream_response, with_etag, deliver_email_safe,
+    with_cache_control)
 from huskar_api.extras.email import EmailTemplate, EmailDeliveryError
 from huskar_api.service.exc import DuplicatedEZonePrefixError
 from huskar_api.service.utils import (
@@ -38,9 +39,39 @@ def app():
         deliver_email_safe(EmailTemplate.DEBUG, 't@example.com', {'foo': 't'})
         return api_response()
 
+    @app.route('/api/test_stream/<int:broken_at>')
+    def test_stream(broken_at):
+        def iter_items():
+            for index in range(3):
+                if index == broken_at:
+                    raise ValueError('oops')
+                yield {'index': index}
+        return api_stream_response(iter_items())
+
     return app
 
 
+def test_stream(client):
+    r = client.get('/api/test_stream/3')
+    assert_response_ok(r)
+    assert r.is_streamed is True
+    assert r.json['data'] == [{'index': 0}, {'index': 1}, {'index': 2}]
+
+
+def test_stream_broken_at_first(client):
+    r = client.get('/api/test_stream/0')
+    assert r.status_code == 500
+    assert r.json['status'] == 'InternalServerError'
+
+
+def test_stream_broken_in_middle(client):
+    r = client.get('/api/test_stream/2')
+    assert r.status_code == 200
+    assert r.json['status'] == 'InternalServerError'
+    assert r.json['message']
+    assert r.json['data'] == [{'index': 0}, {'index': 1}]
+
+
 def test_etag(client):
     url = '/api/test_etag'
     r = client.get(url)
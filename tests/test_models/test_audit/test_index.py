@@ -4,7 +4,8 @@ import datetime
 
 from pytest import raises
 
-from huskar_api.models.audit.index import AuditIndex, AuditIndexInstance
+from huskar_api.models.audit.index import (
+    AuditIndex, AuditIndexInstance, AuditIdPages, create_indices)
 from huskar_api.models.audit.const import TYPE_SITE, TYPE_TEAM, TYPE_CONFIG
 
 
@@ -57,3 +58,52 @@ def test_audit_instance_index(db):
         now.date(), TYPE_CONFIG, application_id, cluster_name, key)
     assert AuditIndexInstance.get_audit_ids(
         TYPE_CONFIG, application_id, cluster_name, key) == [1]
+
+
+def test_create_indices(db, mocker):
+    created_at = datetime.datetime.now()
+    date = created_at.date()
+    execute = mocker.spy(db, 'execute')
+    with db.close_on_exit(False):
+        create_indices(db, [
+            (1, created_at, (TYPE_SITE, 0)),
+            (1, created_at, (TYPE_TEAM, 1)),
+            (1, created_at, (TYPE_CONFIG, 1, 'bar', 'test')),
+            (2, created_at, (TYPE_TEAM, 1)),
+            (2, created_at, (TYPE_CONFIG, 1, 'bar', 'test')),
+            (2, created_at, (TYPE_CONFIG, 1, 'bar', 'test')),
+        ])
+        with raises(AssertionError):
+            create_indices(db, [(3, created_at, (TYPE_SITE, 1))])
+    assert execute.call_count == 2
+
+    AuditIndex.flush_cache(date, TYPE_SITE, 0)
+    AuditIndex.flush_cache(date, TYPE_TEAM, 1)
+    AuditIndexInstance.flush_cache(date, TYPE_CONFIG, 1, 'bar', 'test')
+    assert AuditIndex.get_audit_ids(TYPE_SITE, 0) == [1]
+    assert AuditIndex.get_audit_ids(TYPE_TEAM, 1) == [2, 1]
+    assert AuditIndexInstance.get_audit_ids(
+        TYPE_CONFIG, 1, 'bar', 'test') == [2, 1]
+
+
+def test_audit_index_pages(db, mocker):
+    mocker.patch('huskar_api.models.audit.index.PAGE_SIZE', 2)
+    created_at = datetime.datetime.now()
+    with db.close_on_exit(False):
+        create_indices(db, [
+            (audit_id, created_at, index)
+            for audit_id in range(1, 6)
+            for index in [(TYPE_TEAM, 1), (TYPE_CONFIG, 1, 'bar', 'test')]])
+
+    assert AuditIndex.get_audit_ids(TYPE_TEAM, 1) == [5, 4]
+    assert AuditIndex.get_audit_ids(TYPE_TEAM, 1, before_id=4) == [3, 2]
+    assert AuditIndex.get_audit_ids(TYPE_TEAM, 1, before_id=2) == [1]
+    assert AuditIndexInstance.get_audit_ids(
+        TYPE_CONFIG, 1, 'bar', 'test', before_id=3) == [2, 1]
+
+    pages = AuditIdPages(AuditIndex.get_audit_ids, (TYPE_TEAM, 1))
+    assert list(pages) == [5, 4, 3, 2, 1]
+    assert list(pages) == [5, 4, 3, 2, 1]
+    pages = AuditIdPages(AuditIndexInstance.get_audit_ids, (
+        TYPE_CONFIG, 1, 'bar', 'test'), before_id=5)
+    assert list(pages) == [4, 3, 2, 1]
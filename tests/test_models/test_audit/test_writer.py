@@ -0,0 +1,204 @@
+from __future__ import absolute_import
+
+import json
+import os
+
+import gevent
+from pytest import fixture
+
+from huskar_api.models.auth import User, Team
+from huskar_api.models.audit import AuditLog, action_creator, action_types
+from huskar_api.models.audit import writer as writer_module
+from huskar_api.models.audit.writer import AuditLogWriter
+from huskar_api.models.exceptions import AuditLogLostError
+
+
+@fixture
+def team(db):
+    return Team.create('foobar')
+
+
+@fixture
+def users(db):
+    return [User.create_normal(name, '-', '%s@example.com' % name)
+            for name in ('foo', 'bar')]
+
+
+@fixture
+def spool_dir(tmpdir):
+    return tmpdir.join('spool')
+
+
+@fixture
+def writer(mocker, spool_dir):
+    writer = AuditLogWriter(
+        maxsize=3, timeout=0, batch_size=2, spool_dir=str(spool_dir))
+    mocker.patch.object(writer_module, 'spawn')
+    mocker.patch.object(writer_module.atexit, 'register')
+    return writer
+
+
+@fixture
+def fallback_logger(mocker):
+    return mocker.patch(
+        'huskar_api.models.audit.writer.fallback_logger', autospec=True)
+
+
+def make_action(team):
+    return action_creator.make_action(action_types.CREATE_TEAM, team=team)
+
+
+def read_spool(writer):
+    with open(writer.spool.path) as spool_file:
+        return [json.loads(line) for line in spool_file]
+
+
+def test_write_in_batches(db, mocker, writer, team, users):
+    create_entries = mocker.spy(AuditLog, 'create_entries')
+    for user in users:
+        assert writer.put(user.id, '127.0.0.1', make_action(team))
+    assert writer.put(users[0].id, '127.0.0.2', make_action(team))
+    assert writer.queue.qsize() == 3
+    assert db.query(AuditLog).count() == 0
+    assert [r['seq'] for r in read_spool(writer)] == [1, 2, 3]
+
+    writer.flush()
+
+    assert writer.queue.qsize() == 0
+    assert read_spool(writer) == []
+    assert create_entries.call_count == 2
+    db.rollback()
+    audit_logs = db.query(AuditLog).order_by(AuditLog.id.asc()).all()
+    assert [(a.user_id, a.remote_addr) for a in audit_logs] == [
+        (users[0].id, '127.0.0.1'), (users[1].id, '127.0.0.1'),
+        (users[0].id, '127.0.0.2')]
+    assert all(a.action_name == 'CREATE_TEAM' for a in audit_logs)
+    ids = [a.id for a in AuditLog.get_multi_by_index(
+        AuditLog.TYPE_SITE, 0)[:]]
+    assert ids == [a.id for a in reversed(audit_logs)]
+
+
+def test_overflow(db, writer, team, users, fallback_logger):
+    action = make_action(team)
+    for _ in range(3):
+        assert writer.put(users[0].id, '127.0.0.1', action)
+    assert not writer.put(users[1].id, '127.0.0.1', action)
+    fallback_logger.info.assert_called_once_with(
+        '%s %s %r', users[1].id, 'CREATE_TEAM', action.action_data)
+    assert read_spool(writer)[-1] == {'done': [4]}
+
+
+def test_lost(db, mocker, writer, team, users, fallback_logger):
+    mocker.patch.object(
+        AuditLog, 'create_entries', side_effect=AuditLogLostError())
+    action = make_action(team)
+    writer.put(users[0].id, '127.0.0.1', action)
+    writer.flush()
+    fallback_logger.info.assert_called_once_with(
+        '%s %s %r', users[0].id, 'CREATE_TEAM', action.action_data)
+    assert db.query(AuditLog).count() == 0
+
+
+def test_take_over(db, mocker, spool_dir, writer, team, users):
+    dead_writer = AuditLogWriter(
+        maxsize=3, timeout=0, batch_size=2, spool_dir=str(spool_dir))
+    for user in users:
+        dead_writer.put(user.id, '127.0.0.1', make_action(team))
+    dead_writer.put(users[0].id, '127.0.0.2', make_action(team))
+    dead_writer._write_items([dead_writer.queue.get()])
+    with open(dead_writer.spool.path, 'a') as spool_file:
+        spool_file.write('{"seq": 4, "ent')  # broken by a crash
+    spool_dir.join('README').write('')
+
+    writer.start()
+    writer.take_over()
+    assert db.query(AuditLog).count() == 1  # the dead one holds its lock
+
+    dead_writer.spool._file.close()
+    writer.take_over()
+    db.rollback()
+    audit_logs = db.query(AuditLog).order_by(AuditLog.id.asc()).all()
+    assert [(a.user_id, a.remote_addr) for a in audit_logs] == [
+        (users[0].id, '127.0.0.1'), (users[1].id, '127.0.0.1'),
+        (users[0].id, '127.0.0.2')]
+    assert sorted(p.basename for p in spool_dir.listdir()) == sorted([
+        'README', os.path.basename(writer.spool.path)])
+    ids = [a.id for a in AuditLog.get_multi_by_index(
+        AuditLog.TYPE_SITE, 0)[:]]
+    assert ids == [a.id for a in reversed(audit_logs)]
+
+    writer.take_over()
+    assert db.query(AuditLog).count() == 3
+
+
+def test_take_over_failed(mocker, writer):
+    logger = mocker.patch.object(writer_module, 'logger', autospec=True)
+    mocker.patch.object(writer, 'take_over', side_effect=Exception('oops'))
+    writer._work()
+    logger.exception.assert_called_once_with('Failed to take over audit logs')
+
+
+def test_work(db, mocker, writer, team, users):
+    mocker.patch.object(writer_module, 'spawn', gevent.spawn)
+    writer.start()
+    writer.start()
+    assert writer.put(users[0].id, '127.0.0.1', make_action(team))
+    gevent.sleep(0.1)
+    assert writer.queue.qsize() == 0
+    assert read_spool(writer) == []
+    writer.stop()
+    writer._worker.join()
+
+    db.rollback()
+    assert [a.user_id for a in db.query(AuditLog).all()] == [users[0].id]
+
+
+def test_work_with_broken_spool(db, mocker, writer, team, users):
+    mocker.patch.object(writer_module, 'spawn', gevent.spawn)
+    logger = mocker.patch.object(writer_module, 'logger', autospec=True)
+    writer.start()
+    done = mocker.patch.object(
+        writer.spool, 'done', side_effect=[IOError('disk full'), None])
+    assert writer.put(users[0].id, '127.0.0.1', make_action(team))
+    gevent.sleep(0.1)
+    assert writer.put(users[1].id, '127.0.0.1', make_action(team))
+    gevent.sleep(0.1)
+    assert not writer._worker.dead
+    assert done.call_count == 2
+    logger.exception.assert_called_once_with(
+        'Unexpected error of audit log writer')
+    writer.stop()
+    writer._worker.join()
+
+    db.rollback()
+    assert sorted(a.user_id for a in db.query(AuditLog).all()) == sorted(
+        user.id for user in users)
+
+
+def test_register_atexit_once(writer):
+    writer.start()
+    writer.stop()
+    writer.start()
+    assert writer_module.spawn.call_count == 2
+    writer_module.atexit.register.assert_called_once_with(writer.flush)
+
+
+def test_without_spool(db, mocker, team, users):
+    mocker.patch.object(writer_module, 'spawn')
+    mocker.patch.object(writer_module.atexit, 'register')
+    writer = AuditLogWriter(maxsize=3, timeout=0, batch_size=2)
+    assert writer.put(users[0].id, '127.0.0.1', make_action(team))
+    assert writer.queue.qsize() == 0
+    db.rollback()
+    assert [a.user_id for a in db.query(AuditLog).all()] == [users[0].id]
+
+
+def test_failed_to_open_spool(db, mocker, writer, spool_dir, team, users):
+    spool_dir.write('')  # not a directory
+    logger = mocker.patch.object(writer_module, 'logger', autospec=True)
+    assert writer.put(users[0].id, '127.0.0.1', make_action(team))
+    assert writer.spool is None
+    logger.exception.assert_called_once_with(
+        'Failed to open the spool of audit log')
+    db.rollback()
+    assert db.query(AuditLog).count() == 1
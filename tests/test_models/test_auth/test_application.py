@@ -211,6 +211,39 @@ def test_check_auth_for_site_admin(
     assert not test_application.check_auth(Authority.ADMIN, test_user.id)
 
 
+def test_get_authorized_ids(db, test_user, test_team, test_application):
+    other_application = Application.create('foo.toad', test_team.id)
+    assert Application.get_authorized_ids(test_user.id) == set()
+
+    test_application.ensure_auth(Authority.READ, test_user.id)
+    assert Application.get_authorized_ids(test_user.id) == {
+        test_application.id}
+    test_application.discard_auth(Authority.READ, test_user.id)
+    test_application.ensure_auth(Authority.WRITE, test_user.id)
+    assert Application.get_authorized_ids(test_user.id) == {
+        test_application.id}
+    test_application.discard_auth(Authority.WRITE, test_user.id)
+    assert Application.get_authorized_ids(test_user.id) == set()
+
+    test_team.grant_admin(test_user.id)
+    assert Application.get_authorized_ids(test_user.id) == {
+        test_application.id, other_application.id}
+    test_team.dismiss_admin(test_user.id)
+    assert Application.get_authorized_ids(test_user.id) == set()
+
+    test_user.grant_admin()
+    assert Application.get_authorized_ids(test_user.id) == {
+        test_application.id, other_application.id}
+
+
+def test_get_authorized_ids_after_deleting(db, test_user, test_application):
+    test_application.ensure_auth(Authority.READ, test_user.id)
+    assert Application.get_authorized_ids(test_user.id) == {
+        test_application.id}
+    Application.delete(test_application.id)
+    assert Application.get_authorized_ids(test_user.id) == set()
+
+
 def test_check_auth_with_invalid_argument(db, test_user, test_application):
     with raises(AssertionError):
         test_application.check_auth('voldemort', test_user.id)
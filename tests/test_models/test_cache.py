@@ -2,9 +2,13 @@ from __future__ import absolute_import
 
 # import cPickle as pickle
 # import logging
+import bz2
+import cPickle as pickle
 import types
 import socket
 
+import gevent
+
 # from meepo2.signals import signal
 import pytest
 from redis import RedisError, ConnectionError
@@ -15,10 +19,14 @@ import sqlalchemy.exc as sa_exc
 from huskar_api import settings
 from huskar_api.models import DBSession, CacheMixin
 from huskar_api.models.auth import Team
-from huskar_api.models.cache import CacheMixinBase, make_transient_to_detached
+from huskar_api.models.cache import (
+    CacheMixinBase, LocalCacheClient, make_transient_to_detached, model_memo,
+    batch_invalidation, CacheStats)
 from huskar_api.models.cache.hook import EventHook
-from huskar_api.models.cache.region import _RedisWrapper, Cache
+from huskar_api.models.cache.region import (
+    _RedisWrapper, Cache, zdumps, zloads)
 from huskar_api.models.cache.client import FaultTolerantStrictRedis
+from huskar_api.models.cache.breaker import CircuitBreaker, CircuitOpenError
 
 
 def get_unused_port():
@@ -83,6 +91,80 @@ def test_fault_tolerant_pipeline():
     assert res == [None, None, None]
 
 
+def test_circuit_breaker(mocker):
+    time = mocker.patch('huskar_api.models.cache.breaker.time.time')
+    time.return_value = 100.0
+    breaker = CircuitBreaker('test', min_calls=4, window=10, open_time=5)
+
+    for failed in (True, False, False):
+        assert breaker.allow()
+        breaker.record(failed)
+    assert breaker.state == breaker.STATE_CLOSED
+
+    # The calls out of window are dropped
+    time.return_value = 111.0
+    for failed in (True, False, True):
+        assert breaker.allow()
+        breaker.record(failed)
+    assert breaker.state == breaker.STATE_CLOSED
+    breaker.record(True)
+    assert breaker.state == breaker.STATE_OPEN
+    assert not breaker.allow()
+
+    # Half-open with a single probe
+    time.return_value = 116.0
+    assert breaker.allow()
+    assert breaker.state == breaker.STATE_HALF_OPEN
+    assert not breaker.allow()
+    breaker.record(True)
+    assert breaker.state == breaker.STATE_OPEN
+    assert not breaker.allow()
+
+    time.return_value = 121.0
+    assert breaker.allow()
+    breaker.record(False)
+    assert breaker.state == breaker.STATE_CLOSED
+    assert breaker.allow()
+
+
+def test_circuit_breaker_watch(mocker):
+    time = mocker.patch('huskar_api.models.cache.breaker.time.time')
+    time.return_value = 100.0
+    breaker = CircuitBreaker('test', min_calls=1, slow_call_time=0.5)
+
+    with pytest.raises(sa_exc.SQLAlchemyError):
+        with breaker.watch():
+            raise sa_exc.SQLAlchemyError()
+    assert breaker.state == breaker.STATE_CLOSED
+
+    with breaker.watch():
+        time.return_value = 101.0
+    assert breaker.state == breaker.STATE_OPEN
+
+
+def test_fault_tolerant_redis_client_circuit_breaker(mocker):
+    r = FaultTolerantStrictRedis.from_url(
+        'redis://127.0.0.1:%d' % get_unused_port(), socket_timeout=1,
+        circuit_breaker_options={'min_calls': 2, 'open_time': 60})
+    assert r.get('k') is None
+    assert r.get('k') is None
+    assert r.circuit_breaker.state == CircuitBreaker.STATE_OPEN
+
+    get_connection = mocker.spy(r.connection_pool, 'get_connection')
+    assert r.get('k') is None
+    assert r.mget(['k', 'v']) == [None, None]
+    with pytest.raises(CircuitOpenError):
+        r.zadd('k', 1, 'v')
+    with pytest.raises(ConnectionError):
+        r.hgetall('k')
+    with r.pipeline(transaction=False) as pipe:
+        pipe.set('k', 'v')
+        pipe.get('k')
+        assert pipe.execute() == [None, None]
+        assert not pipe.command_stack
+    assert not get_connection.called
+
+
 def test_strict_pipeline(mocker):
     r = FaultTolerantStrictRedis(port=get_unused_port(), socket_timeout=1)
 
@@ -552,3 +634,244 @@ def test_make_transient_to_detached_error():
     with pytest.raises(sa_exc.InvalidRequestError):
         DBSession.add(t)
         make_transient_to_detached(t)
+
+
+@pytest.fixture
+def local_cache_client(redis_client, faker):
+    namespace = 'test_%s' % faker.uuid4()[:8]
+    client = Cache(settings.CACHE_SETTINGS['default']).make_client(
+        namespace=namespace)
+    return LocalCacheClient(
+        client, redis_client, channel='%s:invalidation' % namespace,
+        max_size=2, ttl=60)
+
+
+def test_local_cache_client(local_cache_client, mocker):
+    client = local_cache_client.client
+    client.set('a', {'id': 1})
+    client.set('b', {'id': 2})
+    client.set('c', {'id': 3})
+    get = mocker.spy(client, 'get')
+    mget = mocker.spy(client, 'mget')
+
+    assert local_cache_client.get('a') == {'id': 1}
+    assert local_cache_client.get('a') == {'id': 1}
+    assert get.call_count == 1
+    assert local_cache_client.mget(iter(['a', 'b', 'x'])) == [
+        {'id': 1}, {'id': 2}, None]
+    assert local_cache_client.mget(['b', 'a']) == [{'id': 2}, {'id': 1}]
+    assert mget.call_args_list == [mocker.call(['b', 'x'])]
+
+    # LRU eviction
+    assert local_cache_client.get('c') == {'id': 3}
+    assert 'b' not in local_cache_client
+    assert 'a' in local_cache_client
+    assert 'c' in local_cache_client
+
+    # Writing invalidates
+    local_cache_client.set('a', {'id': 4})
+    assert 'a' not in local_cache_client
+    assert local_cache_client.get('a') == {'id': 4}
+    local_cache_client.delete('a')
+    assert local_cache_client.get('a') is None
+
+    # Filling does not invalidate
+    local_cache_client.get('c')
+    local_cache_client.setnx('d', {'id': 5})
+    local_cache_client.msetnx({'e': {'id': 6}})
+    assert 'c' in local_cache_client
+
+
+def test_local_cache_client_expiration(local_cache_client, mocker):
+    local_cache_client.client.set('a', {'id': 1})
+    assert local_cache_client.get('a') == {'id': 1}
+    assert 'a' in local_cache_client
+
+    local_cache_client.ttl = -1
+    local_cache_client.clear()
+    assert local_cache_client.get('a') == {'id': 1}
+    assert 'a' not in local_cache_client
+
+
+def test_local_cache_client_subscribe(local_cache_client, faker):
+    other_client = LocalCacheClient(
+        local_cache_client.client, local_cache_client.redis_client,
+        channel=local_cache_client.channel, max_size=2, ttl=60)
+    greenlet = other_client.spawn_subscribing_thread()
+    try:
+        gevent.sleep(0.1)
+        local_cache_client.client.set('a', {'id': 1})
+        assert other_client.get('a') == {'id': 1}
+        assert 'a' in other_client
+
+        local_cache_client.mset({'a': {'id': 2}})
+        gevent.sleep(0.1)
+        assert 'a' not in other_client
+        assert other_client.get('a') == {'id': 2}
+
+        other_client._handle_message({'type': 'message', 'data': 'x'})
+        assert 'a' in other_client
+    finally:
+        greenlet.kill()
+
+
+@pytest.fixture
+def enabled_model_memo():
+    model_memo.enable()
+    try:
+        yield model_memo
+    finally:
+        model_memo.disable()
+
+
+def test_model_memo_get(enabled_model_memo, mocker):
+    mocker.patch.object(CacheMixin, "_db_session", DBSession)
+
+    t = Team(id=0, team_name="hello")
+    get = mocker.patch.object(
+        _RedisWrapper, "get", mocker.Mock(return_value=t.__rawdata__))
+
+    assert Team.get(0).team_name == "hello"
+    DBSession.close()
+    assert Team.get(0).team_name == "hello"
+    assert get.call_count == 1
+
+    # Writing invalidates
+    Team.set_raw(dict(t.__rawdata__, team_name="world"))
+    DBSession.close()
+    Team.get(0)
+    assert get.call_count == 2
+    Team.flush([0])
+    DBSession.close()
+    Team.get(0)
+    assert get.call_count == 3
+
+    # The memo is dropped with request
+    model_memo.disable()
+    DBSession.close()
+    Team.get(0)
+    assert get.call_count == 4
+
+
+def test_model_memo_mget(enabled_model_memo, mocker):
+    mocker.patch.object(CacheMixin, "_db_session", DBSession)
+
+    t1 = Team(id=0, team_name="hello")
+    t2 = Team(id=1, team_name="world")
+    mget = mocker.patch.object(_RedisWrapper, "mget", mocker.Mock(
+        return_value=[t1.__rawdata__]))
+
+    assert [t.team_name for t in Team.mget([0])] == ["hello"]
+    DBSession.close()
+    assert Team.get(0).team_name == "hello"
+    DBSession.close()
+    mget.return_value = [t2.__rawdata__]
+    assert [t.team_name for t in Team.mget([0, 1])] == ["hello", "world"]
+    DBSession.close()
+
+    Team.mset([t1, t2])
+    assert model_memo.entries == {}
+
+
+def test_batch_invalidation(mocker):
+    delete = mocker.patch.object(_RedisWrapper, "delete")
+
+    with batch_invalidation():
+        Team.flush([0])
+        with batch_invalidation():
+            Team.flush([1, 0])
+        Team.get_all_ids.flush()
+        assert not delete.called
+
+    delete.assert_called_once_with("team|0", "team|1")
+
+    # The keys are deleted on errors too
+    with pytest.raises(ZeroDivisionError):
+        with batch_invalidation():
+            Team.flush([2])
+            1 / 0
+    delete.assert_called_with("team|2")
+
+    Team.flush([3])
+    delete.assert_called_with("team|3")
+
+
+def test_batch_invalidation_error(mocker):
+    delete = mocker.patch.object(_RedisWrapper, "delete")
+    delete.side_effect = [RedisError(), None]
+    with batch_invalidation():
+        Team.flush([0])
+    Team.flush([1])
+    delete.assert_called_with("team|1")
+
+
+@pytest.mark.parametrize('value,header', [
+    (None, b'\x01p'),
+    ({'id': 1, 'name': u'foo'}, b'\x01p'),
+    (range(2000), b'\x01z'),
+])
+def test_codec(mocker, value, header):
+    # The legacy payloads are written by default
+    payload = zdumps(value)
+    assert payload == bz2.compress(
+        pickle.dumps(value, pickle.HIGHEST_PROTOCOL), 6)
+    assert zloads(payload) == value
+
+    mocker.patch.object(settings, 'CACHE_VERSIONED_CODEC', True)
+    payload = zdumps(value)
+    assert payload.startswith(header)
+    assert zloads(payload) == value
+
+
+def test_cache_stats(mocker):
+    monitor_client = mocker.patch(
+        'huskar_api.models.cache.stats.monitor_client')
+    stats = CacheStats()
+
+    stats.incr('table', 'team', 'hit', 3)
+    stats.incr('table', 'team', 'miss')
+    stats.incr('table', 'team', 'miss', 0)
+    stats.timing('table', 'team', 'get', 0.002)
+    stats.timing('table', 'team', 'get', 0.004)
+    stats.payload('function', 'foo:bar', 100)
+
+    assert stats.snapshot() == {
+        'table': {'team': {
+            'hit': 3, 'miss': 1, 'hit_rate': 0.75,
+            'timings': {'get': {'count': 2, 'mean': 3.0, 'max': 4.0}},
+            'payload': None,
+        }},
+        'function': {'foo:bar': {
+            'hit': 0, 'miss': 0, 'hit_rate': None, 'timings': {},
+            'payload': {'count': 1, 'mean': 100.0, 'max': 100},
+        }},
+    }
+    monitor_client.increment.assert_has_calls([
+        mocker.call('cache.hit', tags={'table': 'team'}, value=3),
+        mocker.call('cache.miss', tags={'table': 'team'}, value=1),
+    ])
+    assert monitor_client.increment.call_count == 2
+    monitor_client.timing.assert_called_with(
+        'cache.timer', 4.0, tags={'table': 'team', 'operation': 'get'})
+    monitor_client.payload.assert_called_once_with(
+        'cache.payload', data_length=100, tags={'function': 'foo:bar'})
+
+    stats.reset()
+    assert stats.snapshot() == {}
+
+
+def test_cache_stats_of_table(mocker):
+    stats = mocker.patch('huskar_api.models.cache.cache_stats')
+    mocker.patch('huskar_api.models.cache.stats.cache_stats', stats)
+    mocker.patch.object(CacheMixin, "_db_session", DBSession)
+
+    t = Team(id=0, team_name="hello")
+    Team.set(t)
+    stats.payload.assert_called_once_with('table', 'team', mocker.ANY)
+    Team.get(0)
+    stats.incr.assert_called_once_with('table', 'team', 'hit', 1)
+    assert stats.payload.call_count == 2
+    stats.timer.assert_has_calls([
+        mocker.call('table', 'team', 'set'),
+        mocker.call('table', 'team', 'get'),
+    ], any_order=True)
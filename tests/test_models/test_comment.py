@@ -1,6 +1,8 @@
 from __future__ import absolute_import
 
-from huskar_api.models.comment import set_comment, get_comment, Comment
+from huskar_api.models import DBSession
+from huskar_api.models.comment import (
+    set_comment, set_comments, get_comment, get_comments, Comment)
 
 
 def test_create_comment(db):
@@ -57,3 +59,73 @@ def test_get_comment(db):
     assert get_comment('base.foo', 'test', 'config', 'k') == u''
     assert get_comment('base.foo', 'test', 'switch', 'k') == u'\u957f\u8005'
     assert get_comment('base.foo', 'test', 'switch', 'K') == u''
+
+
+def test_get_comment_negative_cache(db, mocker):
+    assert get_comment('base.foo', 'test', 'config', 'k') == u''
+
+    query = mocker.spy(DBSession(), 'query')
+    assert get_comment('base.foo', 'test', 'config', 'k') == u''
+    assert query.call_count == 0
+
+    set_comment('base.foo', 'test', 'config', 'k', u'\u957f\u8005')
+    assert get_comment('base.foo', 'test', 'config', 'k') == u'\u957f\u8005'
+
+
+def test_get_comments(db, mocker):
+    set_comment('base.foo', 'test', 'switch', 'a', u'\u957f\u8005')
+    set_comment('base.foo', 'test', 'switch', 'b', u'+1s')
+    set_comment('base.foo', 'stable', 'switch', 'a', u'foo')
+    set_comment('base.foo', 'test', 'config', 'c', u'bar')
+    pairs = [('test', 'a'), ('test', 'b'), ('test', 'c'), ('stable', 'b')]
+
+    assert get_comments('base.foo', 'switch', pairs) == {
+        ('test', 'a'): u'\u957f\u8005',
+        ('test', 'b'): u'+1s',
+        ('test', 'c'): u'',
+        ('stable', 'b'): u'',
+    }
+    assert get_comments('base.foo', 'config', pairs, None) == {
+        ('test', 'a'): None,
+        ('test', 'b'): None,
+        ('test', 'c'): u'bar',
+        ('stable', 'b'): None,
+    }
+    assert get_comments('base.foo', 'switch', []) == {}
+
+    # The ids are cached and shared with find_id
+    query = mocker.spy(DBSession(), 'query')
+    assert get_comments('base.foo', 'switch', pairs[:3]) == {
+        ('test', 'a'): u'\u957f\u8005',
+        ('test', 'b'): u'+1s',
+        ('test', 'c'): u'',
+    }
+    assert get_comment('base.foo', 'test', 'switch', 'b') == u'+1s'
+    assert not query.called
+
+    set_comment('base.foo', 'test', 'switch', 'c', u'baz')
+    assert get_comments('base.foo', 'switch', pairs[2:3]) == {
+        ('test', 'c'): u'baz'}
+
+
+def test_set_comments(db):
+    set_comment('base.foo', 'test', 'config', 'a', u'foo')
+    set_comment('base.foo', 'test', 'config', 'b', u'bar')
+    assert get_comment('base.foo', 'test', 'config', 'b') == u'bar'
+
+    set_comments('base.foo', 'config', [
+        ('test', 'a', u' baz '),
+        ('test', 'b', u''),
+        ('test', 'c', u'x'),
+        ('test', 'c', u'\u957f\u8005'),
+        ('stable', 'd', None),
+    ])
+    assert get_comments('base.foo', 'config', [
+        ('test', 'a'), ('test', 'b'), ('test', 'c'), ('stable', 'd'),
+    ]) == {
+        ('test', 'a'): u'baz',
+        ('test', 'b'): u'',
+        ('test', 'c'): u'\u957f\u8005',
+        ('stable', 'd'): u'',
+    }
+    assert db.query(Comment).count() == 2
@@ -201,6 +201,23 @@ def test_upsert(team_point, mocker):
             id=team_point.id + 2, team_name='999'))
 
 
+def test_upsert_multiple_rows(team_point):
+    session = DBSession()
+    stmt = core_db.Upsert(team_point.__table__).values([
+        dict(id=team_point.id, team_name='666'),
+        dict(id=team_point.id + 1, team_name='888'),
+    ])
+    sql = str(stmt.compile(dialect=session.bind.dialect))
+    assert sql.count('(%s, %s)') == 2
+    assert sql.endswith(
+        'ON DUPLICATE KEY UPDATE id = LAST_INSERT_ID(id), '
+        'team_name = VALUES(team_name)')
+
+    session.execute(stmt)
+    rs = session.query(Team.id, Team.team_name).order_by(Team.id).all()
+    assert rs == [(team_point.id, '666'), (team_point.id + 1, '888')]
+
+
 def test_upsert_mixin(mocker):
     class Foo(core_db.UpsertMixin):
         __table__ = mocker.Mock()
@@ -2,6 +2,7 @@
 from __future__ import absolute_import
 
 from huskar_api.models.infra import InfraDownstream
+from huskar_api.models.infra.downstream import Builder
 
 
 def list_infra_downstream_by_application_name(db, application_name):
@@ -75,6 +76,23 @@ def test_bindmany(db):
     assert result[0].user_application_name == 'base.bar'
 
 
+def test_bindmany_in_batches(db, mocker):
+    mocker.patch.object(Builder, 'BATCH_SIZE', 2)
+    upsert = mocker.spy(InfraDownstream, 'upsert')
+    InfraDownstream.bindmany() \
+        .bind('base.foo', 'redis', 'mycache', 'idcs', 'alta1', 'url',
+              'redis.foo') \
+        .bind('base.bar', 'redis', 'mycache', 'idcs', 'alta1', 'url',
+              'redis.foo') \
+        .bind('base.baz', 'redis', 'mycache', 'idcs', 'alta1', 'url',
+              'redis.foo') \
+        .commit()
+    assert upsert.call_count == 2
+    result = list_infra_downstream_by_application_name(db, 'redis.foo')
+    assert [r.user_application_name for r in result] == [
+        'base.foo', 'base.bar', 'base.baz']
+
+
 def test_unbind_stale(db):
     m1 = InfraDownstream.bindmany() \
         .bind('base.foo', 'redis', 'mycache', 'idcs', 'alta1', 'url',
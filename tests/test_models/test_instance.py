@@ -7,8 +7,9 @@ from pytest import fixture, raises, mark
 from marshmallow.exceptions import ValidationError
 
 from huskar_api.models import huskar_client
-from huskar_api.models.instance import InstanceManagement
-from huskar_api.models.instance.schema import InfraInfo
+from huskar_api.models.instance import InstanceManagement, InstanceImporter
+from huskar_api.models.instance.schema import Instance, InfraInfo
+from huskar_api.models.znode import ZnodeModel, ZnodeCache
 from huskar_api.models.exceptions import \
     MalformedDataError, NotEmptyError, InfraNameNotExistError
 from huskar_api.service.exc import DataNotEmptyError
@@ -137,6 +138,22 @@ def test_get_instance(zk, application_name, instance_management):
     assert json.loads(info.data) == {'ip': '0.0.0.1', 'port': {'main': 2}}
 
 
+def test_get_instances(zk, application_name, instance_management):
+    zk.create('/huskar/service/%s/stable/svc-0' % application_name,
+              makepath=True, value=b'{"ip":"0.0.0.0","port":{"main":1}}')
+    zk.create('/huskar/service/{0}/stable/a%SLASH%b'.format(application_name),
+              makepath=True, value=b'{"ip":"0.0.0.1","port":{"main":2}}')
+
+    infos, physical_name = instance_management.get_instances(
+        'stable', ['svc-0', 'svc-1', 'a/b'])
+    assert physical_name is None
+    assert [i.stat is None for i in infos] == [False, True, False]
+    assert json.loads(infos[0].data) == {'ip': '0.0.0.0', 'port': {'main': 1}}
+    assert infos[1].data is None
+    assert json.loads(infos[2].data) == {'ip': '0.0.0.1', 'port': {'main': 2}}
+    assert instance_management.get_instances('stable', []) == ([], None)
+
+
 def test_get_instance_with_symlink(zk, application_name, instance_management):
     zk.create('/huskar/service/%s/stable/svc-0' % application_name,
               makepath=True, value=b'{"ip":"0.0.0.0","port":{"main":1}}')
@@ -292,6 +309,41 @@ def test_infra_info_ok(zk, application_name, _data, _type):
     assert schema.stat == zk.exists(schema.path)
 
 
+@fixture
+def znode_cache():
+    original_cache = ZnodeModel.cache
+    ZnodeModel.cache = ZnodeCache(huskar_client.client, max_size=10)
+    try:
+        yield ZnodeModel.cache
+    finally:
+        huskar_client.client.remove_listener(ZnodeModel.cache._handle_state)
+        ZnodeModel.cache = original_cache
+
+
+def test_infra_info_and_instance_in_cache(application_name, znode_cache):
+    value = {'url': 'sam+redis://redis.infra_ci/overall.alphatest'}
+    infra_info = InfraInfo(huskar_client.client, application_name, 'redis')
+    infra_info.set_by_name('redis100010', 'idcs', 'alta1', value)
+    infra_info.save()
+
+    instance = Instance(
+        huskar_client.client, type_name='config',
+        application_name=application_name, cluster_name='overall',
+        key='FX_REDIS_SETTINGS')
+    assert instance.path == infra_info.path
+    instance.load()
+    assert json.loads(instance.data) == {'idcs': {'alta1': {
+        'redis100010': value}}}
+    assert instance.path in znode_cache
+
+    infra_info = InfraInfo(huskar_client.client, application_name, 'redis')
+    infra_info.load()
+    assert infra_info.get_by_name('redis100010', 'idcs', 'alta1') == value
+
+    instance.load()
+    assert isinstance(instance.data, unicode)
+
+
 @mark.xparametrize
 def test_infra_info_fail(application_name, _data, _type, _error):
     schema = InfraInfo(huskar_client.client, application_name, _type)
@@ -417,3 +469,41 @@ def test_delete_nonempty_cluster_not_error(zk, application_name):
     zk.create('/huskar/service/%s/c1' % application_name, makepath=True,
               value=b'{"protocol":"TCP"}')
     ServiceData.delete_cluster(application_name, 'c1', strict=False)
+
+
+@mark.parametrize('overwrite,statuses,values', [
+    (False, ['skipped', 'created', 'skipped'], ['0', '1', '1']),
+    (True, ['updated', 'created', 'updated'], ['0x', '1', '2']),
+])
+def test_import_instances(zk, application_name, overwrite, statuses, values):
+    path = '/huskar/config/%s/stable' % application_name
+    zk.create('%s/k0' % path, b'0', makepath=True)
+    importer = InstanceImporter(
+        huskar_client, 'config', overwrite, chunk_size=2)
+    results = importer.run([
+        (application_name, 'stable', 'k0', u'0x'),
+        (application_name, 'stable', 'k1', u'1'),
+        (application_name, 'stable', 'k1', u'2'),
+    ])
+    assert [r.status for r in results] == statuses
+    assert zk.get('%s/k0' % path)[0] == values[0]
+    assert zk.get('%s/k1' % path)[0] == values[2]
+
+
+def test_import_instances_atomically(zk, application_name, mocker):
+    path = '/huskar/config/%s/stable' % application_name
+    importer = InstanceImporter(
+        huskar_client, 'config', True, max_retry=2, retry_interval=0)
+    stats = [None, None]
+    mocker.patch.object(importer, '_fetch_stats', return_value=stats)
+    zk.create('%s/k1' % path, b'x', makepath=True)
+
+    results = importer.run([
+        (application_name, 'stable', 'k0', u'0'),
+        (application_name, 'stable', 'k1', u'1'),
+    ])
+    assert [r.status for r in results] == ['failed', 'failed']
+    assert results[0].message == 'resource is modified by another request'
+    assert importer._fetch_stats.call_count == 2
+    assert not zk.exists('%s/k0' % path)
+    assert zk.get('%s/k1' % path)[0] == b'x'
@@ -1,10 +1,11 @@
 from __future__ import absolute_import
 
+import gevent
 from pytest import fixture, mark, raises
 
 from huskar_api.models import huskar_client
-from huskar_api.models.exceptions import EmptyClusterError
-from huskar_api.models.route import RouteManagement
+from huskar_api.models.exceptions import EmptyClusterError, OutOfSyncError
+from huskar_api.models.route import RouteManagement, UpstreamDeclarer
 from huskar_api.models.route.utils import make_route_key, parse_route_key
 
 
@@ -232,6 +233,69 @@ def test_declare_upstream(route_management):
     assert service_info.stat.version == 1
 
 
+def test_upstream_declarer(route_management, mocker):
+    declarer = UpstreamDeclarer(huskar_client)
+    application_name = route_management.application_name
+    cluster_name = route_management.cluster_name
+    declare = mocker.spy(RouteManagement, 'declare_upstream_pairs')
+
+    for _ in range(3):
+        declarer.declare(application_name, cluster_name, ['base.foo'])
+    declarer.declare(application_name, 'stable', ['base.foo', 'base.bar'])
+    declarer.declare(application_name, cluster_name, [])
+    assert declare.call_count == 0
+    declarer.flush()
+    assert declare.call_count == 1
+
+    service_info = route_management.make_service_info()
+    assert service_info.get_dependency() == {
+        'base.foo': sorted([cluster_name, 'stable']),
+        'base.bar': ['stable'],
+    }
+    assert service_info.stat.version == 0
+
+    # The declared upstream is skipped
+    declarer.declare(application_name, cluster_name, ['base.foo'])
+    declarer.flush()
+    assert declare.call_count == 1
+
+    declarer.declare(application_name, cluster_name, ['base.bar'])
+    declarer.flush()
+    assert declare.call_count == 2
+    service_info = route_management.make_service_info()
+    assert service_info.get_dependency()['base.bar'] == \
+        sorted([cluster_name, 'stable'])
+    assert service_info.stat.version == 1
+
+
+def test_upstream_declarer_retry(route_management, mocker):
+    declarer = UpstreamDeclarer(huskar_client)
+    application_name = route_management.application_name
+    cluster_name = route_management.cluster_name
+    mocker.patch.object(
+        RouteManagement, 'declare_upstream_pairs', autospec=True,
+        side_effect=[OutOfSyncError(), RuntimeError('oops')])
+
+    declarer.declare(application_name, cluster_name, ['base.foo'])
+    declarer.flush()
+    declarer.flush()
+    declarer.flush()
+    assert RouteManagement.declare_upstream_pairs.call_count == 2
+    assert route_management.make_service_info().get_dependency() == {}
+
+
+def test_upstream_declarer_thread(mocker):
+    declarer = UpstreamDeclarer(huskar_client, interval=0.01)
+    flush = mocker.patch.object(declarer, 'flush')
+    worker = declarer.spawn_declaring_thread()
+    gevent.sleep(0.05)
+    assert flush.called
+
+    declarer.stop()
+    worker.join(1)
+    assert worker.dead
+
+
 def test_default_route(route_management):
     assert route_management.get_default_route() == {'overall': {
         'direct': 'channel-stable-1',
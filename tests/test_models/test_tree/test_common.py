@@ -2,7 +2,7 @@ from __future__ import absolute_import
 
 import functools
 
-from huskar_api.models.tree.common import parse_path, ClusterMap
+from huskar_api.models.tree.common import parse_path, ClusterMap, HashRing
 
 
 def test_path():
@@ -81,3 +81,24 @@ def test_cluster_map():
     assert cluster_map.cluster_names == {'foo': 'bar'}
     assert cluster_map.resolved_names == {
         'bar': {'foo'}, 'foo': set(), 'e': set()}
+
+
+def test_hash_ring():
+    keys = ['base.foo%d:config' % i for i in range(1000)]
+
+    ring = HashRing(1)
+    assert {ring.get_node(key) for key in keys} == {0}
+
+    ring = HashRing(4)
+    nodes = [ring.get_node(key) for key in keys]
+    assert nodes == [HashRing(4).get_node(key) for key in keys]
+    assert set(nodes) == {0, 1, 2, 3}
+    assert all(150 < nodes.count(node) < 350 for node in range(4))
+    assert ring.get_node(u'base.foo0:config') == nodes[0]
+
+    # Most keys stay in their nodes while a node is added
+    bigger_ring = HashRing(5)
+    moved = [key for key, node in zip(keys, nodes)
+             if bigger_ring.get_node(key) != node]
+    assert len(moved) < 350
+    assert all(bigger_ring.get_node(key) == 4 for key in moved)
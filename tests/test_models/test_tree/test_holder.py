@@ -32,6 +32,24 @@ def test_start(test_application_name):
     holder.block_until_initialized(5)
 
 
+def test_start_with_multiple_sessions(mocker, test_application_name):
+    extra_client = mocker.Mock(client=huskar_client.client)
+    hub = TreeHub(huskar_client, 10, extra_clients=[extra_client])
+    assert len(hub.clients) == 2
+    assert len(hub.throttles) == 2
+    assert hub.throttles[0] is not hub.throttles[1]
+    assert hub.throttle is hub.throttles[0]
+
+    index = hub.get_client_index(test_application_name, 'config')
+    assert index in (0, 1)
+    assert index == hub.get_client_index(test_application_name, 'config')
+
+    holder = hub.get_tree_holder(test_application_name, 'config')
+    assert holder.client is hub.clients[index]
+    assert holder.throttle_semaphore is hub.throttles[index]
+    holder.block_until_initialized(5)
+
+
 def test_start_with_throttle(faker):
     prefix = 'test_start_with_throttle.%s' % faker.uuid4()[:8]
 
@@ -223,3 +241,28 @@ def test_list_service_info(zk, test_application_name, service_holder, hub):
         '%s/stable' % base_path, '233')
     wait_and_reset()
     assert dict(service_holder.list_service_info(['stable'])) == {'stable': {}}
+
+
+def test_peek_tree_holder(zk, test_application_name, hub):
+    assert hub.peek_tree_holder(test_application_name, 'config') is None
+
+    path = '/huskar/config/%s/stable/DB_URL' % test_application_name
+    zk.create(path, b'foo', makepath=True)
+    holder = hub.get_tree_holder(test_application_name, 'config')
+    holder.block_until_initialized(5)
+    assert hub.peek_tree_holder(test_application_name, 'config') is holder
+
+    node = holder.get_node('config', test_application_name, 'stable', 'DB_URL')
+    _, stat = zk.get(path)
+    assert node.data == b'foo'
+    assert node.stat.mzxid == stat.mzxid
+
+    holder.dispatch_signal(TreeEvent.make(
+        TreeEvent.CONNECTION_SUSPENDED, None))
+    assert hub.peek_tree_holder(test_application_name, 'config') is None
+    holder.dispatch_signal(TreeEvent.make(
+        TreeEvent.CONNECTION_RECONNECTED, None))
+    assert hub.peek_tree_holder(test_application_name, 'config') is holder
+
+    hub.release_tree_holder(test_application_name, 'config')
+    assert hub.peek_tree_holder(test_application_name, 'config') is None
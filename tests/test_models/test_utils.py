@@ -1,11 +1,15 @@
 from __future__ import absolute_import
 
 import sys
+import time
+
+import gevent
+from dogpile.cache.api import NO_VALUE
 from pytest import raises, mark
 
 from huskar_api.models.utils import (
     take_slice, check_znode_path, normalize_cluster_name, dedupleft,
-    merge_instance_list, retry)
+    merge_instance_list, retry, make_cache_decorator)
 
 
 def test_take_slice(mocker):
@@ -99,3 +103,124 @@ def test_retry_with_max_retry(mocker):
     func(233)
 
     momo.assert_called_once()
+
+
+def test_cache_on_arguments_single_flight(redis_client, faker):
+    cache_on_arguments = make_cache_decorator(redis_client)
+    calls = []
+
+    @cache_on_arguments(60)
+    def compute(name):
+        calls.append(name)
+        gevent.sleep(0.1)
+        return name.upper()
+
+    name = faker.uuid4()
+    greenlets = [gevent.spawn(compute, name) for _ in range(10)]
+    gevent.joinall(greenlets, raise_error=True)
+    assert [g.value for g in greenlets] == [name.upper()] * 10
+    assert calls == [name]
+
+    assert compute(name) == name.upper()
+    assert calls == [name]
+    assert compute.get_many([(name,), ('x',)]) == [name.upper(), NO_VALUE]
+
+    compute.flush(name)
+    assert compute(name) == name.upper()
+    assert calls == [name, name]
+
+
+def test_cache_on_arguments_stale(redis_client, mocker, faker):
+    cache_on_arguments = make_cache_decorator(redis_client)
+    calls = []
+
+    @cache_on_arguments(60, stale_time=60, redis_lock=True)
+    def compute(name):
+        calls.append(name)
+        gevent.sleep(0.1)
+        return len(calls)
+
+    name = faker.uuid4()
+    assert compute(name) == 1
+    assert redis_client.ttl(compute.generate_key(name)) > 60
+
+    # The stale result is served while a caller is recomputing
+    time_module = mocker.patch('huskar_api.models.utils.time')
+    time_module.time.return_value = time.time() + 61
+    greenlets = [gevent.spawn(compute, name) for _ in range(5)]
+    gevent.joinall(greenlets, raise_error=True)
+    assert sorted(g.value for g in greenlets) == [1, 1, 1, 1, 2]
+    assert len(calls) == 2
+    assert not redis_client.exists(compute.generate_key(name) + ':lock')
+    assert compute(name) == 2
+
+
+def test_cache_on_arguments_lock_of_others(redis_client, mocker, faker):
+    cache_on_arguments = make_cache_decorator(redis_client)
+
+    @cache_on_arguments(60, redis_lock=True, lock_timeout=1)
+    def compute(name):
+        return name.upper()
+
+    name = faker.uuid4()
+    lock_key = compute.generate_key(name) + ':lock'
+    redis_client.set(lock_key, 'others', ex=10)
+
+    # The lock is kept after waiting for it timed out
+    assert compute(name) == name.upper()
+    assert redis_client.get(lock_key) == 'others'
+
+    redis_client.delete(lock_key)
+    compute.flush(name)
+    mocker.patch.object(redis_client, 'eval', side_effect=Exception('oops'))
+    assert compute(name) == name.upper()
+    assert redis_client.exists(lock_key)
+
+
+def test_cache_on_arguments_early_recomputation(redis_client, mocker, faker):
+    cache_on_arguments = make_cache_decorator(redis_client)
+    calls = []
+
+    @cache_on_arguments(60)
+    def compute(name):
+        calls.append(name)
+        return len(calls)
+
+    name = faker.uuid4()
+    assert compute(name) == 1
+
+    # The fast computing is not refreshed earlier
+    mocker.patch('huskar_api.models.utils.random.random', return_value=0.99)
+    assert compute(name) == 1
+
+    # The slow computing is refreshed earlier
+    mocker.patch('huskar_api.models.utils.zloads',
+                 return_value=(1, time.time() + 10, 5))
+    assert compute(name) == 2
+
+
+def test_cache_on_arguments_negative(redis_client, faker):
+    cache_on_arguments = make_cache_decorator(redis_client)
+    calls = []
+
+    @cache_on_arguments(60, negative_expiration_time=5)
+    def compute(name):
+        calls.append(name)
+        return name if name.startswith('x') else None
+
+    name = faker.uuid4()
+    assert compute(name) is None
+    assert compute(name) is None
+    assert calls == [name]
+    assert 0 < redis_client.ttl(compute.generate_key(name)) <= 5
+    assert compute.get_many([(name,)]) == [None]
+
+    compute.flush(name)
+    assert compute(name) is None
+    assert calls == [name, name]
+
+    assert compute('x' + name) == 'x' + name
+    assert redis_client.ttl(compute.generate_key('x' + name)) > 5
+
+    compute.set_many([(('y',), None)])
+    assert 0 < redis_client.ttl(compute.generate_key('y')) <= 5
@@ -4,7 +4,7 @@ from pytest import fixture, raises
 from gevent import sleep
 from kazoo.exceptions import BadVersionError, NodeExistsError, NoNodeError
 
-from huskar_api.models.znode import ZnodeModel, ZnodeList
+from huskar_api.models.znode import ZnodeModel, ZnodeList, ZnodeCache
 from huskar_api.models.exceptions import MalformedDataError, OutOfSyncError
 
 
@@ -207,6 +207,94 @@ def test_znode_model_delete_oos(zk, faker, model_class):
     assert model.data == b'1s'
 
 
+@fixture
+def znode_cache(zk, model_class):
+    model_class.cache = ZnodeCache(zk, max_size=2)
+    try:
+        yield model_class.cache
+    finally:
+        zk.remove_listener(model_class.cache._handle_state)
+        model_class.cache = None
+
+
+def test_znode_cache_load(zk, faker, schema, model_class, znode_cache):
+    name = faker.uuid4()
+    path = '/huskar/service/%s/overall' % name
+    zk.create(path, b'1s', makepath=True)
+
+    model = model_class(zk, application_name=name)
+    model.load()
+    assert model.data == '1s'
+    assert path in znode_cache
+    assert schema.loads.call_count == 1
+
+    other_model = model_class(zk, application_name=name)
+    other_model.load()
+    assert other_model.data == '1s'
+    assert other_model.stat == model.stat
+    assert schema.loads.call_count == 1
+
+    # The cache is invalidated by watch
+    zk.set(path, b'+1s')
+    sleep(0.1)
+    assert path not in znode_cache
+    other_model.load()
+    assert other_model.data == '+1s'
+    assert other_model.stat.version == 1
+    assert schema.loads.call_count == 2
+
+    # The models of other clients are not cached
+    model = model_class(object(), application_name=name)
+    assert model._get_cache() is None
+
+
+def test_znode_cache_save(zk, faker, model_class, znode_cache):
+    name = faker.uuid4()
+    path = '/huskar/service/%s/overall' % name
+    zk.create(path, b'1s', makepath=True)
+
+    model = model_class(zk, application_name=name)
+    model.load()
+    model.data = '+1s'
+    model.save()
+    assert path not in znode_cache
+    assert zk.get(path)[0] == b'+1s'
+
+    # The cached stat version is used by the optimistic concurrency control
+    model = model_class(zk, application_name=name)
+    model.load()
+    assert path in znode_cache
+    zk.set(path, b'+2s')
+    model.data = '+3s'
+    with raises(OutOfSyncError):
+        model.save()
+    assert path not in znode_cache
+
+    model.load()
+    assert model.data == '+2s'
+    model.delete()
+    assert path not in znode_cache
+
+
+def test_znode_cache_eviction(zk, faker, model_class, znode_cache):
+    names = [faker.uuid4() for _ in range(3)]
+    paths = ['/huskar/service/%s/overall' % name for name in names]
+    for path in paths:
+        zk.create(path, b'1s', makepath=True)
+
+    for name in names:
+        model_class(zk, application_name=name).load()
+    assert len(znode_cache) == 2
+    assert paths[0] not in znode_cache
+
+    model_class(zk, application_name=names[1]).load()
+    model_class(zk, application_name=names[0]).load()
+    assert list(znode_cache.entries) == [paths[1], paths[0]]
+
+    znode_cache._handle_state('SUSPENDED')
+    assert len(znode_cache) == 0
+
+
 def test_znode_list_provision(zk, base_path):
     zk.ensure_path(base_path + '/foo')
     zk.ensure_path(base_path + '/bar')
@@ -0,0 +1,159 @@
+from __future__ import absolute_import
+
+import datetime
+
+from pytest import fixture
+from sqlalchemy import text
+
+from huskar_api.models.auth import Team
+from huskar_api.models.audit import AuditLog, action_creator, action_types
+from huskar_api.scripts import audit as audit_script
+from huskar_api.scripts.audit import (
+    AUDIT_TABLES, create_audit_partitions, archive_audit_partitions)
+
+
+@fixture
+def engine(db):
+    engine = db.engines['master']
+    try:
+        yield engine
+    finally:
+        rs = engine.execute(
+            text('SHOW TABLES LIKE :pattern'), pattern='%_archive_%')
+        for table_name, in rs.fetchall():
+            engine.execute('DROP TABLE {0}'.format(table_name))
+        # The same layout of "database/mysql.sql"
+        for table_name in AUDIT_TABLES:
+            engine.execute(
+                'ALTER TABLE {0} PARTITION BY RANGE (TO_DAYS(created_at)) '
+                '(PARTITION pmax VALUES LESS THAN MAXVALUE)'.format(
+                    table_name))
+
+
+def list_partitions(engine, table_name):
+    with engine.connect() as connection:
+        return audit_script._list_partitions(connection, table_name)
+
+
+def test_create_audit_partitions(engine):
+    this_month = datetime.date.today().replace(day=1)
+    expected_names = ['p{0:%Y%m}'.format(audit_script._add_months(
+        this_month, i)) for i in range(3)]
+
+    create_audit_partitions(months=2)
+    partitions = {t: list_partitions(engine, t) for t in AUDIT_TABLES}
+    for names in partitions.values():
+        assert names[-1] == 'pmax'
+        assert names[-4:-1] == expected_names
+
+    create_audit_partitions(months=2)
+    assert partitions == {t: list_partitions(engine, t) for t in AUDIT_TABLES}
+
+
+def test_create_audit_partitions_after_missed_months(engine):
+    this_month = datetime.date.today().replace(day=1)
+    missed_month = audit_script._add_months(this_month, -3)
+    for table_name in AUDIT_TABLES:
+        engine.execute(
+            'ALTER TABLE {0} REORGANIZE PARTITION pmax INTO ({1}, '
+            'PARTITION pmax VALUES LESS THAN MAXVALUE)'.format(
+                table_name, audit_script._make_partition(missed_month)))
+    expected_names = ['p{0:%Y%m}'.format(audit_script._add_months(
+        missed_month, i)) for i in range(6)] + ['pmax']
+
+    create_audit_partitions(months=2)
+    for table_name in AUDIT_TABLES:
+        assert list_partitions(engine, table_name) == expected_names
+
+
+def test_create_audit_partitions_without_partitioning(mocker):
+    mocker.patch.object(audit_script, '_list_partitions', return_value=[])
+    get_engine = mocker.patch.object(audit_script, 'get_engine')
+    connection = get_engine.return_value.connect.return_value.__enter__ \
+        .return_value
+    create_audit_partitions()
+    assert not connection.execute.called
+
+
+def test_archive_audit_partitions(db, engine):
+    team = Team.create('foobar')
+    action = action_creator.make_action(action_types.CREATE_TEAM, team=team)
+    audit_log = AuditLog.create(0, '127.0.0.1', action)
+    this_month = datetime.date.today().replace(day=1)
+
+    create_audit_partitions(months=1)
+    archive_audit_partitions(months=-1)
+
+    partition_name = 'p{0:%Y%m}'.format(this_month)
+    for table_name in AUDIT_TABLES:
+        assert partition_name not in list_partitions(engine, table_name)
+    rs = engine.execute('SELECT id FROM audit_log_archive_{0:%Y%m}'.format(
+        this_month)).fetchall()
+    assert [r[0] for r in rs] == [audit_log.id]
+    rs = engine.execute('SELECT audit_id FROM audit_index_archive_{0:%Y%m}'
+                        .format(this_month)).fetchall()
+    assert [r[0] for r in rs] == [audit_log.id]
+    assert engine.execute(
+        text('SELECT COUNT(*) FROM audit_log WHERE id = :id'),
+        id=audit_log.id).scalar() == 0
+
+
+def test_archive_audit_partitions_failed(mocker, engine):
+    create_audit_partitions(months=1)
+    archive_partition = mocker.patch.object(
+        audit_script, '_archive_partition', side_effect=Exception('oops'))
+    archive_audit_partitions(months=-2)
+    # The whole archiving stops at the first failure
+    this_month = datetime.date.today().replace(day=1)
+    assert archive_partition.call_count == 1
+    assert archive_partition.call_args[0][1:] == (
+        'audit_log', 'p{0:%Y%m}'.format(this_month),
+        'audit_log_archive_{0:%Y%m}'.format(this_month))
+    for table_name in AUDIT_TABLES:
+        assert list_partitions(engine, table_name)[-1] == 'pmax'
+
+
+def test_archive_audit_partitions_again(db, engine):
+    team = Team.create('foobar')
+    action = action_creator.make_action(action_types.CREATE_TEAM, team=team)
+    audit_log = AuditLog.create(0, '127.0.0.1', action)
+    this_month = datetime.date.today().replace(day=1)
+    partition_name = 'p{0:%Y%m}'.format(this_month)
+    archive_name = 'audit_log_archive_{0:%Y%m}'.format(this_month)
+
+    create_audit_partitions(months=1)
+    # Failed after the exchange
+    engine.execute('CREATE TABLE {0} LIKE audit_log'.format(archive_name))
+    engine.execute('ALTER TABLE {0} REMOVE PARTITIONING'.format(archive_name))
+    engine.execute('ALTER TABLE audit_log EXCHANGE PARTITION {0} '
+                   'WITH TABLE {1}'.format(partition_name, archive_name))
+    archive_audit_partitions(months=-1)
+
+    for table_name in AUDIT_TABLES:
+        assert partition_name not in list_partitions(engine, table_name)
+    rs = engine.execute('SELECT id FROM {0}'.format(archive_name)).fetchall()
+    assert [r[0] for r in rs] == [audit_log.id]
+    with engine.connect() as connection:
+        assert audit_script._get_row_format(
+            connection, archive_name) == 'Compressed'
+
+
+def test_archive_audit_partitions_into_dirty_table(db, engine):
+    team = Team.create('foobar')
+    action = action_creator.make_action(action_types.CREATE_TEAM, team=team)
+    audit_log = AuditLog.create(0, '127.0.0.1', action)
+    this_month = datetime.date.today().replace(day=1)
+    partition_name = 'p{0:%Y%m}'.format(this_month)
+    archive_name = 'audit_log_archive_{0:%Y%m}'.format(this_month)
+
+    create_audit_partitions(months=1)
+    engine.execute('CREATE TABLE {0} LIKE audit_log'.format(archive_name))
+    engine.execute('INSERT INTO {0} SELECT * FROM audit_log'.format(
+        archive_name))
+    archive_audit_partitions(months=-1)
+
+    for table_name in AUDIT_TABLES:
+        assert partition_name in list_partitions(engine, table_name)
+    assert engine.execute(
+        text('SELECT COUNT(*) FROM audit_log WHERE id = :id'),
+        id=audit_log.id).scalar() == 1
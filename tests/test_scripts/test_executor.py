@@ -0,0 +1,103 @@
+from __future__ import absolute_import
+
+import os
+import time
+
+from pytest import fixture
+
+from huskar_api.scripts.executor import Executor, RateLimiter
+
+
+@fixture
+def checkpoint_path(tmpdir):
+    return tmpdir.join('test.checkpoint').strpath
+
+
+def test_rate_limiter():
+    rate_limiter = RateLimiter(100)
+    started_at = time.time()
+    for _ in range(10):
+        rate_limiter.acquire(2)
+    assert 0.15 < time.time() - started_at < 0.5
+
+    rate_limiter = RateLimiter()
+    started_at = time.time()
+    for _ in range(10):
+        rate_limiter.acquire(2)
+    assert time.time() - started_at < 0.05
+
+
+def test_executor_run(mocker):
+    calls = []
+
+    def job(item):
+        executor.acquire()
+        calls.append(item)
+        if item == 'x':
+            raise ValueError(item)
+        yield 'odd' if item % 2 else 'even'
+
+    executor = Executor(concurrency=3, rate=1000)
+    summary = executor.run(job, [1, 2, 3, 'x', 5])
+    assert sorted(calls) == [1, 2, 3, 5, 'x']
+    assert summary == {'odd': 3, 'even': 1, 'error': 1}
+
+
+def test_executor_resume(checkpoint_path):
+    calls = []
+
+    def job(item):
+        calls.append(item)
+        if item in failed_items:
+            raise RuntimeError(item)
+        if item in error_items:
+            return ['ok', 'error']
+        return ['ok']
+
+    failed_items = {u'c'}
+    error_items = {u'd'}
+    executor = Executor(concurrency=2, checkpoint_path=checkpoint_path)
+    summary = executor.run(job, [u'a', u'b', u'c', u'd', u'\u6d4b'])
+    assert summary == {'ok': 4, 'error': 2}
+    with open(checkpoint_path) as checkpoint_file:
+        assert sorted(checkpoint_file.read().splitlines()) == [
+            'a', 'b', '\xe6\xb5\x8b']
+
+    del calls[:]
+    failed_items.clear()
+    error_items.clear()
+    executor = Executor(concurrency=2, checkpoint_path=checkpoint_path)
+    summary = executor.run(job, [u'a', u'b', u'c', u'd', u'\u6d4b'])
+    assert calls == [u'c', u'd']
+    assert summary == {'ok': 2, 'resumed': 3}
+    assert not executor.checkpoint.finished
+
+    # The checkpoint is removed after all jobs are finished
+    executor = Executor(concurrency=2, checkpoint_path=checkpoint_path)
+    summary = executor.run(job, [u'a'])
+    assert summary == {'ok': 1}
+
+
+def test_executor_expired_checkpoint(checkpoint_path):
+    def job(item):
+        if item == u'b':
+            raise RuntimeError(item)
+        return ['ok']
+
+    executor = Executor(
+        concurrency=2, checkpoint_path=checkpoint_path, checkpoint_max_age=60)
+    summary = executor.run(job, [u'a', u'b'])
+    assert summary == {'ok': 1, 'error': 1}
+
+    executor = Executor(
+        concurrency=2, checkpoint_path=checkpoint_path, checkpoint_max_age=60)
+    assert executor.checkpoint.finished == {u'a'}
+
+    updated_at = time.time() - 61
+    os.utime(checkpoint_path, (updated_at, updated_at))
+    executor = Executor(
+        concurrency=2, checkpoint_path=checkpoint_path, checkpoint_max_age=60)
+    assert not executor.checkpoint.finished
+    assert not os.path.exists(checkpoint_path)
+    summary = executor.run(job, [u'a', u'b'])
+    assert summary == {'ok': 1, 'error': 1}
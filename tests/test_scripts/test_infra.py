@@ -5,8 +5,10 @@ from pytest import fixture
 from huskar_api.models.auth import Application, Team
 from huskar_api.models.infra import InfraDownstream
 from huskar_api.models.instance import InfraInfo
+from huskar_api.models.const import INFRA_CONFIG_KEYS
+from huskar_api.scripts import infra as infra_script
 from huskar_api.scripts.infra import (
-    collect_infra_config, _collect_infra_upstream)
+    collect_infra_config, refresh_infra_config, _collect_infra_upstream)
 
 
 @fixture(scope='function')
@@ -80,3 +82,47 @@ def test_collect_infra_config(zk, db, faker, test_team):
     assert ds[1].user_infra_name == 'cache'
     assert ds[1].user_scope_pair == ('idcs', 'altb1')
     assert ds[1].user_field_name == 'url'
+
+
+def test_refresh_infra_config(mocker, zk, db, faker, test_team):
+    prefix = faker.uuid4()[:8]
+    application_names = ['%s_foo' % prefix, '%s_bar' % prefix]
+    for x in application_names:
+        Application.create(x, test_team.id)
+        infra_info = InfraInfo(zk, x, 'redis')
+        infra_info.load()
+        infra_info.set_by_name(
+            'cache', 'idcs', 'altb1', {'url': 'sam+redis://redis.foo'})
+        infra_info.save()
+
+    collect_infra_config()
+    InfraDownstream.flush_cache_by_application('redis.foo')
+    ds = InfraDownstream.get_multi_by_application('redis.foo')
+    assert sorted(d.user_application_name for d in ds) == sorted(
+        application_names)
+
+    # Nothing is changed
+    spy = mocker.spy(infra_script, '_iter_infra_upstream')
+    get_async = mocker.spy(zk, 'get_async')
+    refresh_infra_config()
+    assert spy.call_count == 0
+    assert get_async.call_count == 0
+
+    infra_info = InfraInfo(zk, application_names[0], 'redis')
+    infra_info.load()
+    infra_info.set_by_name(
+        'cache', 'idcs', 'altb1', {'url': 'sam+redis://redis.bar'})
+    infra_info.save()
+
+    refresh_infra_config()
+    assert spy.call_count == 1
+    assert get_async.call_count == len(INFRA_CONFIG_KEYS)
+    assert all(application_names[0] in c[0][0]
+               for c in get_async.call_args_list)
+
+    InfraDownstream.flush_cache_by_application('redis.foo')
+    ds = InfraDownstream.get_multi_by_application('redis.foo')
+    assert [d.user_application_name for d in ds] == [application_names[1]]
+    InfraDownstream.flush_cache_by_application('redis.bar')
+    ds = InfraDownstream.get_multi_by_application('redis.bar')
+    assert [d.user_application_name for d in ds] == [application_names[0]]
@@ -55,7 +55,8 @@ def test_vacuum_empty_clusters(
     for item in before:
         zk_safe.create(format_text(item['path']), item['data'], makepath=True)
 
-    vacuum_empty_clusters()
+    summary = vacuum_empty_clusters()
+    assert summary['deleted'] == len(should_not_exist)
 
     for item in should_exist:
         assert zk_safe.exists(format_text(item['path']))
@@ -84,12 +85,58 @@ def test_vacuum_stale_barriers(zk):
     zk.ensure_path('/huskar/container-barrier/bar')
 
     with freezegun.freeze_time() as frozen_time:
-        vacuum_stale_barriers()
+        assert vacuum_stale_barriers() == {'skipped': 2}
         assert zk.exists('/huskar/container-barrier/foo')
         assert zk.exists('/huskar/container-barrier/bar')
 
         frozen_time.tick(datetime.timedelta(days=1.5))
 
-        vacuum_stale_barriers()
+        assert vacuum_stale_barriers() == {'deleted': 2}
         assert not zk.exists('/huskar/container-barrier/foo')
         assert not zk.exists('/huskar/container-barrier/bar')
+
+
+def test_vacuum_empty_clusters_resume(
+        mocker, tmpdir, zk_safe, format_text):
+    zk_safe.create(format_text(
+        '/huskar_{base_path}/service/{test_application}/foo'), makepath=True)
+    mocker.patch.object(settings, 'VACUUM_CHECKPOINT_DIR', tmpdir.strpath)
+    tmpdir.join('vacuum_empty_clusters.checkpoint').write(format_text(
+        'service:{test_application}\n'))
+
+    summary = vacuum_empty_clusters()
+    assert summary['resumed'] == 1
+    assert 'deleted' not in summary
+    assert zk_safe.exists(format_text(
+        '/huskar_{base_path}/service/{test_application}/foo'))
+    assert not tmpdir.join('vacuum_empty_clusters.checkpoint').exists()
+
+
+def test_vacuum_empty_clusters_retry_errors(
+        mocker, tmpdir, zk_safe, format_text):
+    path = format_text('/huskar_{base_path}/service/{test_application}/foo')
+    zk_safe.create(path, makepath=True)
+    mocker.patch.object(settings, 'VACUUM_CHECKPOINT_DIR', tmpdir.strpath)
+    errors = [RuntimeError('oops')]
+    original_delete_cluster = InstanceManagement.delete_cluster
+
+    def delete_cluster(self, cluster_name):
+        if errors:
+            raise errors.pop()
+        return original_delete_cluster(self, cluster_name)
+
+    mocker.patch.object(
+        InstanceManagement, 'delete_cluster', autospec=True,
+        side_effect=delete_cluster)
+
+    summary = vacuum_empty_clusters()
+    assert summary['error'] == 1
+    assert zk_safe.exists(path)
+    assert tmpdir.join('vacuum_empty_clusters.checkpoint').exists()
+
+    # The failed application is checked again instead of being resumed
+    summary = vacuum_empty_clusters()
+    assert summary['deleted'] == 1
+    assert summary['resumed'] == 8
+    assert not zk_safe.exists(path)
+    assert not tmpdir.join('vacuum_empty_clusters.checkpoint').exists()
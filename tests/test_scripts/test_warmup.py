@@ -0,0 +1,96 @@
+from __future__ import absolute_import
+
+from pytest import fixture
+
+from huskar_api.models import DBSession
+from huskar_api.models.auth import (
+    User, Team, Application, ApplicationAuth, Authority)
+from huskar_api.models.webhook.webhook import Webhook, WebhookSubscription
+from huskar_api.models.utils import NO_VALUE
+from huskar_api.scripts.warmup import warm_up_caches, warm_up_table
+
+
+@fixture
+def test_data(db, faker):
+    prefix = faker.uuid4()[:8]
+    team = Team.create('%s_team' % prefix)
+    applications = [
+        Application.create('%s_app_%d' % (prefix, i), team.id)
+        for i in range(3)]
+    user = User.create_normal(
+        '%s_user' % prefix, '-', '%s@example.com' % prefix, is_active=True)
+    ApplicationAuth.ensure(Authority.READ, user.id, applications[0].id)
+    auth = ApplicationAuth.find(Authority.READ, user.id, applications[0].id)
+    webhook = Webhook.create('http://%s.example.com' % prefix)
+    subscription = WebhookSubscription.create(
+        applications[0].id, webhook.id, 1)
+    return team, applications, user, auth, subscription
+
+
+def test_warm_up_caches(mocker, redis_client, test_data):
+    team, applications, user, auth, subscription = test_data
+    application_ids = [a.id for a in applications]
+    redis_client.delete(*redis_client.keys('huskar_api.*'))
+
+    warm_up_caches()
+
+    assert User.mget_cache_only([user.id])[0].username == user.username
+    assert Team.mget_cache_only([team.id])[0].team_name == team.team_name
+    assert [a.id for a in Application.mget_cache_only(application_ids)] == \
+        application_ids
+    assert ApplicationAuth.mget_cache_only([auth.id])[0].user_id == user.id
+    assert WebhookSubscription.mget_cache_only(
+        [subscription.id])[0].webhook_id == subscription.webhook_id
+
+    assert User.get_id_by_name.get_many([(user.username,)]) == [user.id]
+    assert User.get_id_by_email.get_many([(user.email,)]) == [user.id]
+    assert Team.get_id_by_name.get_many([(team.team_name,)]) == [team.id]
+    assert Application.get_id_by_name.get_many([
+        (applications[1].application_name,)]) == [applications[1].id]
+    assert Application.get_ids_by_team.get_many([(team.id,)]) == [
+        application_ids]
+    assert ApplicationAuth.find_id.get_many([
+        (Authority.READ, user.id, applications[0].id),
+        (Authority.WRITE, user.id, applications[0].id),
+    ]) == [auth.id, NO_VALUE]
+    assert WebhookSubscription.get_ids.get_many([
+        (applications[0].id, subscription.webhook_id, 1),
+        (applications[0].id, subscription.webhook_id, None),
+        (applications[0].id, None, None),
+    ]) == [[subscription.id]] * 3
+    assert WebhookSubscription.get_id.get_many([
+        (applications[0].id, subscription.webhook_id, 1)]) == [
+        subscription.id]
+
+    # Nothing is read from database after warming up
+    spy = mocker.spy(DBSession(), 'query')
+    assert Application.get_by_name(applications[0].application_name)
+    assert Application.get_multi_by_team(team.id)
+    assert spy.call_count == 0
+
+
+def test_warm_up_table_in_chunks(mocker, test_data):
+    team, applications, _, _, _ = test_data
+    Application.flush([a.id for a in applications])
+    Application.get_id_by_name.flush(applications[0].application_name)
+    count = DBSession().query(Application).count()
+
+    assert warm_up_table('application', chunk_size=2) == count
+    assert Application.get_id_by_name.get_many([
+        (applications[0].application_name,)]) == [applications[0].id]
+
+
+def test_warm_up_table_keeps_existing_values(test_data):
+    team, applications, _, _, _ = test_data
+    Team.get_id_by_name.set_many([((team.team_name,), 10086)])
+
+    warm_up_table('team')
+    assert Team.get_id_by_name.get_many([(team.team_name,)]) == [10086]
+
+
+def test_warm_up_caches_skips_failed_table(mocker, test_data):
+    warm_up = mocker.patch(
+        'huskar_api.scripts.warmup.warm_up_table', autospec=True,
+        side_effect=[Exception('oops'), 0, 0, 0, 0])
+    warm_up_caches()
+    assert warm_up.call_count == 5
@@ -0,0 +1,10 @@
+from __future__ import absolute_import
+
+import os
+import sys
+
+
+# The tools are scripts instead of packages
+sys.path.insert(0, os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir,
+    'tools', 'zookeeper-lint'))
@@ -0,0 +1,167 @@
+from __future__ import absolute_import
+
+import json
+
+from pytest import fixture, raises
+
+import zookeeper_lint
+from tree_walker import TreeWalker
+
+
+@fixture
+def base_path(zk, faker):
+    base_path = '/huskar/test_%s' % faker.uuid4()[:8]
+    zk.ensure_path(base_path)
+    try:
+        yield base_path
+    finally:
+        zk.delete(base_path, recursive=True)
+
+
+@fixture
+def walker(zk):
+    return TreeWalker(zk, max_outstanding=2)
+
+
+def test_walk(zk, base_path, walker):
+    for path in ('b/2', 'b/1', 'a/3', 'c', 'd/4/5'):
+        zk.ensure_path('%s/%s' % (base_path, path))
+
+    assert list(walker.walk(base_path, 1)) == [
+        '%s/%s' % (base_path, n) for n in 'abcd']
+    assert list(walker.walk(base_path, 2)) == [
+        '%s/%s' % (base_path, p) for p in ('a/3', 'b/1', 'b/2', 'd/4')]
+    assert list(walker.walk(base_path, 2, start_after='a')) == [
+        '%s/%s' % (base_path, p) for p in ('b/1', 'b/2', 'd/4')]
+    assert list(walker.walk(base_path, 3)) == ['%s/d/4/5' % base_path]
+
+
+def test_walk_with_removed_nodes(zk, base_path, walker):
+    for path in ('a/1', 'b/2', 'c/3'):
+        zk.ensure_path('%s/%s' % (base_path, path))
+
+    paths = walker.walk(base_path, 2)
+    zk.delete('%s/b' % base_path, recursive=True)
+    assert list(paths) == ['%s/a/1' % base_path, '%s/c/3' % base_path]
+
+    paths = ['%s/%s' % (base_path, p) for p in ('a/1', 'b/2', 'c/3')]
+    zk.set(paths[2], b'foo')
+    nodes = list(walker.iter_nodes(paths))
+    assert [(path, data) for path, data, _ in nodes] == [
+        (paths[0], b''), (paths[2], b'foo')]
+    assert nodes[1][2].version == 1
+
+
+def test_pipeline(walker):
+    outstanding = []
+
+    def make_request(item):
+        if item is not None:
+            outstanding.append(item)
+            return FakeResult(item, outstanding)
+
+    results = list(walker.pipeline([1, None, 2, 3], make_request))
+    assert results == [(1, 1), (None, None), (2, 2), (3, 3)]
+
+
+class FakeResult(object):
+    def __init__(self, item, outstanding):
+        self.item = item
+        self.outstanding = outstanding
+
+    def get(self):
+        # The count of outstanding requests is bounded
+        assert len(self.outstanding) <= 2
+        self.outstanding.remove(self.item)
+        return self.item
+
+
+def test_pipeline_failed(walker):
+    class BrokenResult(object):
+        def get(self):
+            raise RuntimeError('oops')
+
+    with raises(RuntimeError):
+        list(walker.pipeline([1], lambda item: BrokenResult()))
+
+
+@fixture
+def service_path(zk, faker):
+    prefix = 'test_%s' % faker.uuid4()[:8]
+    instance = json.dumps({'ip': '10.0.0.1', 'port': {'main': 80}})
+    nodes = [
+        ('%s_1/stable' % prefix, b''),
+        ('%s_1/stable/10.0.0.1_80' % prefix, instance),
+        ('%s_1/stable/10.0.0.1_80/runtime' % prefix, b'{"state": "up"}'),
+        ('%s_2/broken' % prefix, b'broken'),
+        ('%s_2/broken/10.0.0.2_80' % prefix, b'{}'),
+    ]
+    for path, data in nodes:
+        zk.create('/huskar/service/%s' % path, data, makepath=True)
+    try:
+        yield prefix
+    finally:
+        for name in ('%s_1' % prefix, '%s_2' % prefix):
+            zk.delete('/huskar/service/%s' % name, recursive=True)
+
+
+def lint(walker, prefix, start_after=None):
+    nodes = zookeeper_lint.iter_service_nodes(walker, start_after)
+    return [
+        (application_name, issue and issue.code, issue and issue.path)
+        for application_name, issue in zookeeper_lint.lint_service_nodes(
+            nodes)
+        if application_name.startswith(prefix)]
+
+
+def test_lint_service_nodes(service_path, walker):
+    prefix = service_path
+    assert lint(walker, prefix) == [
+        ('%s_1' % prefix, None, None),
+        ('%s_1' % prefix, None, None),
+        ('%s_1' % prefix, 'E-ZK002',
+         '/huskar/service/%s_1/stable/10.0.0.1_80/runtime' % prefix),
+        ('%s_2' % prefix, 'E-ZK003',
+         '/huskar/service/%s_2/broken' % prefix),
+        ('%s_2' % prefix, 'E-ZK004',
+         '/huskar/service/%s_2/broken/10.0.0.2_80' % prefix),
+    ]
+    assert [name for name, _, _ in lint(
+        walker, prefix, start_after='%s_1' % prefix)] == ['%s_2' % prefix] * 2
+
+
+def test_main(mocker, capsys, tmpdir):
+    checkpoint_path = tmpdir.join('lint.checkpoint')
+    checkpoint_path.write('foo')
+    mocker.patch('sys.argv', [
+        'zookeeper_lint.py', '--checkpoint', checkpoint_path.strpath])
+    issue = zookeeper_lint.LintIssue('E-ZK003', '/huskar/service/baz', b'x')
+
+    def lint_service_nodes(nodes):
+        yield u'bar', None
+        assert checkpoint_path.read() == 'foo'
+        yield u'baz', issue
+        assert checkpoint_path.read() == 'bar'
+        raise KeyboardInterrupt()
+
+    iter_service_nodes = mocker.patch.object(
+        zookeeper_lint, 'iter_service_nodes', autospec=True)
+    mocker.patch.object(
+        zookeeper_lint, 'lint_service_nodes', lint_service_nodes)
+    with raises(KeyboardInterrupt):
+        zookeeper_lint.main()
+    assert iter_service_nodes.call_args[0][1] == u'foo'
+    assert checkpoint_path.read() == 'bar'
+    assert [json.loads(line) for line in capsys.readouterr()[0].splitlines()] \
+        == [{'code': 'E-ZK003', 'message': 'Broken cluster link.',
+             'path': '/huskar/service/baz', 'data': 'x'}]
+
+    # Resume from the last finished application
+    mocker.patch.object(
+        zookeeper_lint, 'lint_service_nodes',
+        lambda nodes: iter([(u'baz', None), (u'qux', None)]))
+    with raises(SystemExit) as error:
+        zookeeper_lint.main()
+    assert error.value.code == 0
+    assert iter_service_nodes.call_args[0][1] == u'bar'
+    assert not checkpoint_path.exists()
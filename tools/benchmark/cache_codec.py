@@ -0,0 +1,47 @@
+from __future__ import print_function
+
+import bz2
+import datetime
+import timeit
+import cPickle as pickle
+
+from huskar_api import settings
+from huskar_api.models.cache.region import zdumps, zloads
+
+
+def legacy_dumps(x):
+    return bz2.compress(pickle.dumps(x, pickle.HIGHEST_PROTOCOL), 6)
+
+
+def make_samples():
+    now = datetime.datetime.now()
+    row = {
+        'id': 10086, 'username': u'foo.bar', 'password': 'x' * 64,
+        'email': u'foo.bar@example.com', 'is_active': True,
+        'huskar_admin': False, 'is_app': False, 'created_at': now,
+        'updated_at': now,
+    }
+    return [
+        ('table row', row),
+        ('id list', range(2000)),
+        ('row list', [dict(row, id=i) for i in range(50)]),
+    ]
+
+
+def main(number=2000):
+    settings.CACHE_VERSIONED_CODEC = True
+    print('{0:<10} {1:<7} {2:>8} {3:>12} {4:>12}'.format(
+        'sample', 'codec', 'size', 'dumps (us)', 'loads (us)'))
+    for name, value in make_samples():
+        codecs = [('legacy', legacy_dumps), ('current', zdumps)]
+        for codec_name, dumps in codecs:
+            payload = dumps(value)
+            dumps_time = timeit.timeit(lambda: dumps(value), number=number)
+            loads_time = timeit.timeit(lambda: zloads(payload), number=number)
+            print('{0:<10} {1:<7} {2:>8} {3:>12.1f} {4:>12.1f}'.format(
+                name, codec_name, len(payload),
+                dumps_time / number * 1e6, loads_time / number * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+from __future__ import absolute_import
+
+import collections
+
+from kazoo.exceptions import NoNodeError
+from huskar_sdk_v2.utils import combine
+
+
+class TreeWalker(object):
+    """The engine of walking a ZooKeeper tree concurrently.
+
+    All requests are sent asynchronously and pipelined, with a bounded count
+    of outstanding requests in each stage. The results are generated in the
+    same order of inputs, so a walk of sorted children is sorted too.
+
+    :param client: The ZooKeeper client.
+    :param max_outstanding: The max count of outstanding requests in each
+                            stage of walking.
+    """
+
+    def __init__(self, client, max_outstanding=100):
+        self.client = client
+        self.max_outstanding = max(max_outstanding, 1)
+
+    def pipeline(self, items, make_request):
+        """Sends requests for items and collects their results in order.
+
+        :param items: The iterable of items.
+        :param make_request: The function which accepts an item and returns
+                             an async result, or ``None`` for no request.
+        :returns: An iterator of ``(item, result)``. The result will be
+                  ``None`` if there is no request or the node does not exist.
+        """
+        window = collections.deque()
+        for item in items:
+            window.append((item, make_request(item)))
+            if len(window) >= self.max_outstanding:
+                yield self._pop_result(window)
+        while window:
+            yield self._pop_result(window)
+
+    def _pop_result(self, window):
+        item, async_result = window.popleft()
+        if async_result is None:
+            return item, None
+        try:
+            return item, async_result.get()
+        except NoNodeError:
+            return item, None
+
+    def iter_children(self, paths):
+        """Lists the children of nodes.
+
+        :param paths: The iterable of node paths.
+        :returns: An iterator of ``(path, children)``. The removed nodes are
+                  skipped and the children are sorted.
+        """
+        results = self.pipeline(paths, self.client.get_children_async)
+        for path, children in results:
+            if children is not None:
+                yield path, sorted(children)
+
+    def iter_nodes(self, paths):
+        """Fetches the data and stat of nodes.
+
+        :param paths: The iterable of node paths.
+        :returns: An iterator of ``(path, data, stat)``. The removed nodes are
+                  skipped.
+        """
+        results = self.pipeline(paths, self.client.get_async)
+        for path, result in results:
+            if result is not None:
+                data, stat = result
+                yield path, data, stat
+
+    def walk(self, path, depth, start_after=None):
+        """Lists the descendant paths of a node in specified depth.
+
+        :param path: The path of the root node.
+        :param depth: The depth of descendants, which should be positive.
+        :param start_after: Optional. The children of root node which are
+                            less than or equal to it will be skipped. It is
+                            useful for resuming an interrupted walking.
+        :returns: An iterator of sorted paths.
+        """
+        assert depth > 0
+        names = self.client.get_children(path)
+        names = sorted(n for n in names if start_after is None or
+                       n > start_after)
+        paths = (combine(path, name) for name in names)
+        for _ in xrange(depth - 1):
+            paths = (combine(parent_path, name)
+                     for parent_path, children in self.iter_children(paths)
+                     for name in children)
+        return paths
@@ -1,13 +1,15 @@
 from __future__ import print_function
 
+import os
 import sys
 import json
-import itertools
+import argparse
 
-from kazoo.exceptions import NoNodeError
 from huskar_sdk_v2.utils import combine
 from huskar_api.models import huskar_client
 
+from tree_walker import TreeWalker
+
 
 class LintIssue(object):
     CODES = {
@@ -26,124 +28,172 @@ class LintIssue(object):
     def __str__(self):
         return '{0}: {1}'.format(self.code, self.CODES[self.code])
 
-
-def get_cluster_names(type_name):
-    path = combine(huskar_client.base_path, type_name)
-    application_names = huskar_client.client.get_children(path)
-    for application_name in application_names:
-        cluster_path = combine(
-            huskar_client.base_path, type_name, application_name)
-        cluster_names = huskar_client.client.get_children(cluster_path)
-        for cluster_name in cluster_names:
-            yield application_name, cluster_name
-
-
-def get_fingerprints(type_name, application_name, cluster_name):
-    path = combine(
-        huskar_client.base_path, type_name, application_name, cluster_name)
-    return huskar_client.client.get_children(path)
-
-
-def lint_deprecated_runtime_value():
-    cluster_names = get_cluster_names('service')
-    for application_name, cluster_name in cluster_names:
-        fingerprints = get_fingerprints(
-            'service', application_name, cluster_name)
-        for fingerprint in fingerprints:
-            data_path = combine(
-                huskar_client.base_path, 'service', application_name,
-                cluster_name, fingerprint)
-            runtime_path = combine(data_path, 'runtime')
-            try:
-                runtime_data, _ = huskar_client.client.get(runtime_path)
-            except NoNodeError:
-                continue
-            else:
-                try:
-                    data, _ = huskar_client.client.get(data_path)
-                except NoNodeError:
-                    pass
-                else:
-                    try:
-                        data = json.loads(data)
-                    except (ValueError, TypeError):
-                        pass
-                    else:
-                        if isinstance(data, dict) and 'state' in data:
-                            yield LintIssue(
-                                'E-ZK001', runtime_path, runtime_data)
-                            continue
-                yield LintIssue('E-ZK002', runtime_path, runtime_data)
-
-
-def lint_cluster_link():
-    cluster_names = get_cluster_names('service')
-    for application_name, cluster_name in cluster_names:
-        cluster_path = combine(
-            huskar_client.base_path, 'service', application_name, cluster_name)
-        data, stat = huskar_client.client.get(cluster_path)
-        if not data:
+    def to_json(self):
+        data = self.data
+        if isinstance(data, bytes):
+            data = data.decode('utf-8', 'replace')
+        return json.dumps({
+            'code': self.code,
+            'message': self.CODES[self.code],
+            'path': self.path,
+            'data': data,
+        }, sort_keys=True)
+
+
+def lint_runtime_value(data, runtime_path, runtime_data):
+    try:
+        data = json.loads(data)
+    except (ValueError, TypeError):
+        pass
+    else:
+        if isinstance(data, dict) and 'state' in data:
+            return LintIssue('E-ZK001', runtime_path, runtime_data)
+    return LintIssue('E-ZK002', runtime_path, runtime_data)
+
+
+def lint_cluster_link(path, data):
+    if not data:
+        return
+    try:
+        link_data = json.loads(data)
+    except (TypeError, ValueError):
+        return LintIssue('E-ZK003', path, data)
+    if isinstance(link_data, dict):
+        link = link_data.get('link', [])
+        if isinstance(link, list) and (0 <= len(link) <= 1):
+            return
+    return LintIssue('E-ZK003', path, data)
+
+
+def lint_service_instance(path, data):
+    try:
+        data = json.loads(data)
+    except (ValueError, TypeError):
+        return LintIssue('E-ZK004', path, data)
+    if (not isinstance(data, dict) or
+            not data.get('ip') or
+            not isinstance(data.get('port'), dict) or
+            not isinstance(data['port'].get('main'), int) or
+            data['port']['main'] <= 0):
+        return LintIssue('E-ZK004', path, data)
+    elif 'meta' in data:
+        meta = data['meta']
+        if (not isinstance(meta, dict) or
+                not all(isinstance(v, unicode) for v in meta.values())):
+            return LintIssue('E-ZK004', path, data)
+
+
+def iter_service_nodes(walker, start_after=None):
+    """Walks the service tree and generates its nodes in order.
+
+    The instances are fetched only if their clusters have children, and the
+    runtime nodes are probed only if their instances have children.
+
+    :returns: An iterator of ``(application_name, kind, path, data, runtime)``
+              where ``kind`` is ``cluster`` or ``instance``. The ``runtime``
+              is a tuple ``(runtime_path, runtime_data)`` of instances which
+              have runtime nodes, or ``None`` of others.
+    """
+    client = walker.client
+    service_path = combine(huskar_client.base_path, 'service')
+
+    def fetch_fingerprints(node):
+        path, _, stat = node
+        if stat.numChildren:
+            return client.get_children_async(path)
+
+    def fetch_instance(entry):
+        kind, path, _ = entry
+        if kind == 'instance':
+            return client.get_async(path)
+
+    def fetch_runtime(item):
+        (kind, path, _), result = item
+        if kind == 'instance' and result is not None and \
+                result[1].numChildren:
+            return client.get_async(combine(path, 'runtime'))
+
+    def iter_entries(cluster_nodes):
+        for (cluster_path, data, _), fingerprints in cluster_nodes:
+            yield 'cluster', cluster_path, data
+            for fingerprint in sorted(fingerprints or []):
+                yield 'instance', combine(cluster_path, fingerprint), None
+
+    cluster_paths = walker.walk(service_path, 2, start_after)
+    cluster_nodes = walker.pipeline(
+        walker.iter_nodes(cluster_paths), fetch_fingerprints)
+    entries = walker.pipeline(iter_entries(cluster_nodes), fetch_instance)
+    for item, runtime_result in walker.pipeline(entries, fetch_runtime):
+        (kind, path, data), result = item
+        application_name = path[len(service_path) + 1:].split('/', 1)[0]
+        if kind == 'instance':
+            if result is None:
+                continue  # The instance has been removed
+            data = result[0]
+        runtime = None
+        if runtime_result is not None:
+            runtime = (combine(path, 'runtime'), runtime_result[0])
+        yield application_name, kind, path, data, runtime
+
+
+def lint_service_nodes(nodes):
+    """Lints the nodes of service tree.
+
+    :returns: An iterator of ``(application_name, issue)``. The ``issue`` is
+              ``None`` if the node is healthy.
+    """
+    for application_name, kind, path, data, runtime in nodes:
+        if kind == 'cluster':
+            yield application_name, lint_cluster_link(path, data)
             continue
-        try:
-            data = json.loads(data)
-        except (TypeError, ValueError):
-            yield LintIssue('E-ZK003', cluster_path, data)
-        else:
-            if isinstance(data, dict):
-                link = data.get('link', [])
-                if isinstance(link, list) and (0 <= len(link) <= 1):
-                    continue
-            yield LintIssue('E-ZK003', cluster_path, data)
-
-
-def lint_service_instance():
-    cluster_names = get_cluster_names('service')
-    for application_name, cluster_name in cluster_names:
-        fingerprints = get_fingerprints(
-            'service', application_name, cluster_name)
-        for fingerprint in fingerprints:
-            path = combine(
-                huskar_client.base_path, 'service', application_name,
-                cluster_name, fingerprint)
-            try:
-                data, _ = huskar_client.client.get(path)
-            except NoNodeError:
-                pass
-            else:
-                try:
-                    data = json.loads(data)
-                except (ValueError, TypeError):
-                    yield LintIssue('E-ZK004', path, data)
-                else:
-                    if (not isinstance(data, dict) or
-                            not data.get('ip') or
-                            not isinstance(data.get('port'), dict) or
-                            not isinstance(data['port'].get('main'), int) or
-                            data['port']['main'] <= 0):
-                        yield LintIssue('E-ZK004', path, data)
-                    elif 'meta' in data:
-                        meta = data['meta']
-                        if (not isinstance(meta, dict) or
-                                not all(isinstance(v, unicode)
-                                        for v in meta.values())):
-                            yield LintIssue('E-ZK004', path, data)
+        yield application_name, lint_service_instance(path, data)
+        if runtime is not None:
+            yield application_name, lint_runtime_value(data, *runtime)
+
+
+def read_checkpoint(checkpoint_path):
+    if checkpoint_path and os.path.exists(checkpoint_path):
+        with open(checkpoint_path) as checkpoint_file:
+            return checkpoint_file.read().strip().decode('utf-8') or None
+
+
+def write_checkpoint(checkpoint_path, application_name):
+    if checkpoint_path:
+        with open(checkpoint_path, 'w') as checkpoint_file:
+            checkpoint_file.write(application_name.encode('utf-8'))
 
 
 def main():
-    linters = [
-        lint_deprecated_runtime_value(),
-        lint_cluster_link(),
-        lint_service_instance(),
-    ]
+    parser = argparse.ArgumentParser(
+        description='Lint the service tree of ZooKeeper.')
+    parser.add_argument(
+        '-c', '--concurrency', type=int, default=100,
+        help='the max count of outstanding requests in each stage')
+    parser.add_argument(
+        '--checkpoint', default=None,
+        help='the file to record the last finished application, which will '
+             'be resumed from if it exists')
+    args = parser.parse_args()
+
+    walker = TreeWalker(huskar_client.client, args.concurrency)
+    start_after = read_checkpoint(args.checkpoint)
+    nodes = iter_service_nodes(walker, start_after)
 
     exit_code = 0
-    for issue in itertools.chain.from_iterable(linters):
-        exit_code = 1
-        print(str(issue), file=sys.stderr)
-        print('\tPATH\t{0!r}'.format(issue.path), file=sys.stderr)
-        if len(repr(issue.data)) < 50:
-            print('\tDATA\t{0!r}'.format(issue.data), file=sys.stderr)
-
+    last_application_name = None
+    for application_name, issue in lint_service_nodes(nodes):
+        # The nodes are generated in order so the last application is done
+        if application_name != last_application_name:
+            if last_application_name is not None:
+                write_checkpoint(args.checkpoint, last_application_name)
+            last_application_name = application_name
+        if issue is not None:
+            exit_code = 1
+            print(issue.to_json())
+            sys.stdout.flush()
+
+    if args.checkpoint and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
     sys.exit(exit_code)
 
 